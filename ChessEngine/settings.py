@@ -133,4 +133,7 @@ REST_FRAMEWORK = {
         'anon': '5/minute',
         'user': '20/minute'
     }
-}
\ No newline at end of file
+}
+
+# Let any client, not only staff users, profile /nextmove searches with the profile parameter
+ENGINE_PROFILE_REQUESTS = False
@@ -1,3 +1,9 @@
 from django.contrib import admin
+from .models import AnalysisJob
 
 # Register your models here.
+
+@admin.register(AnalysisJob)
+class AnalysisJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'fen', 'depth', 'status', 'created_at', 'expires_at')
+    list_filter = ('status',)
@@ -0,0 +1,121 @@
+'''Analysis store kept in the AnalysisRecord table, so search results survive restarts.
+
+lookup and save are called for live searches: a database error (such as SQLite's database is locked)
+is taken as a miss or a skipped save, the position is then searched as without a store.
+'''
+from functools import wraps
+from typing import Iterable, Iterator
+
+from django.db import DatabaseError, IntegrityError, close_old_connections, connection, transaction
+
+from .models import AnalysisRecord
+from .src.store import AnalysisStore, StoredAnalysis
+
+
+def to_signed(position_hash: int) -> int:
+    '''Map an unsigned 64-bit hash to the signed range of a BigIntegerField'''
+    return position_hash - (1 << 64) if position_hash >= 1 << 63 else position_hash
+
+
+def to_unsigned(position_hash: int) -> int:
+    return position_hash + (1 << 64) if position_hash < 0 else position_hash
+
+
+def to_analysis(record: AnalysisRecord) -> StoredAnalysis:
+    return StoredAnalysis(to_unsigned(record.position_hash), record.depth, record.score, record.best_move,
+                          record.principal_variation)
+
+
+def closing_connection(function):
+    '''Wrap a function run on a search pool thread: Django only manages connections around requests, so the
+    thread's stale connection is closed before the call and its connection after it, as in jobs.run_job'''
+    @wraps(function)
+    def run(*args, **kwargs):
+        close_old_connections()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            connection.close()
+    return run
+
+
+class DatabaseAnalysisStore(AnalysisStore):
+    BATCH_SIZE = 1000
+
+    def lookup(self, position_hash: int, depth: int) -> StoredAnalysis:
+        try:
+            record = AnalysisRecord.objects.filter(position_hash=to_signed(position_hash), depth__gte=depth).first()
+        except DatabaseError:
+            return None
+        return to_analysis(record) if record is not None else None
+
+    def save(self, analysis: StoredAnalysis, fen: str = '') -> None:
+        try:
+            self.save_analysis(analysis, fen)
+        except DatabaseError:
+            # the search result is still returned, only not kept
+            pass
+
+    def save_analysis(self, analysis: StoredAnalysis, fen: str) -> None:
+        values = {'fen': fen,
+                  'depth': analysis.get_depth(),
+                  'score': analysis.get_score(),
+                  'best_move': analysis.get_best_move(),
+                  'principal_variation': analysis.get_principal_variation()}
+        position_hash = to_signed(analysis.get_position_hash())
+        updated = AnalysisRecord.objects.filter(position_hash=position_hash,
+                                                depth__lt=analysis.get_depth()).update(**values)
+        if updated == 0:
+            try:
+                with transaction.atomic():
+                    AnalysisRecord.objects.create(position_hash=position_hash, **values)
+            except IntegrityError:
+                # already stored at the same or a greater depth, or by a concurrent request
+                pass
+
+    def save_many(self, analyses: Iterable[StoredAnalysis]) -> int:
+        '''Save analyses in batches, a deeper analysis superseding a shallower one; return how many were kept'''
+        kept = 0
+        batch = []
+        for analysis in analyses:
+            batch.append(analysis)
+            if len(batch) == DatabaseAnalysisStore.BATCH_SIZE:
+                kept += self.save_batch(batch)
+                batch = []
+        if batch:
+            kept += self.save_batch(batch)
+        return kept
+
+    def save_batch(self, analyses: Iterable[StoredAnalysis]) -> int:
+        deepest = {}
+        for analysis in analyses:
+            position_hash = to_signed(analysis.get_position_hash())
+            if position_hash not in deepest or deepest[position_hash].get_depth() < analysis.get_depth():
+                deepest[position_hash] = analysis
+        with transaction.atomic():
+            existing = {record.position_hash: record
+                        for record in AnalysisRecord.objects.filter(position_hash__in=list(deepest))}
+            created = []
+            updated = []
+            for position_hash, analysis in deepest.items():
+                record = existing.get(position_hash)
+                if record is None:
+                    created.append(AnalysisRecord(position_hash=position_hash, depth=analysis.get_depth(),
+                                                  score=analysis.get_score(), best_move=analysis.get_best_move(),
+                                                  principal_variation=analysis.get_principal_variation()))
+                elif record.depth < analysis.get_depth():
+                    record.depth = analysis.get_depth()
+                    record.score = analysis.get_score()
+                    record.best_move = analysis.get_best_move()
+                    record.principal_variation = analysis.get_principal_variation()
+                    updated.append(record)
+            AnalysisRecord.objects.bulk_create(created)
+            AnalysisRecord.objects.bulk_update(updated, ['depth', 'score', 'best_move', 'principal_variation'])
+        return len(created) + len(updated)
+
+    def __iter__(self) -> Iterator[StoredAnalysis]:
+        for record in AnalysisRecord.objects.order_by('position_hash').iterator(chunk_size=DatabaseAnalysisStore.BATCH_SIZE):
+            yield to_analysis(record)
+
+
+ANALYSIS_STORE = DatabaseAnalysisStore()
@@ -0,0 +1,126 @@
+'''Background analysis jobs: searches run on a pool of job workers with progress kept in AnalysisJob rows.
+
+Jobs have their own pool, ENGINE_JOB_WORKERS threads (one by default), so long jobs never hold the
+workers of /nextmove requests, and their own quota instead of admission control: a depth of at most
+ENGINE_MAX_JOB_DEPTH, at most ENGINE_MAX_PENDING_JOBS unfinished jobs per client and at most
+ENGINE_MAX_QUEUED_JOBS jobs waiting for a worker. A job queued or running when its process stops stays
+in that state until it expires, and counts against its client's quota until then.
+'''
+import os
+import threading
+from datetime import timedelta
+
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .models import AnalysisJob
+from .analysis_store import ANALYSIS_STORE
+from .src.engine import generate_next_move, FenError, IllegalMoveError, replay_game
+from .src.pool import SearchPool
+from .src.transposition import get_shared_table
+
+TTL_VARIABLE = 'ENGINE_JOB_TTL'
+WORKERS_VARIABLE = 'ENGINE_JOB_WORKERS'
+MAX_DEPTH_VARIABLE = 'ENGINE_MAX_JOB_DEPTH'
+MAX_PENDING_VARIABLE = 'ENGINE_MAX_PENDING_JOBS'
+MAX_QUEUED_VARIABLE = 'ENGINE_MAX_QUEUED_JOBS'
+DEFAULT_WORKERS = 1
+DEFAULT_MAX_DEPTH = 6
+DEFAULT_MAX_PENDING = 2
+DEFAULT_MAX_QUEUED = 32
+
+
+class TooManyJobsError(RuntimeError):
+    '''Raised when a client already has the maximum number of unfinished jobs'''
+
+
+class JobQueueFullError(RuntimeError):
+    '''Raised when the maximum number of jobs already wait for a worker'''
+
+
+_job_pool = None
+_job_pool_lock = threading.Lock()
+
+
+def get_job_pool() -> SearchPool:
+    '''Return the process wide pool of job workers, sized by ENGINE_JOB_WORKERS'''
+    global _job_pool
+    with _job_pool_lock:
+        if _job_pool is None:
+            _job_pool = SearchPool(int(os.environ.get(WORKERS_VARIABLE) or DEFAULT_WORKERS))
+        return _job_pool
+
+
+def get_max_job_depth() -> int:
+    return int(os.environ.get(MAX_DEPTH_VARIABLE) or DEFAULT_MAX_DEPTH)
+
+
+def get_job_ttl() -> timedelta:
+    '''Return how long jobs are kept, ENGINE_JOB_TTL seconds or AnalysisJob.DEFAULT_TTL'''
+    ttl = os.environ.get(TTL_VARIABLE)
+    return timedelta(seconds=float(ttl)) if ttl else AnalysisJob.DEFAULT_TTL
+
+
+def create_job(fen: str, depth: int, time_limit: float = None, multipv: int = 1, moves=None, history=None,
+               client: str = '') -> AnalysisJob:
+    '''Check the position and the quotas, store a pending job and queue it on the job pool. depth must be at most
+    get_max_job_depth(). Raise FenError or IllegalMoveError for an invalid position or move list,
+    TooManyJobsError or JobQueueFullError when the job is over a quota'''
+    replay_game(fen, moves, history)
+    pool = get_job_pool()
+    if pool.get_queue_depth() >= int(os.environ.get(MAX_QUEUED_VARIABLE) or DEFAULT_MAX_QUEUED):
+        raise JobQueueFullError('{0} jobs are waiting for a worker'.format(pool.get_queue_depth()))
+    AnalysisJob.delete_expired()
+    max_pending = int(os.environ.get(MAX_PENDING_VARIABLE) or DEFAULT_MAX_PENDING)
+    if AnalysisJob.count_unfinished(client) >= max_pending:
+        raise TooManyJobsError('at most {0} unfinished jobs per client'.format(max_pending))
+    job = AnalysisJob.objects.create(fen=fen, depth=depth, time_limit=time_limit, multipv=multipv,
+                                     moves=list(moves or ()), history=list(history or ()),
+                                     expires_at=timezone.now() + get_job_ttl(), client=client)
+    pool.submit(run_job, job.id)
+    return job
+
+
+def run_job(job_id) -> None:
+    '''Search a job, saving the best move of every completed depth and then the result'''
+    close_old_connections()
+    try:
+        job = AnalysisJob.objects.filter(id=job_id).first()
+        if job is None:
+            return
+        job.status = AnalysisJob.RUNNING
+        job.save(update_fields=['status', 'updated_at'])
+
+        def save_depth(entry: dict) -> None:
+            job.partial_results.append(entry)
+            job.save(update_fields=['partial_results', 'updated_at'])
+
+        try:
+            result = generate_next_move(job.fen, job.depth, moves=job.moves, history=job.history,
+                                        time_limit=job.time_limit, multipv=job.multipv, depth_listener=save_depth,
+                                        analysis_store=ANALYSIS_STORE, transposition_table=get_shared_table())
+        except (FenError, IllegalMoveError) as error:
+            job.status = AnalysisJob.FAILED
+            job.error = error.to_dict()
+        except Exception as error:
+            job.status = AnalysisJob.FAILED
+            job.error = {'message': str(error)}
+        else:
+            job.status = AnalysisJob.DONE
+            if 'game_over' in result:
+                job.result = {'game_over': result['game_over'],
+                              'fen': result['fen_board'],
+                              'player_make_this_move': result['player'],
+                              'depth': result['depth']}
+            else:
+                job.result = {'moved_piece': result['moved_piece'],
+                              'from': result['from'],
+                              'to': result['to'],
+                              'fen': result['fen_board'],
+                              'player_make_this_move': result['player'],
+                              'depth': result['depth'],
+                              'lines': result['lines'],
+                              'stats': result['stats']}
+        job.save(update_fields=['status', 'error', 'result', 'updated_at'])
+    finally:
+        connection.close()
@@ -0,0 +1,55 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from engine.src.bench import (BENCH_DEPTHS, BENCH_POSITIONS, DEFAULT_THRESHOLD, compare_moves,
+                              compare_to_baseline, load_baseline, run_benchmark, save_benchmark)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark generate_next_move on a fixed corpus and flag regressions against a stored baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depth', type=int, action='append',
+                            help='Search depth, can be repeated (default {0})'.format(' '.join(map(str, BENCH_DEPTHS))))
+        parser.add_argument('--position', action='append', choices=[name for name, _ in BENCH_POSITIONS],
+                            help='Only run this corpus position, can be repeated')
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'bench_baseline.json'),
+                            help='Baseline JSON file to compare against')
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help='Relative slowdown reported as a regression (default {0})'.format(DEFAULT_THRESHOLD))
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--save-baseline', action='store_true',
+                            help='Store the results as the new baseline instead of comparing')
+
+    def handle(self, *args, **options):
+        benchmark = run_benchmark(options['depth'] or BENCH_DEPTHS, options['position'])
+        for result in benchmark['results']:
+            branching_factor = result['branching_factor']
+            tt_hit_rate = result['tt_hit_rate']
+            self.stdout.write('{0:<14} depth {1}  {2:>8.3f}s  nodes {3:>8}  {4:>6} nps  ebf {5:>6}  tt {6:>6}  {7}'.format(
+                result['name'], result['depth'], result['seconds'], result['nodes'], result['nps'],
+                '-' if branching_factor is None else '{0:.2f}'.format(branching_factor),
+                '-' if tt_hit_rate is None else '{0:.1%}'.format(tt_hit_rate),
+                result['move']))
+        self.stdout.write('total {0} nodes in {1:.2f}s, {2} nps'.format(
+            benchmark['total_nodes'], benchmark['total_seconds'], benchmark['nps']))
+        if options['output']:
+            save_benchmark(benchmark, options['output'])
+
+        if options['save_baseline']:
+            save_benchmark(benchmark, options['baseline'])
+            self.stdout.write('baseline written to {0}'.format(options['baseline']))
+            return
+        if not os.path.exists(options['baseline']):
+            self.stdout.write('no baseline at {0}, run with --save-baseline to create one'.format(options['baseline']))
+            return
+        baseline = load_baseline(options['baseline'])
+        for change in compare_moves(benchmark, baseline):
+            self.stdout.write(self.style.WARNING(change))
+        regressions = compare_to_baseline(benchmark, baseline, options['threshold'])
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+        if regressions:
+            raise CommandError('{0} regression(s) beyond {1:.0%} of the baseline'.format(len(regressions), options['threshold']))
+        self.stdout.write(self.style.SUCCESS('no regression beyond {0:.0%} of the baseline'.format(options['threshold'])))
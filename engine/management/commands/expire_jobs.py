@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from engine.models import AnalysisJob
+
+
+class Command(BaseCommand):
+    help = 'Delete analysis jobs past their expiry time'
+
+    def handle(self, *args, **options):
+        deleted = AnalysisJob.delete_expired()
+        self.stdout.write('deleted {0} expired jobs'.format(deleted))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from engine.analysis_store import ANALYSIS_STORE
+from engine.src.store import write_analyses
+
+
+class Command(BaseCommand):
+    help = 'Write every stored analysis to a file in the compact binary analysis store format'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to write')
+
+    def handle(self, *args, **options):
+        with open(options['path'], 'wb') as output_file:
+            count = write_analyses(output_file, ANALYSIS_STORE)
+        self.stdout.write('exported {0} analyses to {1}'.format(count, options['path']))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from engine.analysis_store import ANALYSIS_STORE
+from engine.src.store import read_analyses
+
+
+class Command(BaseCommand):
+    help = 'Load analyses from a binary analysis store file, keeping the deeper one when a position is already stored'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File written by export_analysis')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], 'rb') as input_file:
+                kept = ANALYSIS_STORE.save_many(read_analyses(input_file))
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        self.stdout.write('imported {0} analyses from {1}'.format(kept, options['path']))
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from engine.src.fen import FenUtilities, FenError
+from engine.src.perft import PERFT_SUITE, divide, run_perft, run_suite
+
+
+class Command(BaseCommand):
+    help = 'Count move generator leaf nodes (perft) on the standard suite or on a FEN and report nodes per second'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depth', type=int, default=2,
+                            help='Depth to search, for the suite the maximum depth (default 2)')
+        parser.add_argument('--fen', help='Run on this position instead of the suite')
+        parser.add_argument('--position', action='append', choices=[name for name, _, _ in PERFT_SUITE],
+                            help='Only run this suite position, can be repeated')
+        parser.add_argument('--divide', action='store_true',
+                            help='With --fen, print the node count below each legal move')
+
+    def handle(self, *args, **options):
+        depth = options['depth']
+        if depth < 1:
+            raise CommandError('depth must be at least 1')
+        fen = options['fen']
+        if fen:
+            try:
+                board = FenUtilities.create_game_from_fen(fen)
+            except FenError as error:
+                raise CommandError(str(error))
+            if options['divide']:
+                total = 0
+                for notation, nodes in sorted(divide(board, depth).items()):
+                    self.stdout.write('{0}: {1}'.format(notation, nodes))
+                    total += nodes
+                self.stdout.write('total: {0}'.format(total))
+                return
+            results = [run_perft(fen, depth)]
+        else:
+            results = run_suite(depth, options['position'])
+
+        failures = 0
+        total_nodes = 0
+        total_seconds = 0.0
+        for result in results:
+            total_nodes += result['nodes']
+            total_seconds += result['seconds']
+            line = '{0:<28} depth {1}  nodes {2:>9}  {3:>8.2f}s  {4:>7} nps'.format(
+                result.get('name', fen), result['depth'], result['nodes'], result['seconds'], result['nps'])
+            if result['passed']:
+                self.stdout.write(line)
+            else:
+                failures += 1
+                self.stdout.write(self.style.ERROR('{0}  expected {1}'.format(line, result['expected'])))
+        if total_seconds > 0:
+            self.stdout.write('total nodes {0} in {1:.2f}s, {2} nps'.format(
+                total_nodes, total_seconds, int(total_nodes / total_seconds)))
+        if failures:
+            raise CommandError('{0} perft result(s) differ from the expected node count'.format(failures))
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engine', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position_hash', models.BigIntegerField(unique=True)),
+                ('fen', models.CharField(blank=True, max_length=128)),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('score', models.IntegerField()),
+                ('best_move', models.CharField(max_length=5)),
+                ('principal_variation', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
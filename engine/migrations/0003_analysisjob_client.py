@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('engine', '0002_analysisrecord'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analysisjob',
+            name='client',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -1,3 +1,88 @@
+import uuid
+from datetime import timedelta
+
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
+
+class AnalysisJob(models.Model):
+    '''A search run in the background, with the best move of every completed depth and the final result'''
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+    DEFAULT_TTL = timedelta(days=1)
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    fen = models.CharField(max_length=128)
+    depth = models.PositiveSmallIntegerField()
+    time_limit = models.FloatField(null=True, blank=True)
+    multipv = models.PositiveSmallIntegerField(default=1)
+    moves = models.JSONField(default=list, blank=True)
+    history = models.JSONField(default=list, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    partial_results = models.JSONField(default=list, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+    # user or address the job was created for, to limit the jobs pending per client
+    client = models.CharField(max_length=64, blank=True, default='', db_index=True)
+
+    def save(self, *args, **kwargs):
+        if self.expires_at is None:
+            self.expires_at = timezone.now() + AnalysisJob.DEFAULT_TTL
+        super().save(*args, **kwargs)
+
+    def is_expired(self) -> bool:
+        return self.expires_at <= timezone.now()
+
+    def is_finished(self) -> bool:
+        return self.status in (AnalysisJob.DONE, AnalysisJob.FAILED)
+
+    def to_dict(self) -> dict:
+        return {'job_id': str(self.id),
+                'status': self.status,
+                'fen': self.fen,
+                'depth': self.depth,
+                'time_limit': self.time_limit,
+                'multipv': self.multipv,
+                'partial_results': self.partial_results,
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at.isoformat(),
+                'updated_at': self.updated_at.isoformat(),
+                'expires_at': self.expires_at.isoformat()}
+
+    @staticmethod
+    def delete_expired() -> int:
+        '''Delete the jobs past their expiry time, return how many were deleted'''
+        deleted, _ = AnalysisJob.objects.filter(expires_at__lte=timezone.now()).delete()
+        return deleted
+
+    @staticmethod
+    def count_unfinished(client: str) -> int:
+        '''Return how many jobs of client are pending or running and not expired'''
+        return AnalysisJob.objects.filter(client=client, status__in=[AnalysisJob.PENDING, AnalysisJob.RUNNING],
+                                          expires_at__gt=timezone.now()).count()
+
+    def __str__(self) -> str:
+        return '{0} {1} depth {2} ({3})'.format(self.id, self.fen, self.depth, self.status)
+
+
+class AnalysisRecord(models.Model):
+    '''The deepest completed search of a position, looked up by its Zobrist hash.
+    The hash is stored as a signed 64-bit int, see engine.analysis_store'''
+    position_hash = models.BigIntegerField(unique=True)
+    fen = models.CharField(max_length=128, blank=True)
+    depth = models.PositiveSmallIntegerField()
+    score = models.IntegerField()
+    best_move = models.CharField(max_length=5)
+    principal_variation = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return '{0} depth {1}: {2}'.format(self.fen or self.position_hash, self.depth, self.best_move)
@@ -0,0 +1,129 @@
+'''Cost-aware admission control for searches.
+
+The cost of a search is estimated from its depth, with the nodes per CPU second and the branching
+factor learnt from the searches already run, and capped by its time limit. Searches are pure Python
+running on the threads of the search pool, they take turns holding the GIL, so however many workers
+there are, the running and queued searches together progress at the speed of one CPU: a new search
+ends once the CPU time of every search ahead of it and its own have been spent. While other searches
+are running or queued, a request whose estimated latency exceeds the latency budget is run at a lower
+depth or a shorter time limit; when the searches ahead alone exceed the budget it is shed.
+'''
+import math
+import os
+import threading
+
+BUDGET_VARIABLE = 'ENGINE_LATENCY_BUDGET'
+DEFAULT_BUDGET = 10.0
+
+
+class OverloadedError(RuntimeError):
+    ''' Raised for a search the admission controller sheds'''
+    def __init__(self, decision: 'AdmissionDecision') -> None:
+        super().__init__('search shed, retry after {0}s'.format(decision.retry_after))
+        self.decision = decision
+
+
+class AdmissionDecision:
+    def __init__(self, admitted: bool, depth: int, time_limit: float, requested_depth: int,
+                 requested_time_limit: float, estimated_seconds: float, retry_after: int = None) -> None:
+        self.admitted = admitted
+        self.depth = depth
+        self.time_limit = time_limit
+        self.requested_depth = requested_depth
+        self.requested_time_limit = requested_time_limit
+        self.estimated_seconds = estimated_seconds
+        self.retry_after = retry_after
+
+    def is_degraded(self) -> bool:
+        return self.admitted and (self.depth != self.requested_depth or self.time_limit != self.requested_time_limit)
+
+    def to_dict(self) -> dict:
+        return {'admitted': self.admitted,
+                'depth': self.depth,
+                'time_limit': self.time_limit,
+                'requested_depth': self.requested_depth,
+                'requested_time_limit': self.requested_time_limit,
+                'estimated_seconds': self.estimated_seconds,
+                'retry_after': self.retry_after}
+
+
+class AdmissionController:
+    MINIMUM_DEPTH = 1
+    MINIMUM_TIME_LIMIT = 0.1
+    # estimates used until searches have been observed
+    DEFAULT_NPS = 2500.0
+    DEFAULT_BRANCHING_FACTOR = 8.0
+    DEFAULT_SEARCH_SECONDS = 1.0
+    ROOT_NODES = 30
+    SMOOTHING = 0.2
+
+    def __init__(self, latency_budget: float = DEFAULT_BUDGET) -> None:
+        self._latency_budget = latency_budget
+        self._lock = threading.Lock()
+        self._nps = AdmissionController.DEFAULT_NPS
+        self._branching_factor = AdmissionController.DEFAULT_BRANCHING_FACTOR
+        self._search_seconds = AdmissionController.DEFAULT_SEARCH_SECONDS
+
+    def get_latency_budget(self) -> float:
+        return self._latency_budget
+
+    def observe(self, stats: dict) -> None:
+        ''' Learn nodes per CPU second, branching factor and CPU seconds of a search from its statistics dict.
+        The wall time of a search depends on how many others ran with it, its CPU time does not'''
+        cpu_seconds = stats.get('cpu_seconds') or stats['seconds']
+        with self._lock:
+            self._search_seconds = self.smooth(self._search_seconds, cpu_seconds)
+            if stats['nodes'] > 0 and cpu_seconds > 0:
+                self._nps = self.smooth(self._nps, stats['nodes'] / cpu_seconds)
+            depths = stats['time_per_depth']
+            if len(depths) >= 2 and depths[-2]['nodes'] > 0:
+                self._branching_factor = self.smooth(self._branching_factor,
+                                                     max(1.5, depths[-1]['nodes'] / depths[-2]['nodes']))
+
+    @staticmethod
+    def smooth(average: float, value: float) -> float:
+        return average + AdmissionController.SMOOTHING * (value - average)
+
+    def estimate_seconds(self, depth: int, time_limit: float = None) -> float:
+        ''' Estimate the CPU seconds of a search to depth, every iteration of the iterative deepening included'''
+        branching_factor = self._branching_factor
+        nodes = AdmissionController.ROOT_NODES * branching_factor ** (depth - 1) * branching_factor / (branching_factor - 1)
+        seconds = nodes / self._nps
+        return min(seconds, time_limit) if time_limit is not None else seconds
+
+    def estimate_wait(self, searches_ahead: int) -> float:
+        ''' Estimate the CPU seconds the searches_ahead running and queued searches still take from the one CPU
+        all searches share, before a new search is done'''
+        return searches_ahead * self._search_seconds
+
+    def admit(self, depth: int, time_limit: float, searches_ahead: int) -> AdmissionDecision:
+        ''' Decide whether to run a search, and at what depth and time limit, to stay within the latency budget.
+        With no other search running or queued the search runs as requested'''
+        if searches_ahead == 0:
+            return AdmissionDecision(True, depth, time_limit, depth, time_limit, self.estimate_seconds(depth, time_limit))
+        wait = self.estimate_wait(searches_ahead)
+        budget = self._latency_budget - wait
+        if budget < AdmissionController.MINIMUM_TIME_LIMIT:
+            return AdmissionDecision(False, depth, time_limit, depth, time_limit, wait + self.estimate_seconds(depth, time_limit),
+                                     retry_after=max(1, math.ceil(wait - self._latency_budget + self._search_seconds)))
+        admitted_depth = depth
+        while admitted_depth > AdmissionController.MINIMUM_DEPTH and self.estimate_seconds(admitted_depth, time_limit) > budget:
+            admitted_depth -= 1
+        admitted_time_limit = time_limit
+        if self.estimate_seconds(admitted_depth, time_limit) > budget:
+            admitted_time_limit = budget
+        return AdmissionDecision(True, admitted_depth, admitted_time_limit, depth, time_limit,
+                                 wait + self.estimate_seconds(admitted_depth, admitted_time_limit))
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    ''' Return the process wide controller, with the latency budget in seconds from ENGINE_LATENCY_BUDGET'''
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            budget = os.environ.get(BUDGET_VARIABLE)
+            _controller = AdmissionController(float(budget) if budget else DEFAULT_BUDGET)
+        return _controller
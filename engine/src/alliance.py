@@ -26,7 +26,6 @@ class Alliance(Enum):
     
     def is_pawn_promotion_square(self, position: int) -> bool:
         from .board import BoardUtils
-        BoardUtils.init()
         if self.value == 'W':
             return BoardUtils.EIGHTH_RANK[position]
         return BoardUtils.FIRST_RANK[position]
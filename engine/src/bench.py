@@ -0,0 +1,89 @@
+'''Search benchmark: run generate_next_move over a fixed corpus and compare against a stored baseline.'''
+import json
+import time
+from typing import List
+
+from .engine import generate_next_move
+
+# (name, FEN) of the positions searched by every benchmark run
+BENCH_POSITIONS = (
+    ('initial', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'),
+    ('open game', 'r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3'),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1'),
+    ('middlegame', 'r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 b - - 3 10'),
+    ('rook endgame', '8/5pk1/6p1/8/3R4/6P1/5PK1/r7 w - - 0 40'),
+    ('pawn endgame', '8/8/4k3/3p4/3P4/4K3/8/8 w - - 0 50'),
+)
+BENCH_DEPTHS = (1, 2, 3)
+DEFAULT_THRESHOLD = 0.10
+
+
+def run_benchmark(depths: List[int] = BENCH_DEPTHS, names: List[str] = None) -> dict:
+    ''' Search every corpus position at every depth and return the measurements as a JSON-ready dict'''
+    results = []
+    for name, fen in BENCH_POSITIONS:
+        if names and name not in names:
+            continue
+        previous_nodes = None
+        for depth in sorted(depths):
+            start = time.perf_counter()
+            next_move = generate_next_move(fen, depth)
+            seconds = time.perf_counter() - start
+            stats = next_move['stats']
+            nodes = stats['nodes']
+            results.append({'name': name,
+                            'fen': fen,
+                            'depth': depth,
+                            'seconds': seconds,
+                            'nodes': nodes,
+                            'nps': int(nodes / seconds) if seconds > 0 else 0,
+                            'branching_factor': nodes / previous_nodes if previous_nodes else None,
+                            'tt_hit_rate': stats['tt_hit_rate'],
+                            'move': next_move['from'] + next_move['to']})
+            previous_nodes = nodes
+    total_seconds = sum(result['seconds'] for result in results)
+    total_nodes = sum(result['nodes'] for result in results)
+    return {'results': results,
+            'total_seconds': total_seconds,
+            'total_nodes': total_nodes,
+            'nps': int(total_nodes / total_seconds) if total_seconds > 0 else 0}
+
+
+def compare_to_baseline(benchmark: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    ''' Return a message for every result slower, or searching more nodes, than the baseline by more than threshold'''
+    regressions = []
+    baseline_results = {(result['name'], result['depth']): result for result in baseline['results']}
+    for result in benchmark['results']:
+        key = (result['name'], result['depth'])
+        previous = baseline_results.get(key)
+        if previous is None:
+            continue
+        label = '{0} depth {1}'.format(*key)
+        if result['seconds'] > previous['seconds'] * (1 + threshold):
+            regressions.append('{0}: time {1:.3f}s vs {2:.3f}s'.format(label, result['seconds'], previous['seconds']))
+        if result['nodes'] > previous['nodes'] * (1 + threshold):
+            regressions.append('{0}: nodes {1} vs {2}'.format(label, result['nodes'], previous['nodes']))
+    if benchmark['nps'] < baseline['nps'] * (1 - threshold):
+        regressions.append('total: nps {0} vs {1}'.format(benchmark['nps'], baseline['nps']))
+    return regressions
+
+
+def compare_moves(benchmark: dict, baseline: dict) -> List[str]:
+    ''' Return a message for every result whose chosen move differs from the baseline'''
+    changes = []
+    baseline_moves = {(result['name'], result['depth']): result['move'] for result in baseline['results']}
+    for result in benchmark['results']:
+        previous_move = baseline_moves.get((result['name'], result['depth']))
+        if previous_move is not None and previous_move != result['move']:
+            changes.append('{0} depth {1}: move {2} vs {3}'.format(result['name'], result['depth'], result['move'], previous_move))
+    return changes
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_benchmark(benchmark: dict, path: str) -> None:
+    with open(path, 'w') as output_file:
+        json.dump(benchmark, output_file, indent=2)
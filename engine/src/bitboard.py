@@ -0,0 +1,61 @@
+'''Precomputed ray tables used to generate sliding piece (bishop, rook, queen) moves.
+
+Tile coordinates follow BoardUtils: 0 is a8 and 63 is h1. An occupancy bitboard is
+an int where bit i is set when tile i holds a piece.
+'''
+from typing import List, Tuple
+
+NUMBER_TILES = 64
+NUMBER_TILES_PER_ROW = 8
+SLIDING_OFFSETS = (-9, -8, -7, -1, 1, 7, 8, 9)
+
+
+def _build_ray(position: int, offset: int) -> Tuple[int, ...]:
+    ''' Return the tiles reached from position by repeatedly adding offset, nearest first'''
+    ray = []
+    coordinate = position
+    while True:
+        next_coordinate = coordinate + offset
+        if not 0 <= next_coordinate < NUMBER_TILES:
+            break
+        # Leaving the board sideways wraps around to the other edge of the next row
+        if abs(next_coordinate % NUMBER_TILES_PER_ROW - coordinate % NUMBER_TILES_PER_ROW) > 1:
+            break
+        ray.append(next_coordinate)
+        coordinate = next_coordinate
+    return tuple(ray)
+
+
+def _build_mask(ray: Tuple[int, ...]) -> int:
+    mask = 0
+    for coordinate in ray:
+        mask |= 1 << coordinate
+    return mask
+
+
+RAYS = tuple({offset: _build_ray(position, offset) for offset in SLIDING_OFFSETS}
+             for position in range(NUMBER_TILES))
+RAY_MASKS = tuple({offset: _build_mask(RAYS[position][offset]) for offset in SLIDING_OFFSETS}
+                  for position in range(NUMBER_TILES))
+
+
+def sliding_destinations(position: int, offsets: Tuple[int, ...], occupancy: int) -> List[int]:
+    ''' Return the tiles a slider on position reaches along offsets, including the first blocker of each ray.
+
+    The nearest blocker of a ray is found with a single bit scan on the masked occupancy:
+    the lowest set bit for rays going towards h1, the highest one for rays going towards a8.
+    '''
+    destinations = []
+    rays = RAYS[position]
+    masks = RAY_MASKS[position]
+    for offset in offsets:
+        blockers = masks[offset] & occupancy
+        if not blockers:
+            destinations.extend(rays[offset])
+            continue
+        if offset > 0:
+            nearest_blocker = (blockers & -blockers).bit_length() - 1
+        else:
+            nearest_blocker = blockers.bit_length() - 1
+        destinations.extend(rays[offset][:(nearest_blocker - position) // offset])
+    return destinations
@@ -1,8 +1,14 @@
+import re
+import threading
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Tuple
+
 from .alliance import Alliance
+from . import zobrist
 
 class Tile(ABC):
+    __slots__ = ('_coordinate',)
+
     def __init__(self, coordinate: int) -> None:
         self._coordinate = coordinate
 
@@ -21,10 +27,12 @@ class Tile(ABC):
     @staticmethod
     def create_tile(coordinate: int, piece):
         if piece == None:
-            return EmptyTile(coordinate)
+            return EMPTY_TILES[coordinate]
         return OccupiedTile(coordinate, piece)
 
 class EmptyTile(Tile):
+    __slots__ = ()
+
     def __init__(self, coordinate: int) -> None:
         super().__init__(coordinate)
 
@@ -38,6 +46,8 @@ class EmptyTile(Tile):
         return '-'
     
 class OccupiedTile(Tile):
+    __slots__ = ('_piece',)
+
     def __init__(self, coordinate: int, piece) -> None:
         ''' params: Piece - the piece on tile'''
         super().__init__(coordinate)
@@ -53,82 +63,98 @@ class OccupiedTile(Tile):
     def __str__(self) -> str:
         return str(self._piece)
 
+# Empty tiles carry nothing but their coordinate, every board shares these 64
+EMPTY_TILES = tuple(EmptyTile(i) for i in range(64))
    
+def _init_row(begin_index: int) -> Tuple[bool, ...]:
+    row = [False] * 64
+    row[begin_index] = True
+    begin_index += 1
+    while begin_index % 8 != 0:
+        row[begin_index] = True
+        begin_index += 1
+    return tuple(row)
+
+def _init_column(column_number: int) -> Tuple[bool, ...]:
+    column = [False] * 64
+    while column_number < 64:
+        column[column_number] = True
+        column_number = column_number + 8
+    return tuple(column)
+
+# Built once at import, tuples so concurrent requests can share them safely
+FISRT_COLUMN = _init_column(0)
+SECOND_COLUMN = _init_column(1)
+SEVENTH_COLUMN = _init_column(6)
+EIGHTH_COLUMN = _init_column(7)
+
+EIGHTH_RANK = _init_row(0)
+SEVENTH_RANK = _init_row(8)
+SIXTH_RANK = _init_row(16)
+FIFTH_RANK = _init_row(24)
+FOURTH_RANK = _init_row(32)
+THIRD_RANK = _init_row(40)
+SECOND_RANK = _init_row(48)
+FIRST_RANK = _init_row(56)
+
+
 class BoardUtils:
     NUMBER_TILES = 64
     NUMBER_TILES_PER_ROW = 8
 
-    FISRT_COLUMN = None
-    SECOND_COLUMN = None
-    SEVENTH_COLUMN = None
-    EIGHTH_COLUMN = None
-
-    EIGHTH_RANK = None
-    SEVENTH_RANK = None
-    SIXTH_RANK = None
-    FIFTH_RANK = None
-    FOURTH_RANK = None
-    THIRD_RANK = None
-    SECOND_RANK = None
-    FIRST_RANK = None
-
-    ALGEBREIC_NOTATION = ["a8", "b8", "c8", "d8", "e8", "f8", "g8", "h8",
+    FISRT_COLUMN = FISRT_COLUMN
+    SECOND_COLUMN = SECOND_COLUMN
+    SEVENTH_COLUMN = SEVENTH_COLUMN
+    EIGHTH_COLUMN = EIGHTH_COLUMN
+
+    EIGHTH_RANK = EIGHTH_RANK
+    SEVENTH_RANK = SEVENTH_RANK
+    SIXTH_RANK = SIXTH_RANK
+    FIFTH_RANK = FIFTH_RANK
+    FOURTH_RANK = FOURTH_RANK
+    THIRD_RANK = THIRD_RANK
+    SECOND_RANK = SECOND_RANK
+    FIRST_RANK = FIRST_RANK
+
+    ALGEBREIC_NOTATION = ("a8", "b8", "c8", "d8", "e8", "f8", "g8", "h8",
                           "a7", "b7", "c7", "d7", "e7", "f7", "g7", "h7",
                           "a6", "b6", "c6", "d6", "e6", "f6", "g6", "h6",
                           "a5", "b5", "c5", "d5", "e5", "f5", "g5", "h5",
                           "a4", "b4", "c4", "d4", "e4", "f4", "g4", "h4",
                           "a3", "b3", "c3", "d3", "e3", "f3", "g3", "h3",
                           "a2", "b2", "c2", "d2", "e2", "f2", "g2", "h2",
-                          "a1", "b1", "c1", "d1", "e1", "f1", "g1", "h1"]
+                          "a1", "b1", "c1", "d1", "e1", "f1", "g1", "h1")
 
-    @staticmethod
-    def init_row(begin_index: int) -> List[bool]:
-        row = [False] * BoardUtils.NUMBER_TILES
-        row[begin_index] = True
-        begin_index += 1
-        while begin_index % BoardUtils.NUMBER_TILES_PER_ROW != 0:
-            row[begin_index] = True
-            begin_index += 1
-        return row
-
-    @staticmethod
-    def init_column(column_number: int) -> List[bool]:
-        column = [False] * BoardUtils.NUMBER_TILES
-        while column_number < BoardUtils.NUMBER_TILES:
-            column[column_number] = True
-            column_number = column_number + 8
-        return column
-    
     @staticmethod
     def validate_tile_coordinate(coordinate: int) -> bool:
         return coordinate >= 0 and coordinate < BoardUtils.NUMBER_TILES
     
-    @staticmethod
-    def init():
-        BoardUtils.FISRT_COLUMN = BoardUtils.init_column(0)
-        BoardUtils.SECOND_COLUMN = BoardUtils.init_column(1)
-        BoardUtils.SEVENTH_COLUMN = BoardUtils.init_column(6)
-        BoardUtils.EIGHTH_COLUMN = BoardUtils.init_column(7)
-
-        BoardUtils.EIGHTH_RANK = BoardUtils.init_row(0)
-        BoardUtils.SEVENTH_RANK = BoardUtils.init_row(8)
-        BoardUtils.SIXTH_RANK = BoardUtils.init_row(16)
-        BoardUtils.FIFTH_RANK = BoardUtils.init_row(24)
-        BoardUtils.FOURTH_RANK = BoardUtils.init_row(32)
-        BoardUtils.THIRD_RANK = BoardUtils.init_row(40)
-        BoardUtils.SECOND_RANK = BoardUtils.init_row(48)
-        BoardUtils.FIRST_RANK = BoardUtils.init_row(56)
-
     @staticmethod
     def get_position_at_coordinate(coordinate: int) -> str:
         return BoardUtils.ALGEBREIC_NOTATION[coordinate]
+
+    @staticmethod
+    def get_coordinate_at_position(position: str) -> int:
+        return ALGEBREIC_COORDINATES[position]
     
 
+ALGEBREIC_COORDINATES = {position: coordinate for coordinate, position in enumerate(BoardUtils.ALGEBREIC_NOTATION)}
+
+
+_board_constructions = threading.local()
+
+def get_board_constructions() -> int:
+    ''' Return number of boards built so far by the calling thread'''
+    return getattr(_board_constructions, 'count', 0)
+
+
 class BoardBuilder:
     def __init__(self) -> None:
         self._board_config = {}
         self._next_move_maker = None
         self._enpassant_pawn = None
+        self._halfmove_clock = 0
+        self._fullmove_number = 1
         
     def set_piece(self, piece):
         self._board_config[piece.get_position()] = piece
@@ -145,6 +171,18 @@ class BoardBuilder:
     def get_enpassant_pawn(self):
         return self._enpassant_pawn
 
+    def set_halfmove_clock(self, halfmove_clock: int):
+        self._halfmove_clock = halfmove_clock
+
+    def get_halfmove_clock(self) -> int:
+        return self._halfmove_clock
+
+    def set_fullmove_number(self, fullmove_number: int):
+        self._fullmove_number = fullmove_number
+
+    def get_fullmove_number(self) -> int:
+        return self._fullmove_number
+
     def build(self):
         return Board(self)
 
@@ -152,10 +190,15 @@ class BoardBuilder:
 class Board:
     def __init__(self, builder: BoardBuilder) -> None:
         from .player import WhitePlayer, BlackPlayer
+        _board_constructions.count = getattr(_board_constructions, 'count', 0) + 1
         self._game_board = Board.create_game_board(builder)
+        self._occupancy = Board.calculate_occupancy(builder)
         self._white_pieces = self.calculate_active_pieces(Alliance.WHITE)
         self._black_pieces = self.calculate_active_pieces(Alliance.BLACK)
         self._enpassant_pawn = builder.get_enpassant_pawn()
+        self._halfmove_clock = builder.get_halfmove_clock()
+        self._fullmove_number = builder.get_fullmove_number()
+        self._zobrist_hash = None
         white_standart_legal_moves = self.calculate_legal_move(self._white_pieces)
         black_standart_legal_moves = self.calculate_legal_move(self._black_pieces)
         self._white_player = WhitePlayer(self, white_standart_legal_moves, black_standart_legal_moves)
@@ -182,6 +225,23 @@ class Board:
     
     def get_enpassant_pawn(self):
         return self._enpassant_pawn
+
+    def get_halfmove_clock(self) -> int:
+        ''' Return number of halfmoves since the last capture or pawn move'''
+        return self._halfmove_clock
+
+    def get_fullmove_number(self) -> int:
+        return self._fullmove_number
+
+    def get_zobrist_hash(self) -> int:
+        ''' Return 64-bit hash of this position, computed on first use'''
+        if self._zobrist_hash is None:
+            self._zobrist_hash = zobrist.calculate_hash(self)
+        return self._zobrist_hash
+
+    def get_occupancy(self) -> int:
+        ''' Return bitboard of occupied tiles, bit i is set when tile i holds a piece'''
+        return self._occupancy
     
     def calculate_active_pieces(self, alliance: Alliance):
         active_pieces = []
@@ -199,6 +259,13 @@ class Board:
             legal_moves.extend(piece.calculate_legal_move(self))
         return legal_moves
     
+    @staticmethod
+    def calculate_occupancy(builder: BoardBuilder) -> int:
+        occupancy = 0
+        for coordinate in builder._board_config:
+            occupancy |= 1 << coordinate
+        return occupancy
+
     @staticmethod
     def create_game_board(builder: BoardBuilder) -> List[Tile]:
         tiles = [None] * BoardUtils.NUMBER_TILES
@@ -211,39 +278,39 @@ class Board:
         from .piece import Rook, Knight, Bishop, Queen, King, Pawn
         builder = BoardBuilder()
 
-        builder.set_piece(Rook(0, Alliance.BLACK, None))
-        builder.set_piece(Knight(1, Alliance.BLACK, None))
-        builder.set_piece(Bishop(2, Alliance.BLACK, None))
-        builder.set_piece(Queen(3, Alliance.BLACK, None))
-        builder.set_piece(King(4, Alliance.BLACK, None, True, True))
-        builder.set_piece(Bishop(5, Alliance.BLACK, None))
-        builder.set_piece(Knight(6, Alliance.BLACK, None))
-        builder.set_piece(Rook(7, Alliance.BLACK, None))
-        builder.set_piece(Pawn(8, Alliance.BLACK, None))
-        builder.set_piece(Pawn(9, Alliance.BLACK, None))
-        builder.set_piece(Pawn(10, Alliance.BLACK, None))
-        builder.set_piece(Pawn(11, Alliance.BLACK, None))
-        builder.set_piece(Pawn(12, Alliance.BLACK, None))
-        builder.set_piece(Pawn(13, Alliance.BLACK, None))
-        builder.set_piece(Pawn(14, Alliance.BLACK, None))
-        builder.set_piece(Pawn(15, Alliance.BLACK, None))
-
-        builder.set_piece(Pawn(48, Alliance.WHITE, None))
-        builder.set_piece(Pawn(49, Alliance.WHITE, None))
-        builder.set_piece(Pawn(50, Alliance.WHITE, None))
-        builder.set_piece(Pawn(51, Alliance.WHITE, None))
-        builder.set_piece(Pawn(52, Alliance.WHITE, None))
-        builder.set_piece(Pawn(53, Alliance.WHITE, None))
-        builder.set_piece(Pawn(54, Alliance.WHITE, None))
-        builder.set_piece(Pawn(55, Alliance.WHITE, None))
-        builder.set_piece(Rook(56, Alliance.WHITE, None))
-        builder.set_piece(Knight(57, Alliance.WHITE, None))
-        builder.set_piece(Bishop(58, Alliance.WHITE, None))
-        builder.set_piece(Queen(59, Alliance.WHITE, None))
-        builder.set_piece(King(60, Alliance.WHITE, None, True, True))
-        builder.set_piece(Bishop(61, Alliance.WHITE, None))
-        builder.set_piece(Knight(62, Alliance.WHITE, None))
-        builder.set_piece(Rook(63, Alliance.WHITE, None))
+        builder.set_piece(Rook.create(0, Alliance.BLACK, None))
+        builder.set_piece(Knight.create(1, Alliance.BLACK, None))
+        builder.set_piece(Bishop.create(2, Alliance.BLACK, None))
+        builder.set_piece(Queen.create(3, Alliance.BLACK, None))
+        builder.set_piece(King.create(4, Alliance.BLACK, None, True, True))
+        builder.set_piece(Bishop.create(5, Alliance.BLACK, None))
+        builder.set_piece(Knight.create(6, Alliance.BLACK, None))
+        builder.set_piece(Rook.create(7, Alliance.BLACK, None))
+        builder.set_piece(Pawn.create(8, Alliance.BLACK, None))
+        builder.set_piece(Pawn.create(9, Alliance.BLACK, None))
+        builder.set_piece(Pawn.create(10, Alliance.BLACK, None))
+        builder.set_piece(Pawn.create(11, Alliance.BLACK, None))
+        builder.set_piece(Pawn.create(12, Alliance.BLACK, None))
+        builder.set_piece(Pawn.create(13, Alliance.BLACK, None))
+        builder.set_piece(Pawn.create(14, Alliance.BLACK, None))
+        builder.set_piece(Pawn.create(15, Alliance.BLACK, None))
+
+        builder.set_piece(Pawn.create(48, Alliance.WHITE, None))
+        builder.set_piece(Pawn.create(49, Alliance.WHITE, None))
+        builder.set_piece(Pawn.create(50, Alliance.WHITE, None))
+        builder.set_piece(Pawn.create(51, Alliance.WHITE, None))
+        builder.set_piece(Pawn.create(52, Alliance.WHITE, None))
+        builder.set_piece(Pawn.create(53, Alliance.WHITE, None))
+        builder.set_piece(Pawn.create(54, Alliance.WHITE, None))
+        builder.set_piece(Pawn.create(55, Alliance.WHITE, None))
+        builder.set_piece(Rook.create(56, Alliance.WHITE, None))
+        builder.set_piece(Knight.create(57, Alliance.WHITE, None))
+        builder.set_piece(Bishop.create(58, Alliance.WHITE, None))
+        builder.set_piece(Queen.create(59, Alliance.WHITE, None))
+        builder.set_piece(King.create(60, Alliance.WHITE, None, True, True))
+        builder.set_piece(Bishop.create(61, Alliance.WHITE, None))
+        builder.set_piece(Knight.create(62, Alliance.WHITE, None))
+        builder.set_piece(Rook.create(63, Alliance.WHITE, None))
 
         builder.set_move_maker(Alliance.WHITE)
         return builder.build()
@@ -265,7 +332,54 @@ class Board:
         return out_str
     
 
+class MoveCode:
+    ''' Pack a move into a plain int so search tables don't keep Move, Board and Piece objects alive.
+
+    Layout: bits 0-5 current coordinate, bits 6-11 destination coordinate,
+    bits 12-15 move flag, bits 16-18 promotion piece (index in PROMOTION_PIECES).
+    '''
+    NULL_MOVE = 0
+
+    MAJOR_MOVE = 0
+    MAJOR_ATTACK_MOVE = 1
+    PAWN_MOVE = 2
+    PAWN_JUMP = 3
+    PAWN_ATTACK_MOVE = 4
+    PAWN_ENPASSANT_ATTACK_MOVE = 5
+    KING_SIDE_CASTLE_MOVE = 6
+    QUEEN_SIDE_CASTLE_MOVE = 7
+
+    PROMOTION_PIECES = (None, 'N', 'B', 'R', 'Q')
+
+    @staticmethod
+    def encode(current_coordinate: int, destination_coordinate: int, flag: int, promotion_piece: str = None) -> int:
+        return current_coordinate | (destination_coordinate << 6) | (flag << 12) | \
+               (MoveCode.PROMOTION_PIECES.index(promotion_piece) << 16)
+
+    @staticmethod
+    def get_current_coordinate(code: int) -> int:
+        return code & 0x3F
+
+    @staticmethod
+    def get_destination_coordinate(code: int) -> int:
+        return (code >> 6) & 0x3F
+
+    @staticmethod
+    def get_flag(code: int) -> int:
+        return (code >> 12) & 0xF
+
+    @staticmethod
+    def get_promotion_piece(code: int) -> str:
+        ''' Return piece type letter of the promotion piece or None'''
+        return MoveCode.PROMOTION_PIECES[(code >> 16) & 0x7]
+
+
 class Move:
+    __slots__ = ('_board', '_moved_piece', '_destination_coordinate', '_is_first_move')
+    FLAG = MoveCode.MAJOR_MOVE
+    # (king side, queen side) rook coordinates of the castle rights of each alliance
+    ROOK_HOME_COORDINATES = {Alliance.WHITE: (63, 56), Alliance.BLACK: (7, 0)}
+
     def __init__(self, board: Board, moved_piece, destination_coordinate: int) -> None:
         self._board = board
         self._moved_piece = moved_piece
@@ -298,6 +412,22 @@ class Move:
     
     def get_moved_piece(self):
         return self._moved_piece
+
+    def get_promotion_piece(self) -> str:
+        ''' Return piece type letter of the promotion piece or None'''
+        return None
+
+    def get_notation(self) -> str:
+        ''' Return this move in coordinate notation, e.g. e2e4 or e7e8q'''
+        notation = BoardUtils.get_position_at_coordinate(self.get_current_coordinate()) + \
+                   BoardUtils.get_position_at_coordinate(self._destination_coordinate)
+        promotion_piece = self.get_promotion_piece()
+        return notation + promotion_piece.lower() if promotion_piece else notation
+
+    def encode(self) -> int:
+        ''' Return this move packed as a MoveCode int'''
+        return MoveCode.encode(self.get_current_coordinate(), self._destination_coordinate,
+                               self.FLAG, self.get_promotion_piece())
     
     def execute(self) -> Board:
         ''' Return new Board instance after this move is executed '''
@@ -309,8 +439,36 @@ class Move:
             builder.set_piece(piece)
         builder.set_piece(self._moved_piece.move(self))
         builder.set_move_maker(self._board.get_current_player().get_opponent().get_alliance())
+        self.update_clocks(builder)
+        self.update_castle_rights(builder)
         return builder.build()
 
+    def update_castle_rights(self, builder: BoardBuilder) -> None:
+        ''' Take the castle right away from the king whose rook leaves, or is captured on, its home square'''
+        from .piece import King
+        for player, piece in ((self._board.get_current_player(), self._moved_piece),
+                              (self._board.get_current_player().get_opponent(), self.get_attacked_piece())):
+            if piece is None or not piece.get_piece_type().is_rook():
+                continue
+            king = player.get_player_king()
+            king_side_home, queen_side_home = Move.ROOK_HOME_COORDINATES[king.get_alliance()]
+            king_side = king.is_king_side_castle_capable() and piece.get_position() != king_side_home
+            queen_side = king.is_queen_side_castle_capable() and piece.get_position() != queen_side_home
+            if king_side != king.is_king_side_castle_capable() or queen_side != king.is_queen_side_castle_capable():
+                builder.set_piece(King.create(king.get_position(), king.get_alliance(), king.is_first_move(),
+                                              king_side, queen_side, king.is_castled()))
+
+    def update_clocks(self, builder: BoardBuilder) -> None:
+        ''' Set halfmove clock and fullmove number of the board this move leads to'''
+        if self.is_attack() or self._moved_piece.get_piece_type().is_pawn():
+            builder.set_halfmove_clock(0)
+        else:
+            builder.set_halfmove_clock(self._board.get_halfmove_clock() + 1)
+        fullmove_number = self._board.get_fullmove_number()
+        if self._board.get_current_player().get_alliance().is_black():
+            fullmove_number += 1
+        builder.set_fullmove_number(fullmove_number)
+
     def is_attack(self) -> bool:
         return False
     
@@ -326,6 +484,7 @@ class Move:
     
 
 class MajorMove(Move):
+    __slots__ = ()
     def __init__(self, board: Board, moved_piece, destination_coordinate: int) -> None:
         super().__init__(board, moved_piece, destination_coordinate)
 
@@ -334,6 +493,9 @@ class MajorMove(Move):
     
 
 class AttackMove(Move):
+    __slots__ = ('_attacked_piece',)
+    FLAG = MoveCode.MAJOR_ATTACK_MOVE
+
     def __init__(self, board: Board, moved_piece, destination_coordinate: int, attacked_piece) -> None:
         super().__init__(board, moved_piece, destination_coordinate)
         self._attacked_piece = attacked_piece
@@ -354,6 +516,9 @@ class AttackMove(Move):
     
 
 class MajorAttackMove(AttackMove):
+    __slots__ = ()
+    FLAG = MoveCode.MAJOR_ATTACK_MOVE
+
     def __init__(self, board: Board, moved_piece, destination_coordinate: int, attacked_piece) -> None:
         super().__init__(board, moved_piece, destination_coordinate, attacked_piece)
 
@@ -362,6 +527,9 @@ class MajorAttackMove(AttackMove):
 
     
 class PawnMove(Move):
+    __slots__ = ()
+    FLAG = MoveCode.PAWN_MOVE
+
     def __init__(self, board: Board, moved_piece, destination_coordinate: int) -> None:
         super().__init__(board, moved_piece, destination_coordinate)
 
@@ -370,6 +538,9 @@ class PawnMove(Move):
 
 
 class PawnJump(Move):
+    __slots__ = ()
+    FLAG = MoveCode.PAWN_JUMP
+
     def __init__(self, board: Board, moved_piece, destination_coordinate: int) -> None:
         super().__init__(board, moved_piece, destination_coordinate)
 
@@ -387,12 +558,17 @@ class PawnJump(Move):
         pawn_moved = self._moved_piece.move(self)
         builder.set_piece(pawn_moved)
         builder.set_enpassant_pawn(pawn_moved)
-        builder.set_move_maker(self._board.get_current_player().get_opponent().get_alliance())  
+        builder.set_move_maker(self._board.get_current_player().get_opponent().get_alliance())
+        self.update_clocks(builder)
+        self.update_castle_rights(builder)
         return builder.build()
 
 
 
 class PawnAttackMove(AttackMove):
+    __slots__ = ()
+    FLAG = MoveCode.PAWN_ATTACK_MOVE
+
     def __init__(self, board: Board, moved_piece, destination_coordinate: int, attacked_piece) -> None:
         super().__init__(board, moved_piece, destination_coordinate, attacked_piece)
 
@@ -401,30 +577,43 @@ class PawnAttackMove(AttackMove):
 
 
 class PawnPromotionMove(Move):
-    def __init__(self, wrapped_move: Move) -> None:
+    __slots__ = ('_wrapped_move', '_promoted_pawn', '_promotion_piece')
+    def __init__(self, wrapped_move: Move, promotion_piece: str = 'Q') -> None:
+        ''' params: promotion_piece - piece type letter the pawn promotes to'''
         self._wrapped_move = wrapped_move
         self._promoted_pawn = wrapped_move.get_moved_piece()
+        self._promotion_piece = promotion_piece
         super().__init__(wrapped_move.get_board(), wrapped_move.get_moved_piece(), wrapped_move.get_destination_coordinate())
     
     def __hash__(self) -> int:
-        return hash(self._wrapped_move) + hash(self._promoted_pawn)
+        return hash(self._wrapped_move) + hash(self._promoted_pawn) + hash(self._promotion_piece)
     
     def __eq__(self, __value: object) -> bool:
-        return isinstance(__value, PawnPromotionMove) and super().__eq__(__value)
+        return isinstance(__value, PawnPromotionMove) and \
+               self._promotion_piece == __value._promotion_piece and \
+               super().__eq__(__value)
     
     def execute(self) -> Board:
         ''' Return new Board instance after this move is executed '''
-        pawn_moved_board = self._wrapped_move.execute()
         builder = BoardBuilder()
-        for piece in pawn_moved_board.get_current_player().get_opponent().get_active_pieces():
+        for piece in self._board.get_current_player().get_active_pieces():
             if not piece == self._promoted_pawn:
                 builder.set_piece(piece)
-        for piece in pawn_moved_board.get_current_player().get_active_pieces():
+        for piece in self._board.get_current_player().get_opponent().get_active_pieces():
             builder.set_piece(piece)
-        builder.set_piece(self._promoted_pawn.get_promotion_piece().move())
-        builder.set_move_maker(self._board.get_current_player().get_alliance())
+        builder.set_piece(self._promoted_pawn.get_promotion_piece(self._promotion_piece).move(self))
+        builder.set_move_maker(self._board.get_current_player().get_opponent().get_alliance())
+        self.update_clocks(builder)
+        self.update_castle_rights(builder)
         return builder.build()
     
+    def get_promotion_piece(self) -> str:
+        return self._promotion_piece
+
+    def encode(self) -> int:
+        return MoveCode.encode(self.get_current_coordinate(), self._destination_coordinate,
+                               self._wrapped_move.FLAG, self.get_promotion_piece())
+
     def is_attack(self) -> bool:
         return self._wrapped_move.is_attack()
     
@@ -433,6 +622,9 @@ class PawnPromotionMove(Move):
     
 
 class PawnEnpassantAttackMove(PawnAttackMove):
+    __slots__ = ()
+    FLAG = MoveCode.PAWN_ENPASSANT_ATTACK_MOVE
+
     def __init__(self, board: Board, moved_piece, destination_coordinate: int, attacked_piece) -> None:
         super().__init__(board, moved_piece, destination_coordinate, attacked_piece)
 
@@ -450,9 +642,12 @@ class PawnEnpassantAttackMove(PawnAttackMove):
                 builder.set_piece(piece)
         builder.set_piece(self._moved_piece.move(self))
         builder.set_move_maker(self._board.get_current_player().get_opponent().get_alliance())
+        self.update_clocks(builder)
+        self.update_castle_rights(builder)
         return builder.build()
     
 class CastleMove(Move):
+    __slots__ = ('_castle_rook', '_castle_rook_start', '_castle_rook_destination')
     def __init__(self, board: Board, moved_piece, destination_coordinate: int,
                  castle_rook, castle_rook_start: int, castle_rook_destination: int) -> None:
         self._castle_rook = castle_rook
@@ -483,12 +678,17 @@ class CastleMove(Move):
                 builder.set_piece(piece)
         for piece in self._board.get_current_player().get_opponent().get_active_pieces():
             builder.set_piece(piece)
-        builder.set_piece(self._moved_piece.move())
-        builder.set_piece(Rook(self._castle_rook_destination, self._castle_rook.get_alliance(), False))
+        builder.set_piece(self._moved_piece.move(self))
+        builder.set_piece(Rook.create(self._castle_rook_destination, self._castle_rook.get_alliance(), False))
         builder.set_move_maker(self._board.get_current_player().get_opponent().get_alliance())
+        self.update_clocks(builder)
+        self.update_castle_rights(builder)
         return builder.build()
     
 class KingSideCastleMove(CastleMove):
+    __slots__ = ()
+    FLAG = MoveCode.KING_SIDE_CASTLE_MOVE
+
     def __init__(self, board: Board, moved_piece, destination_coordinate: int, 
                  castle_rook, castle_rook_start: int, castle_rook_destination: int) -> None:
         super().__init__(board, moved_piece, destination_coordinate, 
@@ -502,6 +702,9 @@ class KingSideCastleMove(CastleMove):
 
 
 class QueenSideCastleMove(CastleMove):
+    __slots__ = ()
+    FLAG = MoveCode.QUEEN_SIDE_CASTLE_MOVE
+
     def __init__(self, board: Board, moved_piece, destination_coordinate: int, 
                  castle_rook, castle_rook_start: int, castle_rook_destination: int) -> None:
         super().__init__(board, moved_piece, destination_coordinate, 
@@ -515,10 +718,61 @@ class QueenSideCastleMove(CastleMove):
 
 class MoveFactory:
     @staticmethod
-    def create_move(board: Board, current_coordinate: int, destination_coordinate: int) -> Move:
-        for move in board.get_all_legal_moves():
-            if move.get_current_coordinate() == current_coordinate and \
-               move.get_destination_coordinate() == destination_coordinate:
-                return move
+    def create_move(board: Board, current_coordinate: int, destination_coordinate: int,
+                    promotion_piece: str = None) -> Move:
+        move = board.get_white_player().get_legal_move(current_coordinate, destination_coordinate, promotion_piece)
+        if move is None:
+            move = board.get_black_player().get_legal_move(current_coordinate, destination_coordinate, promotion_piece)
+        return move
 
+    @staticmethod
+    def create_move_from_notation(board: Board, notation: str) -> Move:
+        ''' Return the current player's legal move written in coordinate notation, e.g. e2e4 or e7e8q,
+        None if the notation is malformed or the move is not legal'''
+        if not isinstance(notation, str) or len(notation) not in (4, 5) or \
+           notation[:2] not in ALGEBREIC_COORDINATES or notation[2:4] not in ALGEBREIC_COORDINATES:
+            return None
+        promotion_piece = notation[4].upper() if len(notation) == 5 else None
+        return board.get_current_player().get_legal_move(BoardUtils.get_coordinate_at_position(notation[:2]),
+                                                         BoardUtils.get_coordinate_at_position(notation[2:4]),
+                                                         promotion_piece)
+
+    SAN_PATTERN = re.compile(r'([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?')
 
+    @staticmethod
+    def create_move_from_san(board: Board, san: str) -> Move:
+        ''' Return the current player's legal move written in standard algebraic notation, e.g. Nbd7, exd5,
+        e8=Q or O-O, None if the notation is malformed, ambiguous or the move is not legal'''
+        san = san.rstrip('+#!?')
+        player = board.get_current_player()
+        if san in ('O-O', '0-0', 'O-O-O', '0-0-0'):
+            castle_type = KingSideCastleMove if len(san) == 3 else QueenSideCastleMove
+            candidates = [move for move in player.get_legal_moves() if isinstance(move, castle_type)]
+        else:
+            match = MoveFactory.SAN_PATTERN.fullmatch(san)
+            if match is None:
+                return None
+            piece_type, from_file, from_rank, destination, promotion_piece = match.groups()
+            destination_coordinate = ALGEBREIC_COORDINATES[destination]
+            candidates = []
+            for move in player.get_legal_moves():
+                position = BoardUtils.get_position_at_coordinate(move.get_current_coordinate())
+                if move.get_destination_coordinate() == destination_coordinate and \
+                   str(move.get_moved_piece().get_piece_type()) == (piece_type or 'P') and \
+                   move.get_promotion_piece() == promotion_piece and not move.is_castling_move() and \
+                   from_file in (None, position[0]) and from_rank in (None, position[1]):
+                    candidates.append(move)
+        if len(candidates) > 1:
+            # the notation only disambiguates between moves that don't leave the king in check
+            candidates = [move for move in candidates if player.make_move(move).get_move_status().is_done()]
+        return candidates[0] if len(candidates) == 1 else None
+
+    @staticmethod
+    def decode_move(board: Board, code: int) -> Move:
+        ''' Return the legal move of the current player matching a MoveCode int, None if there is none'''
+        move = board.get_current_player().get_legal_move(MoveCode.get_current_coordinate(code),
+                                                         MoveCode.get_destination_coordinate(code),
+                                                         MoveCode.get_promotion_piece(code))
+        if move is not None and move.encode() == code:
+            return move
+        return None
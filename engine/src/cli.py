@@ -0,0 +1,123 @@
+'''Command line interface of the engine, run with python -m engine.src without loading Django.
+
+The uci command speaks the UCI protocol on stdin and stdout, see uci. The pgn command searches every
+position of the games of PGN files, see pgn. The other commands read FENs from stdin, one per line,
+blank lines and lines starting with # are skipped:
+    bestmove  the best move of each position in coordinate notation, (none) when there is no legal move
+    perft     the number of leaf nodes at depth below each position
+    analyze   one JSON object per position with the best lines and the search statistics
+Each result is written as soon as its position is done. A FEN that can't be parsed is reported on stderr
+with its line number and the exit status is 1, as it is when a PGN game has an error.
+
+The searches of a run share the table of get_shared_table, so ENGINE_TT_SIZE, ENGINE_TT_SNAPSHOT and
+ENGINE_TT_SHARED_MEMORY apply as for the web service.
+'''
+import argparse
+import json
+import sys
+from typing import Iterator, List, TextIO, Tuple
+
+from .fen import FenUtilities, FenError
+from .engine import generate_next_move
+from .perft import perft, divide
+from .transposition import get_shared_table
+from . import pgn, uci
+
+
+def read_fens(input_file: TextIO) -> Iterator[Tuple[int, str]]:
+    ''' Yield (line number, FEN) of every position of input_file'''
+    for line_number, line in enumerate(input_file, start=1):
+        fen = line.strip()
+        if fen and not fen.startswith('#'):
+            yield line_number, fen
+
+
+def analyze(fen: str, depth: int, time_limit: float = None, multipv: int = 1) -> dict:
+    ''' Search fen, a position without legal moves has no lines and its result instead'''
+    next_move = generate_next_move(fen, depth, time_limit=time_limit, multipv=multipv,
+                                   transposition_table=get_shared_table())
+    if 'game_over' in next_move:
+        return {'fen': fen, 'result': next_move['game_over'], 'lines': []}
+    return {'fen': fen,
+            'best_move': next_move['lines'][0]['move'],
+            'lines': next_move['lines'],
+            'stats': next_move['stats']}
+
+
+def run_bestmove(arguments: argparse.Namespace, fen: str) -> str:
+    analysis = analyze(fen, arguments.depth, arguments.time_limit)
+    return analysis.get('best_move', '(none)')
+
+
+def run_perft(arguments: argparse.Namespace, fen: str) -> str:
+    board = FenUtilities.create_game_from_fen(fen)
+    if not arguments.divide:
+        return str(perft(board, arguments.depth))
+    counts = divide(board, arguments.depth)
+    return ' '.join('{0}:{1}'.format(notation, nodes) for notation, nodes in sorted(counts.items())) + \
+           ' total:{0}'.format(sum(counts.values()))
+
+
+def run_analyze(arguments: argparse.Namespace, fen: str) -> str:
+    return json.dumps(analyze(fen, arguments.depth, arguments.time_limit, arguments.multipv))
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError('must be at least 1')
+    return number
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m engine.src',
+                                     description='Search or count the positions of the FENs read from stdin, '
+                                                 'one per line')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    bestmove = commands.add_parser('bestmove', help='print the best move of each position')
+    bestmove.set_defaults(run=run_bestmove)
+    perft_parser = commands.add_parser('perft', help='print the number of leaf nodes below each position')
+    perft_parser.add_argument('--depth', type=positive_int, default=2, help='depth to count (default 2)')
+    perft_parser.add_argument('--divide', action='store_true', help='print the count below each legal move')
+    perft_parser.set_defaults(run=run_perft)
+    analyze_parser = commands.add_parser('analyze', help='print the best lines and search statistics as JSON')
+    analyze_parser.add_argument('--multipv', type=positive_int, default=1,
+                                help='number of best moves to report (default 1)')
+    analyze_parser.set_defaults(run=run_analyze)
+    commands.add_parser('uci', help='run as a UCI engine until quit')
+    pgn_parser = commands.add_parser('pgn', help='search the positions of PGN games, print one JSON line per game')
+    pgn_parser.add_argument('paths', nargs='*', default=['-'], metavar='PGN',
+                            help='plain, gzip, bzip2 or xz PGN file, - or none for stdin')
+    pgn_parser.add_argument('--workers', type=positive_int, help='worker processes (default one per CPU)')
+    pgn_parser.add_argument('--in-flight', type=positive_int,
+                            help='games submitted to the workers and not yet written (default 4 per worker)')
+
+    for search_parser in (bestmove, analyze_parser, pgn_parser):
+        search_parser.add_argument('--depth', type=positive_int, default=3, help='depth to search (default 3)')
+        search_parser.add_argument('--time-limit', type=float,
+                                   help='seconds after which the last completed depth is used')
+    return parser
+
+
+def main(argv: List[str] = None, input_file: TextIO = None, output_file: TextIO = None) -> int:
+    ''' Run the command of argv on every FEN of input_file (stdin), return the exit status'''
+    arguments = create_parser().parse_args(argv)
+    input_file = input_file or sys.stdin
+    output_file = output_file or sys.stdout
+    if arguments.command == 'uci':
+        return uci.main(input_file, output_file)
+    if arguments.command == 'pgn':
+        _, errors = pgn.analyze_games(pgn.read_files(arguments.paths, input_file), output_file, arguments.depth,
+                                      arguments.time_limit, arguments.workers, arguments.in_flight)
+        return 1 if errors else 0
+    status = 0
+    for line_number, fen in read_fens(input_file):
+        try:
+            result = arguments.run(arguments, fen)
+        except FenError as error:
+            print('line {0}: {1}'.format(line_number, error), file=sys.stderr)
+            status = 1
+            continue
+        print(result, file=output_file, flush=True)
+    return status
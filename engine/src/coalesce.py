@@ -0,0 +1,171 @@
+'''Single-flight coalescing of identical searches.
+
+The first caller with a key runs the search, callers arriving with the same key while it runs wait
+for its result instead of searching again. Threads of one process share the result in memory;
+processes of one host share it through a lock file and a result file per key in a local directory.
+A result file holds a generation counter, one more than the previous result of its key, so a waiting
+process can tell a result written while it waited from an older one. Files unused for EXPIRY_TIMEOUTS
+timeouts are deleted, at most once per timeout by each process.
+'''
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, List, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .fen import FenUtilities
+
+DIRECTORY_VARIABLE = 'ENGINE_COALESCE_DIR'
+TIMEOUT_VARIABLE = 'ENGINE_COALESCE_TIMEOUT'
+DEFAULT_TIMEOUT = 60.0
+EXPIRY_TIMEOUTS = 10
+
+
+class CoalescingTimeout(TimeoutError):
+    ''' Raised when the search a caller waits for does not finish within the timeout'''
+
+
+def search_key(fen: str, depth: int, moves: List[str] = None, history: List[str] = None, **parameters) -> str:
+    ''' Return a key equal for searches giving the same result: the FEN is parsed and written back
+    so spacing and field formatting do not matter'''
+    normalized_fen = FenUtilities.create_fen_from_game(FenUtilities.create_game_from_fen(fen))
+    key = json.dumps([normalized_fen, depth, list(moves or ()), list(history or ()), sorted(parameters.items())])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class _Call:
+    __slots__ = ('event', 'result', 'error')
+
+    def __init__(self) -> None:
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, directory: str = None, timeout: float = None) -> None:
+        ''' directory: where lock and result files are kept, None to coalesce within this process only'''
+        self._directory = directory
+        self._timeout = timeout if timeout is not None else DEFAULT_TIMEOUT
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._last_expiry = time.monotonic()
+
+    def do(self, key: str, function: Callable[[], dict]) -> Tuple[dict, bool]:
+        ''' Return (result of function, whether it came from another caller's call)'''
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            if not call.event.wait(self._timeout):
+                raise CoalescingTimeout('search {0} still running after {1}s'.format(key, self._timeout))
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result, shared = self.do_across_processes(key, function)
+            return call.result, shared
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def do_across_processes(self, key: str, function: Callable[[], dict]) -> Tuple[dict, bool]:
+        ''' Run function holding the key's lock file, or read the result written by the process holding it'''
+        if self._directory is None or fcntl is None:
+            return function(), False
+        os.makedirs(self._directory, exist_ok=True)
+        self.remove_expired_files()
+        lock_path = os.path.join(self._directory, key + '.lock')
+        result_path = os.path.join(self._directory, key + '.json')
+        with open(lock_path, 'a') as lock_file:
+            os.utime(lock_path)
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                generation, _ = self.read_result(result_path)
+                self.wait_for_lock(lock_file, key)
+                new_generation, result = self.read_result(result_path)
+                if new_generation > generation:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+                    return result, True
+            try:
+                result = function()
+                generation, _ = self.read_result(result_path)
+                self.write_result(result_path, generation + 1, result)
+                return result, False
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def remove_expired_files(self) -> None:
+        ''' Delete the lock and result files not used for EXPIRY_TIMEOUTS timeouts. Deleting a lock file another
+        process is about to lock at worst lets two processes run the same search'''
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_expiry < self._timeout:
+                return
+            self._last_expiry = now
+        expired_before = time.time() - EXPIRY_TIMEOUTS * self._timeout
+        for name in os.listdir(self._directory):
+            path = os.path.join(self._directory, name)
+            try:
+                if os.path.getmtime(path) < expired_before:
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def wait_for_lock(self, lock_file, key: str) -> None:
+        deadline = time.monotonic() + self._timeout
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise CoalescingTimeout('search {0} still running after {1}s'.format(key, self._timeout))
+                time.sleep(0.05)
+
+    @staticmethod
+    def read_result(result_path: str) -> Tuple[int, dict]:
+        ''' Return (generation, result) of the last result written for a key, (0, None) if there is none'''
+        try:
+            with open(result_path) as result_file:
+                written = json.load(result_file)
+            return written['generation'], written['result']
+        except (OSError, ValueError, KeyError, TypeError):
+            return 0, None
+
+    @staticmethod
+    def write_result(result_path: str, generation: int, result: dict) -> None:
+        temporary_path = '{0}.{1}.tmp'.format(result_path, os.getpid())
+        with open(temporary_path, 'w') as result_file:
+            json.dump({'generation': generation, 'result': result}, result_file)
+        os.replace(temporary_path, result_path)
+
+
+_single_flight = None
+_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    ''' Return the process wide SingleFlight, sharing results through ENGINE_COALESCE_DIR
+    (a directory in the system temp dir by default) and waiting up to ENGINE_COALESCE_TIMEOUT seconds'''
+    global _single_flight
+    with _single_flight_lock:
+        if _single_flight is None:
+            directory = os.environ.get(DIRECTORY_VARIABLE) or os.path.join(tempfile.gettempdir(), 'engine-coalesce')
+            timeout = os.environ.get(TIMEOUT_VARIABLE)
+            _single_flight = SingleFlight(directory, float(timeout) if timeout else DEFAULT_TIMEOUT)
+        return _single_flight
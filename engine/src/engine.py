@@ -1,6 +1,14 @@
-from .board import *
-from .piece import *
+from .board import Board, BoardUtils, Move, MoveCode, MoveFactory, get_board_constructions
 from .player import Player
+from .fen import FenUtilities, FenError
+from .stats import SearchStats
+from .transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from .ordering import HistoryTable, KillerTable, staged_moves
+from .store import AnalysisStore, StoredAnalysis
+from . import profiling
+from collections import Counter
+from typing import Callable, Iterator, List, Tuple
+import time
 
 class BoardEvaluator:
     CHECK_BONUS = 50
@@ -43,209 +51,301 @@ class BoardEvaluator:
             total_value += piece.get_piece_value()
         return total_value
     
-# import time
+class SearchTimeout(Exception):
+    ''' Raised inside MiniMax to abandon the iteration running when the time limit is reached'''
+
+
 class MiniMax:
+    DRAW_SCORE = 0
+    FIFTY_MOVE_RULE_HALFMOVES = 100
     
-    def __init__(self, depth: int) -> None:
+    def __init__(self, depth: int, history: List[int] = None, transposition_table: TranspositionTable = None,
+                 time_limit: float = None, history_table: HistoryTable = None, multipv: int = 1,
+                 depth_listener: Callable[[dict], None] = None, node_limit: int = None) -> None:
+        ''' history: Zobrist hashes of the positions played before the searched one, oldest first
+            transposition_table: table to share with other searches, a private one is created by default
+            time_limit: seconds after which execute returns the best move of the last completed depth
+            history_table: quiet move ordering scores to share with other searches, a private one by default
+            multipv: number of best root moves to search lines for
+            depth_listener: called with the time_per_depth entry of every completed depth
+            node_limit: nodes after which execute returns the best move of the last completed depth'''
         self._depth = depth
+        self._multipv = multipv
+        self._depth_listener = depth_listener
+        self._lines = []
+        self._time_limit = time_limit
+        self._deadline = None
+        self._node_limit = node_limit
+        self._max_nodes = None
+        self._stopped = False
+        self._history_table = history_table if history_table is not None else HistoryTable()
+        self._killer_table = KillerTable()
+        self._root_depth = depth
         self._board_evaluator = BoardEvaluator()
+        self._game_counts = Counter(history or ())
+        self._position_counts = Counter()
+        # whether a score returned since the flag was last cleared depends on a repetition or the fifty-move rule
+        self._draw_influenced = False
+        self._transposition_table = transposition_table if transposition_table is not None else TranspositionTable()
+        self._stats = SearchStats()
+
+    def get_stats(self) -> SearchStats:
+        ''' Return statistics of the last execute'''
+        return self._stats
+
+    def get_lines(self) -> List[dict]:
+        ''' Return move, score and principal variation of the best multipv root moves of the last execute, best first'''
+        return self._lines
+
+    def is_draw(self, board: Board) -> bool:
+        ''' A position already seen on the current search path or twice in the game before it, or an exhausted
+        halfmove clock, is a draw. Checkmate is tested first by the caller: a mate on the last halfmove stands'''
+        position_hash = board.get_zobrist_hash()
+        return board.get_halfmove_clock() >= MiniMax.FIFTY_MOVE_RULE_HALFMOVES or \
+               self._position_counts[position_hash] > 0 or self._game_counts[position_hash] >= 2
+
+    def draw_score(self) -> int:
+        ''' Return the score of a drawn position, flagging the scores depending on it so they are not stored'''
+        self._draw_influenced = True
+        return MiniMax.DRAW_SCORE
+
+    def store(self, board: Board, depth: int, score: int, flag: int, move: int, outer_draw_influenced: bool) -> None:
+        ''' Store the result of a node unless a draw of its subtree made it, then let the flag reach the parent'''
+        if not self._draw_influenced:
+            self._transposition_table.store(board.get_zobrist_hash(), depth, score, flag, move)
+        self._draw_influenced = self._draw_influenced or outer_draw_influenced
+
+    def push_position(self, board: Board) -> None:
+        self._position_counts[board.get_zobrist_hash()] += 1
+
+    def pop_position(self, board: Board) -> None:
+        self._position_counts[board.get_zobrist_hash()] -= 1
+
+    def probe(self, board: Board, depth: int, alpha: int, beta: int):
+        ''' Return (score, hash move) from the transposition table, score is None when the entry can't end the search of this node.
+        Entries hold scores of the position alone: the score is not used when the fifty-move rule could end the game
+        within depth, and draw_influenced scores are never stored'''
+        self._stats.tt_probes += 1
+        entry = self._transposition_table.probe(board.get_zobrist_hash())
+        if entry is None:
+            return None, MoveCode.NULL_MOVE
+        self._stats.tt_hits += 1
+        _, entry_depth, score, flag, move = entry
+        if entry_depth >= depth and board.get_halfmove_clock() + depth < MiniMax.FIFTY_MOVE_RULE_HALFMOVES and \
+                (flag == EXACT or
+                 (flag == LOWER_BOUND and score >= beta) or
+                 (flag == UPPER_BOUND and score <= alpha)):
+            return score, move
+        return None, move
+
+    def ordered_moves(self, board: Board, hash_move: int, depth: int) -> Iterator[Move]:
+        ''' Return the staged move generator of the current player, the transposition table move first'''
+        move = MoveFactory.decode_move(board, hash_move) if hash_move != MoveCode.NULL_MOVE else None
+        return staged_moves(board, move, self._killer_table.get_killers(self._root_depth - depth), self._history_table)
+
+    def record_cutoff(self, move: Move, move_index: int, depth: int) -> None:
+        self._stats.record_cutoff(move_index)
+        if not move.is_attack():
+            self._history_table.record(move, depth)
+            self._killer_table.record(self._root_depth - depth, move)
+
+    def stop(self) -> None:
+        ''' Ask a running execute, from another thread, to return as soon as possible'''
+        self._stopped = True
+
+    def check_time(self) -> None:
+        if self._stopped or (self._deadline is not None and time.perf_counter() >= self._deadline) or \
+           (self._max_nodes is not None and self._stats.nodes >= self._max_nodes):
+            raise SearchTimeout()
+
+    def evaluate(self, board: Board, depth: int) -> int:
+        self._stats.leaf_evaluations += 1
+        return self._board_evaluator.evaluate(board, depth)
 
     def min(self, board: Board, depth: int, alpha: int, beta: int) -> int:
-        if depth == 0 or board.get_current_player().is_in_checkmate() or board.get_current_player().is_in_stalemate():
-            return self._board_evaluator.evaluate(board, depth)
+        self.check_time()
+        self._stats.nodes += 1
+        if board.get_current_player().is_in_checkmate():
+            return self.evaluate(board, depth)
+        if self.is_draw(board):
+            return self.draw_score()
+        if depth == 0 or board.get_current_player().is_in_stalemate():
+            return self.evaluate(board, depth)
+        score, hash_move = self.probe(board, depth, alpha, beta)
+        if score is not None:
+            return score
+        original_beta = beta
         lowest_seen_value = 500000000
-        for move in board.get_current_player().get_legal_moves():
+        best_move = MoveCode.NULL_MOVE
+        move_index = 0
+        outer_draw_influenced = self._draw_influenced
+        self._draw_influenced = False
+        self.push_position(board)
+        for move in self.ordered_moves(board, hash_move, depth):
             transition = board.get_current_player().make_move(move)
             if transition.get_move_status().is_done():
                 current_value = self.max(transition.get_transition_board(), depth - 1, alpha, beta)
-                lowest_seen_value = min(current_value, lowest_seen_value)
+                if current_value < lowest_seen_value:
+                    lowest_seen_value = current_value
+                    best_move = move.encode()
                 beta = min(beta, current_value)
                 if beta <= alpha:
+                    self.record_cutoff(move, move_index, depth)
                     break
+                move_index += 1
+        self.pop_position(board)
+        flag = UPPER_BOUND if lowest_seen_value <= alpha else LOWER_BOUND if lowest_seen_value >= original_beta else EXACT
+        self.store(board, depth, lowest_seen_value, flag, best_move, outer_draw_influenced)
         return lowest_seen_value
 
     def max(self, board: Board, depth: int, alpha: int, beta: int) -> int:
-        if depth == 0 or board.get_current_player().is_in_checkmate() or board.get_current_player().is_in_stalemate():
-            return self._board_evaluator.evaluate(board, depth)
+        self.check_time()
+        self._stats.nodes += 1
+        if board.get_current_player().is_in_checkmate():
+            return self.evaluate(board, depth)
+        if self.is_draw(board):
+            return self.draw_score()
+        if depth == 0 or board.get_current_player().is_in_stalemate():
+            return self.evaluate(board, depth)
+        score, hash_move = self.probe(board, depth, alpha, beta)
+        if score is not None:
+            return score
+        original_alpha = alpha
         highest_seen_value = -500000000
-        for move in board.get_current_player().get_legal_moves():
+        best_move = MoveCode.NULL_MOVE
+        move_index = 0
+        outer_draw_influenced = self._draw_influenced
+        self._draw_influenced = False
+        self.push_position(board)
+        for move in self.ordered_moves(board, hash_move, depth):
             transition = board.get_current_player().make_move(move)
             if transition.get_move_status().is_done():
                 current_value = self.min(transition.get_transition_board(), depth - 1, alpha, beta)
-                highest_seen_value = max(current_value, highest_seen_value)
+                if current_value > highest_seen_value:
+                    highest_seen_value = current_value
+                    best_move = move.encode()
                 alpha = max(alpha, current_value)
                 if beta <= alpha:
+                    self.record_cutoff(move, move_index, depth)
                     break
+                move_index += 1
+        self.pop_position(board)
+        flag = LOWER_BOUND if highest_seen_value >= beta else UPPER_BOUND if highest_seen_value <= original_alpha else EXACT
+        self.store(board, depth, highest_seen_value, flag, best_move, outer_draw_influenced)
         return highest_seen_value 
-    
-    def execute(self, board: Board) -> Move:
-        best_move = None
+
+    def search_root(self, board: Board, depth: int, hash_move: int, excluded_moves: List[int] = ()):
+        ''' Search every root move but the excluded ones to depth, return (best move code, its score)'''
+        self._stats.nodes += 1
+        best_move = MoveCode.NULL_MOVE
         highest_seen_value = -500000000
         lowest_seen_value = 500000000
-        current_value = None
-        #start = time.time()
-        print('Computer is thinking ...')
-        for move in board.get_current_player().get_legal_moves():
+        is_white = board.get_current_player().get_alliance().is_white()
+        self._root_depth = depth
+        self._draw_influenced = False
+        for move in self.ordered_moves(board, hash_move, depth):
+            if excluded_moves and move.encode() in excluded_moves:
+                continue
             transition = board.get_current_player().make_move(move)
             if transition.get_move_status().is_done():
-                current_value = self.min(transition.get_transition_board(), self._depth - 1, -50000000, 5000000) \
-                                if board.get_current_player().get_alliance().is_white() \
-                                else self.max(transition.get_transition_board(), self._depth - 1, -50000000, 5000000)
-                if board.get_current_player().get_alliance().is_white():
-                    highest_seen_value = max(current_value, highest_seen_value)
-                    best_move = move
-                elif board.get_current_player().get_alliance().is_black():
-                    lowest_seen_value = min(current_value, lowest_seen_value)
-                    best_move = move
-        # print(time.time() - start)
-        return best_move
-
-
-class FenUtilities:
-    @staticmethod
-    def create_game_from_fen(fen_str: str) -> Board:
-        return FenUtilities.parseFEN(fen_str)
-    
-    def create_fen_from_game(board: Board) -> str:
-        result = FenUtilities.calculate_board_text(board) + ' ' + \
-                 FenUtilities.calculate_player_text(board) + ' ' + \
-                 FenUtilities.calculate_castle_text(board) + ' ' + \
-                 FenUtilities.calculate_enpassant_square_text(board) + ' 0 1'
-        return result
+                current_value = self.min(transition.get_transition_board(), depth - 1, -50000000, 5000000) \
+                                if is_white \
+                                else self.max(transition.get_transition_board(), depth - 1, -50000000, 5000000)
+                if is_white:
+                    if current_value > highest_seen_value:
+                        highest_seen_value = current_value
+                        best_move = move.encode()
+                else:
+                    if current_value < lowest_seen_value:
+                        lowest_seen_value = current_value
+                        best_move = move.encode()
+        score = highest_seen_value if is_white else lowest_seen_value
+        if not excluded_moves:
+            self.store(board, depth, score, EXACT, best_move, False)
+        return best_move, score
 
-    @staticmethod
-    def parseFEN(fen_str: str) -> Board:
-        fen_partitions = fen_str.split(' ')
-        builder = BoardBuilder()
-        white_king_side_castle = FenUtilities.white_king_side_castle(fen_partitions[2])
-        white_queen_side_castle = FenUtilities.white_queen_side_castle(fen_partitions[2])
-        black_king_side_castle = FenUtilities.black_king_side_castle(fen_partitions[2])
-        black_queen_side_castle = FenUtilities.black_queen_side_castle(fen_partitions[2])
-        game_config = fen_partitions[0]
-        board_tiles = game_config.replace('/', '').\
-        replace('8', '--------').\
-        replace('7', '-------').\
-        replace('6', '------').\
-        replace('5', '-----').\
-        replace('4', '----').\
-        replace('3', '---').\
-        replace('2', '--').\
-        replace('1', '-')
-        i = 0
-        while i < len(board_tiles):
-            match board_tiles[i]:
-                case 'r':
-                    builder.set_piece(Rook(i, Alliance.BLACK, None));
-                    i += 1
-                case 'n':
-                    builder.set_piece(Knight(i, Alliance.BLACK, None));
-                    i += 1
-                case 'b':
-                    builder.set_piece(Bishop(i, Alliance.BLACK, None));
-                    i += 1
-                case 'q':
-                    builder.set_piece(Queen(i, Alliance.BLACK, None));
-                    i += 1
-                case 'k':
-                    builder.set_piece(King(i, Alliance.BLACK, None, black_king_side_castle, black_queen_side_castle))
-                    i += 1
-                case 'p':
-                    builder.set_piece(Pawn(i, Alliance.BLACK, None));
-                    i += 1
-                case 'R':
-                    builder.set_piece(Rook(i, Alliance.WHITE, None));
-                    i += 1
-                case 'N':
-                    builder.set_piece(Knight(i, Alliance.WHITE, None));
-                    i += 1
-                case 'B':
-                    builder.set_piece(Bishop(i, Alliance.WHITE, None));
-                    i += 1
-                case 'Q':
-                    builder.set_piece(Queen(i, Alliance.WHITE, None));
-                    i += 1
-                case 'K':
-                    builder.set_piece(King(i, Alliance.WHITE, None, white_king_side_castle, white_queen_side_castle))
-                    i += 1
-                case 'P':
-                    builder.set_piece(Pawn(i, Alliance.WHITE, None));
-                    i += 1
-                case '-':
-                    i += 1
-        builder.set_move_maker(FenUtilities.move_maker(fen_partitions[1]))
-        return builder.build()
+    def search_lines(self, board: Board, depth: int, previous_moves: List[int]) -> List[Tuple[int, int]]:
+        ''' Return (move code, score) of the best multipv root moves, each searched with the better ones excluded.
+        The excluded searches share the transposition table, so they mostly replay stored subtrees'''
+        lines = []
+        for index in range(self._multipv):
+            hash_move = previous_moves[index] if index < len(previous_moves) else MoveCode.NULL_MOVE
+            move, score = self.search_root(board, depth, hash_move, [line_move for line_move, _ in lines])
+            if move == MoveCode.NULL_MOVE:
+                break
+            lines.append((move, score))
+        return lines
 
+    def principal_variation(self, board: Board, best_move: int) -> List[str]:
+        ''' Follow best moves stored in the transposition table from board'''
+        variation = []
+        seen = set()
+        move_code = best_move
+        while move_code != MoveCode.NULL_MOVE and len(variation) < self._depth:
+            move = MoveFactory.decode_move(board, move_code)
+            if move is None:
+                break
+            transition = board.get_current_player().make_move(move)
+            if not transition.get_move_status().is_done():
+                break
+            variation.append(move.get_notation())
+            board = transition.get_transition_board()
+            if board.get_zobrist_hash() in seen:
+                break
+            seen.add(board.get_zobrist_hash())
+            entry = self._transposition_table.probe(board.get_zobrist_hash())
+            move_code = entry[4] if entry is not None else MoveCode.NULL_MOVE
+        return variation
+    
+    def execute(self, board: Board) -> Move:
+        ''' Search depth 1, 2, ... up to the configured depth, each iteration ordering moves by the previous one.
+        Depth 1 always completes unless stopped, a later iteration cut by the time or node limit or stop is discarded.
+        Return None when stopped before depth 1 completed'''
+        self._stats = SearchStats()
+        self._killer_table.clear()
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        board_constructions = get_board_constructions()
+        best_move = MoveCode.NULL_MOVE
+        lines = []
+        self._deadline = None
+        self._max_nodes = None
+        position_counts = Counter(self._position_counts)
+        self.push_position(board)
+        for depth in range(1, self._depth + 1):
+            depth_start = time.perf_counter()
+            nodes = self._stats.nodes
+            try:
+                lines = self.search_lines(board, depth, [line_move for line_move, _ in lines])
+            except SearchTimeout:
+                self._stats.timed_out = True
+                break
+            if not lines:
+                break
+            best_move, score = lines[0]
+            move = MoveFactory.decode_move(board, best_move)
+            self._stats.record_depth(depth, time.perf_counter() - depth_start, self._stats.nodes - nodes,
+                                     move.get_notation() if move is not None else None, score)
+            if self._depth_listener is not None:
+                self._depth_listener(self._stats.time_per_depth[-1])
+            if self._time_limit is not None:
+                self._deadline = start + self._time_limit
+            self._max_nodes = self._node_limit
+        self._deadline = None
+        self._max_nodes = None
+        self._position_counts = position_counts
+        self._stats.board_constructions = get_board_constructions() - board_constructions
+        self._stats.seconds = time.perf_counter() - start
+        self._stats.cpu_seconds = time.thread_time() - cpu_start
+        self._stats.principal_variation = self.principal_variation(board, best_move)
+        self._lines = [{'move': MoveFactory.decode_move(board, line_move).get_notation(),
+                        'score': score,
+                        'principal_variation': self.principal_variation(board, line_move)}
+                       for line_move, score in lines]
+        return MoveFactory.decode_move(board, best_move)
 
-    @staticmethod
-    def white_king_side_castle(fen_castle: str) -> bool:
-        return 'K' in fen_castle
-    @staticmethod
-    def white_queen_side_castle(fen_castle: str) -> bool:
-        return 'Q' in fen_castle
-    @staticmethod
-    def black_king_side_castle(fen_castle: str) -> bool:
-        return 'k' in fen_castle 
-    @staticmethod
-    def black_queen_side_castle(fen_castle: str) -> bool:
-        return 'q' in fen_castle
-    @staticmethod
-    def move_maker(fen_move_maker: str) -> Alliance:
-        if fen_move_maker == 'w':
-            return Alliance.WHITE
-        elif fen_move_maker == 'b':
-            return Alliance.BLACK
-        else:
-            raise RuntimeError()
-        
-    @staticmethod
-    def calculate_board_text(board: Board) -> str:
-        board_text = ''
-        for i in range(0, BoardUtils.NUMBER_TILES):
-            tile_text = str(board.get_tile(i))
-            board_text += tile_text
-        board_text = FenUtilities.insert(board_text, 8)
-        board_text = FenUtilities.insert(board_text, 17)
-        board_text = FenUtilities.insert(board_text, 26)
-        board_text = FenUtilities.insert(board_text, 35)
-        board_text = FenUtilities.insert(board_text, 44)
-        board_text = FenUtilities.insert(board_text, 53)
-        board_text = FenUtilities.insert(board_text, 62)
-        board_text = board_text.replace('--------', '8').\
-                   replace('-------', '7').\
-                   replace('------', '6').\
-                   replace('-----', '5').\
-                   replace('----', '4').\
-                   replace('---', '3').\
-                   replace('--', '2').\
-                   replace('-', '1')
-        return board_text                                      
-    @staticmethod
-    def insert(text, offset) -> str:
-        return text[:offset] + '/' + text[offset:]
-    @staticmethod
-    def calculate_player_text(board: Board) -> str:
-        return board.get_current_player().get_alliance().value.lower()
-    @staticmethod
-    def calculate_enpassant_square_text(board: Board) -> str:
-        enpassant_pawn = board.get_enpassant_pawn()
-        if enpassant_pawn:
-            return BoardUtils.get_position_at_coordinate(enpassant_pawn.get_position() + enpassant_pawn.get_alliance().get_opposite_direction() * 8)
-        return '-'
-    @staticmethod
-    def calculate_castle_text(board: Board) -> str:
-        castle_text = ''
-        if board.get_white_player().is_king_side_castle_capable():
-            castle_text += 'K'
-        if board.get_white_player().is_queen_side_castle_capable():
-            castle_text += 'Q'
-        if board.get_black_player().is_king_side_castle_capable():
-            castle_text += 'k'
-        if board.get_black_player().is_queen_side_castle_capable():
-            castle_text += 'q'
-        return '-' if castle_text == '' else castle_text
 
 # if __name__ == '__main__':
-#     BoardUtils.init()
 #     board = Board.create_standard_board()
 #     move = MoveFactory.create_move(board, 48, 32)
 #     trans = board.get_current_player().make_move(move)
@@ -261,14 +361,132 @@ class FenUtilities:
 #     print(FenUtilities.create_fen_from_game(board))
 
 
-def generate_next_move(fen, depth=3) -> dict:
-    '''Return a string represents the next move that current player in FEN string should make and the fen after make that move'''
-    BoardUtils.init()
+class IllegalMoveError(ValueError):
+    ''' Raised when a move of a game history is malformed or illegal.
+        index: position of the move in the move list'''
+    def __init__(self, index: int, move: str) -> None:
+        super().__init__('illegal move {0!r} at index {1}'.format(move, index))
+        self.index = index
+        self.move = move
+
+    def to_dict(self) -> dict:
+        return {'index': self.index, 'move': self.move, 'message': 'illegal move'}
+
+
+def replay_game(fen: str, moves: List[str] = None, history: List[str] = None):
+    ''' Return the board reached by playing moves from fen, and the Zobrist hashes of
+    the positions that came before it: the FENs in history followed by each replayed position'''
+    position_hashes = [FenUtilities.create_game_from_fen(previous_fen).get_zobrist_hash() for previous_fen in history or ()]
     board = FenUtilities.create_game_from_fen(fen)
+    for index, notation in enumerate(moves or ()):
+        move = MoveFactory.create_move_from_notation(board, notation)
+        if move is None:
+            raise IllegalMoveError(index, notation)
+        transition = board.get_current_player().make_move(move)
+        if not transition.get_move_status().is_done():
+            raise IllegalMoveError(index, notation)
+        position_hashes.append(board.get_zobrist_hash())
+        board = transition.get_transition_board()
+    return board, position_hashes
+
+
+def lookup_analysis(board: Board, depth: int, analysis_store: AnalysisStore):
+    ''' Return (stored analysis, its move on board) of board searched to depth or deeper, (None, None) without one'''
+    analysis = analysis_store.lookup(board.get_zobrist_hash(), depth)
+    if analysis is None:
+        return None, None
+    move = MoveFactory.create_move_from_notation(board, analysis.get_best_move())
+    if move is None or not board.get_current_player().make_move(move).get_move_status().is_done():
+        return None, None
+    return analysis, move
+
+
+def can_use_store(board: Board, depth: int, position_hashes, multipv: int) -> bool:
+    ''' Tell whether the result of a search depends on the position alone, so an AnalysisStore can answer and keep it'''
+    return multipv == 1 and not position_hashes and \
+        board.get_halfmove_clock() + depth < MiniMax.FIFTY_MOVE_RULE_HALFMOVES
+
+
+def get_game_over(board: Board) -> str:
+    ''' Return 'checkmate' or 'stalemate' when the side to move has no legal move, None otherwise'''
+    player = board.get_current_player()
+    if player.is_in_checkmate():
+        return 'checkmate'
+    if player.is_in_stalemate():
+        return 'stalemate'
+    return None
+
+
+def game_over_result(board: Board, depth: int) -> dict:
+    ''' Return the generate_next_move result of a position without legal moves: game_over and no move'''
+    return {'game_over': get_game_over(board),
+            'fen_board': FenUtilities.create_fen_from_game(board),
+            'player': str(board.get_current_player()),
+            'depth': str(depth)}
+
+
+def stored_next_move(fen, depth=3, moves=None, history=None, multipv=1, analysis_store=None) -> dict:
+    '''Return the generate_next_move result of a position analysis_store has searched to depth or deeper,
+    None when it has to be searched'''
+    if analysis_store is None:
+        return None
+    board, position_hashes = replay_game(fen, moves, history)
+    if not can_use_store(board, depth, position_hashes, multipv):
+        return None
+    analysis, move = lookup_analysis(board, depth, analysis_store)
+    if analysis is None:
+        return None
+    stats = SearchStats()
+    stats.from_store = True
+    stats.completed_depth = analysis.get_depth()
+    stats.principal_variation = analysis.get_principal_variation()
+    lines = [{'move': analysis.get_best_move(),
+              'score': analysis.get_score(),
+              'principal_variation': analysis.get_principal_variation()}]
+    return next_move_result(board, move, depth, stats, lines)
+
+
+def generate_next_move(fen, depth=3, moves=None, history=None, profile=None, time_limit=None, multipv=1,
+                       depth_listener=None, analysis_store=None, transposition_table=None, store_lookup=True) -> dict:
+    '''Return a string represents the next move that current player in FEN string should make and the fen after make that move
+        moves (optional): moves in coordinate notation (e2e4, e7e8q) played from fen before searching
+        history (optional): FENs of the positions played before fen, used to detect repetitions
+        profile (optional): 'aggregate' or 'cprofile' to profile the search, defaults to the ENGINE_PROFILE env var
+        time_limit (optional): seconds after which the best move of the last completed depth is returned
+        multipv (optional): number of best moves to return with their scores and principal variations
+        depth_listener (optional): called with depth, seconds, nodes, best move and score of every completed depth
+        analysis_store (optional): AnalysisStore answering positions already searched deep enough, and keeping
+            new results. Only used for single line searches without game history, whose result depends on the
+            position alone
+        transposition_table (optional): table shared with other searches, a private one by default
+        store_lookup (optional): False when the caller already looked the position up with stored_next_move,
+            analysis_store then only keeps the result
+    A position without legal moves gives game_over_result, with game_over and no move'''
+    if store_lookup:
+        stored = stored_next_move(fen, depth, moves, history, multipv, analysis_store)
+        if stored is not None:
+            return stored
+    board, position_hashes = replay_game(fen, moves, history)
+    if get_game_over(board) is not None:
+        return game_over_result(board, depth)
+    use_store = analysis_store is not None and can_use_store(board, depth, position_hashes, multipv)
+    minimax = MiniMax(depth, position_hashes, transposition_table, time_limit=time_limit, multipv=multipv,
+                      depth_listener=depth_listener)
+    with profiling.profiled(profiling.get_profile_mode(profile)) as profiler:
+        move = minimax.execute(board)
+    stats = minimax.get_stats()
+    if use_store and stats.get_completed_depth() > 0:
+        analysis_store.save(StoredAnalysis(board.get_zobrist_hash(), stats.get_completed_depth(),
+                                           stats.time_per_depth[-1]['score'], move.get_notation(),
+                                           stats.principal_variation),
+                            FenUtilities.create_fen_from_game(board))
+    return next_move_result(board, move, depth, stats, minimax.get_lines(), profiler)
+
+
+def next_move_result(board: Board, move: Move, depth: int, stats: SearchStats, lines: list, profiler=None) -> dict:
+    ''' Return the generate_next_move result of playing move on board'''
     player = board.get_current_player()
-    minimax = MiniMax(depth)
-    move = minimax.execute(board)
-    transition_board = board.get_current_player().make_move(move)
+    transition_board = player.make_move(move)
     if transition_board.get_move_status().is_done():
         board = transition_board.get_transition_board()
     return {'moved_piece': str(move.get_moved_piece()),
@@ -276,40 +494,7 @@ def generate_next_move(fen, depth=3) -> dict:
             'to': BoardUtils.get_position_at_coordinate(move.get_destination_coordinate()),
             'fen_board': FenUtilities.create_fen_from_game(board),
             'player': str(player),
-            'depth': str(depth)}
-
-import re
-def fenPass(fen):
-    regexMatch=re.match('\s*^(((?:[rnbqkpRNBQKP1-8]+\/){7})[rnbqkpRNBQKP1-8]+)\s([b|w])\s([K|Q|k|q]{1,4})\s(-|[a-h][1-8])\s(\d+\s\d+)$', fen)
-    if  regexMatch:
-        regexList = regexMatch.groups()
-        fen = regexList[0].split("/")
-        if len(fen) != 8:
-            raise ValueError("expected 8 rows in position part of fen: {0}".format(repr(fen)))
-
-        for fenPart in fen:
-            field_sum = 0
-            previous_was_digit, previous_was_piece = False,False
-
-            for c in fenPart:
-                if c in ["1", "2", "3", "4", "5", "6", "7", "8"]:
-                    if previous_was_digit:
-                        raise ValueError("two subsequent digits in position part of fen: {0}".format(repr(fen)))
-                    field_sum += int(c)
-                    previous_was_digit = True
-                    previous_was_piece = False
-                elif c == "~":
-                    if not previous_was_piece:
-                        raise ValueError("~ not after piece in position part of fen: {0}".format(repr(fen)))
-                    previous_was_digit, previous_was_piece = False,False
-                elif c.lower() in ["p", "n", "b", "r", "q", "k"]:
-                    field_sum += 1
-                    previous_was_digit = False
-                    previous_was_piece = True
-                else:
-                    raise ValueError("invalid character in position part of fen: {0}".format(repr(fen)))
-
-            if field_sum != 8:
-                raise ValueError("expected 8 columns per row in position part of fen: {0}".format(repr(fen)))  
-
-    else: raise ValueError("fen doesn`t match follow this example: rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1 ")  
+            'depth': str(depth),
+            'stats': stats.to_dict(),
+            'lines': lines,
+            'profile': profiler.report() if profiler is not None else None}
@@ -0,0 +1,215 @@
+from .alliance import Alliance
+from .board import Board, BoardBuilder, BoardUtils
+from .piece import Rook, Knight, Bishop, Queen, King, Pawn
+
+
+class FenError(ValueError):
+    ''' Raised when a FEN string is malformed.
+        field: name of the FEN field that failed to parse
+        index: offset of the offending character in the FEN string'''
+    def __init__(self, field: str, index: int, message: str) -> None:
+        super().__init__('{0} (field: {1}, index: {2})'.format(message, field, index))
+        self.field = field
+        self.index = index
+        self.message = message
+
+    def to_dict(self) -> dict:
+        return {'field': self.field, 'index': self.index, 'message': self.message}
+
+
+class FenUtilities:
+    PIECES = {'r': (Rook, Alliance.BLACK), 'n': (Knight, Alliance.BLACK), 'b': (Bishop, Alliance.BLACK),
+              'q': (Queen, Alliance.BLACK), 'k': (King, Alliance.BLACK), 'p': (Pawn, Alliance.BLACK),
+              'R': (Rook, Alliance.WHITE), 'N': (Knight, Alliance.WHITE), 'B': (Bishop, Alliance.WHITE),
+              'Q': (Queen, Alliance.WHITE), 'K': (King, Alliance.WHITE), 'P': (Pawn, Alliance.WHITE)}
+    CASTLE_FLAGS = 'KQkq'
+    STANDARD_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+    @staticmethod
+    def create_game_from_fen(fen_str: str) -> Board:
+        return FenUtilities.parseFEN(fen_str)
+
+    @staticmethod
+    def create_fen_from_game(board: Board) -> str:
+        result = FenUtilities.calculate_board_text(board) + ' ' + \
+                 FenUtilities.calculate_player_text(board) + ' ' + \
+                 FenUtilities.calculate_castle_text(board) + ' ' + \
+                 FenUtilities.calculate_enpassant_square_text(board) + ' ' + \
+                 str(board.get_halfmove_clock()) + ' ' + \
+                 str(board.get_fullmove_number())
+        return result
+
+    @staticmethod
+    def parseFEN(fen_str: str) -> Board:
+        ''' Validate a FEN string and build its board in a single pass, raise FenError when it is malformed'''
+        if not isinstance(fen_str, str):
+            raise FenError('placement', 0, 'FEN must be a string')
+        builder = BoardBuilder()
+        fields = FenUtilities.split_fields(fen_str)
+        if len(fields) not in (4, 6):
+            raise FenError('placement', 0, 'expected 6 space separated fields, got {0}'.format(len(fields)))
+
+        placement, placement_index = fields[0]
+        coordinate = 0
+        row_start = 0
+        previous_was_digit = False
+        kings = {}
+        for offset, char in enumerate(placement):
+            if char == '/':
+                if coordinate - row_start != BoardUtils.NUMBER_TILES_PER_ROW:
+                    raise FenError('placement', placement_index + offset, 'expected 8 columns per row')
+                if coordinate == BoardUtils.NUMBER_TILES:
+                    raise FenError('placement', placement_index + offset, 'expected 8 rows')
+                row_start = coordinate
+                previous_was_digit = False
+            elif '1' <= char <= '8':
+                if previous_was_digit:
+                    raise FenError('placement', placement_index + offset, 'two subsequent digits')
+                coordinate += ord(char) - ord('0')
+                previous_was_digit = True
+            elif char in FenUtilities.PIECES:
+                piece_class, alliance = FenUtilities.PIECES[char]
+                if piece_class is King:
+                    if alliance in kings:
+                        raise FenError('placement', placement_index + offset, 'more than one {0} king'.format(alliance.name.lower()))
+                    kings[alliance] = coordinate
+                else:
+                    builder.set_piece(piece_class.create(coordinate, alliance, None))
+                coordinate += 1
+                previous_was_digit = False
+            else:
+                raise FenError('placement', placement_index + offset, 'invalid character {0!r}'.format(char))
+            if coordinate - row_start > BoardUtils.NUMBER_TILES_PER_ROW:
+                raise FenError('placement', placement_index + offset, 'expected 8 columns per row')
+        if coordinate != BoardUtils.NUMBER_TILES or row_start != BoardUtils.NUMBER_TILES - BoardUtils.NUMBER_TILES_PER_ROW:
+            raise FenError('placement', placement_index + len(placement), 'expected 8 rows of 8 columns')
+        for alliance in (Alliance.WHITE, Alliance.BLACK):
+            if alliance not in kings:
+                raise FenError('placement', placement_index, 'missing {0} king'.format(alliance.name.lower()))
+
+        player, player_index = fields[1]
+        builder.set_move_maker(FenUtilities.move_maker(player, player_index))
+
+        castle, castle_index = fields[2]
+        FenUtilities.validate_castle_text(castle, castle_index)
+        builder.set_piece(King.create(kings[Alliance.WHITE], Alliance.WHITE, None,
+                                      FenUtilities.white_king_side_castle(castle),
+                                      FenUtilities.white_queen_side_castle(castle)))
+        builder.set_piece(King.create(kings[Alliance.BLACK], Alliance.BLACK, None,
+                                      FenUtilities.black_king_side_castle(castle),
+                                      FenUtilities.black_queen_side_castle(castle)))
+
+        enpassant, enpassant_index = fields[3]
+        if enpassant != '-':
+            builder.set_enpassant_pawn(FenUtilities.enpassant_pawn(builder, enpassant, enpassant_index))
+
+        clocks = [0, 1]
+        for i, (name, (clock, clock_index)) in enumerate(zip(('halfmove_clock', 'fullmove_number'), fields[4:])):
+            if not clock.isdigit():
+                raise FenError(name, clock_index, 'expected a non negative integer')
+            clocks[i] = int(clock)
+        builder.set_halfmove_clock(clocks[0])
+        builder.set_fullmove_number(clocks[1])
+        return builder.build()
+
+    @staticmethod
+    def split_fields(fen_str: str):
+        ''' Return (field, index of its first character) for each space separated field'''
+        fields = []
+        start = None
+        for index, char in enumerate(fen_str):
+            if char.isspace():
+                if start is not None:
+                    fields.append((fen_str[start:index], start))
+                    start = None
+            elif start is None:
+                start = index
+        if start is not None:
+            fields.append((fen_str[start:], start))
+        return fields
+
+    @staticmethod
+    def enpassant_pawn(builder: BoardBuilder, fen_enpassant: str, index: int) -> Pawn:
+        ''' Return the pawn that just jumped over the en passant square'''
+        if len(fen_enpassant) != 2 or fen_enpassant[0] not in 'abcdefgh' or fen_enpassant[1] not in '36':
+            raise FenError('en_passant', index, 'expected - or a square on the 3rd or 6th rank')
+        square = BoardUtils.get_coordinate_at_position(fen_enpassant)
+        alliance = Alliance.WHITE if fen_enpassant[1] == '3' else Alliance.BLACK
+        pawn = builder.get_piece(square + alliance.get_direction() * 8)
+        if not isinstance(pawn, Pawn) or pawn.get_alliance() != alliance:
+            raise FenError('en_passant', index, 'no pawn to capture en passant')
+        return pawn
+
+    @staticmethod
+    def validate_castle_text(fen_castle: str, index: int) -> None:
+        if fen_castle == '-':
+            return
+        seen = ''
+        for offset, char in enumerate(fen_castle):
+            if char not in FenUtilities.CASTLE_FLAGS or char in seen:
+                raise FenError('castling', index + offset, 'expected - or distinct letters of KQkq')
+            seen += char
+
+    @staticmethod
+    def white_king_side_castle(fen_castle: str) -> bool:
+        return 'K' in fen_castle
+    @staticmethod
+    def white_queen_side_castle(fen_castle: str) -> bool:
+        return 'Q' in fen_castle
+    @staticmethod
+    def black_king_side_castle(fen_castle: str) -> bool:
+        return 'k' in fen_castle
+    @staticmethod
+    def black_queen_side_castle(fen_castle: str) -> bool:
+        return 'q' in fen_castle
+    @staticmethod
+    def move_maker(fen_move_maker: str, index: int = 0) -> Alliance:
+        if fen_move_maker == 'w':
+            return Alliance.WHITE
+        elif fen_move_maker == 'b':
+            return Alliance.BLACK
+        else:
+            raise FenError('active_color', index, 'expected w or b')
+
+    @staticmethod
+    def calculate_board_text(board: Board) -> str:
+        ''' Write the piece placement field in one pass over the tiles'''
+        parts = []
+        empty_tiles = 0
+        for i in range(0, BoardUtils.NUMBER_TILES):
+            piece = board.get_tile(i).get_piece()
+            if piece is None:
+                empty_tiles += 1
+            else:
+                if empty_tiles:
+                    parts.append(str(empty_tiles))
+                    empty_tiles = 0
+                parts.append(str(piece))
+            if i % BoardUtils.NUMBER_TILES_PER_ROW == 7:
+                if empty_tiles:
+                    parts.append(str(empty_tiles))
+                    empty_tiles = 0
+                if i != BoardUtils.NUMBER_TILES - 1:
+                    parts.append('/')
+        return ''.join(parts)
+    @staticmethod
+    def calculate_player_text(board: Board) -> str:
+        return board.get_current_player().get_alliance().value.lower()
+    @staticmethod
+    def calculate_enpassant_square_text(board: Board) -> str:
+        enpassant_pawn = board.get_enpassant_pawn()
+        if enpassant_pawn:
+            return BoardUtils.get_position_at_coordinate(enpassant_pawn.get_position() + enpassant_pawn.get_alliance().get_opposite_direction() * 8)
+        return '-'
+    @staticmethod
+    def calculate_castle_text(board: Board) -> str:
+        castle_text = ''
+        if board.get_white_player().is_king_side_castle_capable():
+            castle_text += 'K'
+        if board.get_white_player().is_queen_side_castle_capable():
+            castle_text += 'Q'
+        if board.get_black_player().is_king_side_castle_capable():
+            castle_text += 'k'
+        if board.get_black_player().is_queen_side_castle_capable():
+            castle_text += 'q'
+        return '-' if castle_text == '' else castle_text
@@ -0,0 +1,198 @@
+'''In-process metrics rendered in the Prometheus text exposition format.
+
+Every process keeps its own values, so with several server processes each one is scraped on its own.
+'''
+import threading
+from typing import Callable, Dict, List, Tuple
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def format_labels(labelnames: Tuple[str, ...], labelvalues: Tuple[str, ...], extra: str = '') -> str:
+    pairs = ['{0}="{1}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+             for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    TYPE = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> None:
+        self._name = name
+        self._documentation = documentation
+        self._labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def get_name(self) -> str:
+        return self._name
+
+    def label_values(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self._labelnames):
+            raise ValueError('{0} expects labels {1}, got {2}'.format(self._name, self._labelnames, tuple(labels)))
+        return tuple(str(labels[name]) for name in self._labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def expose(self) -> str:
+        lines = ['# HELP {0} {1}'.format(self._name, self._documentation),
+                 '# TYPE {0} {1}'.format(self._name, self.TYPE)]
+        lines += self.samples()
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        if amount < 0:
+            raise ValueError('counters only go up')
+        key = self.label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self.label_values(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self._labelnames:
+            values = [((), 0)]
+        return ['{0}{1} {2}'.format(self._name, format_labels(self._labelnames, key), format_value(value))
+                for key, value in values]
+
+
+class Gauge(Metric):
+    ''' A value set directly, or read from a function when the metrics are exposed'''
+    TYPE = 'gauge'
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float] = None) -> None:
+        super().__init__(name, documentation)
+        self._value = 0
+        self._function = function
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._function = function
+
+    def get(self) -> float:
+        return self._function() if self._function is not None else self._value
+
+    def samples(self) -> List[str]:
+        return ['{0} {1}'.format(self._name, format_value(self.get()))]
+
+
+class Histogram(Metric):
+    TYPE = 'histogram'
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._counts = {}
+        self._sums = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self.label_values(labels)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self._buckets))
+            for index, bound in enumerate(self._buckets):
+                if value <= bound:
+                    counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0.0) + value
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            values = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        for key, counts, total in values:
+            for bound, count in zip(self._buckets, counts):
+                bucket = 'le="{0}"'.format(format_value(bound))
+                lines.append('{0}_bucket{1} {2}'.format(self._name, format_labels(self._labelnames, key, bucket), count))
+            labels = format_labels(self._labelnames, key)
+            lines.append('{0}_sum{1} {2}'.format(self._name, labels, format_value(total)))
+            lines.append('{0}_count{1} {2}'.format(self._name, labels, counts[-1]))
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.get_name() in self._metrics:
+            raise ValueError('metric {0} already registered'.format(metric.get_name()))
+        self._metrics[metric.get_name()] = metric
+        return metric
+
+    def get(self, name: str) -> Metric:
+        return self._metrics.get(name)
+
+    def expose(self) -> str:
+        return '\n'.join(metric.expose() for metric in self._metrics.values()) + '\n'
+
+
+REGISTRY = Registry()
+
+SEARCH_SECONDS = REGISTRY.register(Histogram(
+    'engine_search_seconds', 'Wall time of a search by requested depth', ('depth',),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)))
+SEARCHES = REGISTRY.register(Counter(
+    'engine_searches_total', 'Searches completed by requested depth', ('depth',)))
+NODES_SEARCHED = REGISTRY.register(Counter(
+    'engine_nodes_searched_total', 'Nodes visited by all searches'))
+TT_HITS = REGISTRY.register(Counter(
+    'engine_tt_hits_total', 'Transposition table probes that found the position'))
+TT_MISSES = REGISTRY.register(Counter(
+    'engine_tt_misses_total', 'Transposition table probes that did not find the position'))
+TIMEOUTS = REGISTRY.register(Counter(
+    'engine_search_timeouts_total', 'Searches stopped by their time limit before the requested depth'))
+COALESCED_SEARCHES = REGISTRY.register(Counter(
+    'engine_coalesced_searches_total', 'Requests answered by the result of an identical concurrent search'))
+DEGRADED_SEARCHES = REGISTRY.register(Counter(
+    'engine_degraded_searches_total', 'Searches run at a lower depth or time limit than requested because of load'))
+SHED_REQUESTS = REGISTRY.register(Counter(
+    'engine_shed_requests_total', 'Requests refused with 503 because of load'))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    'engine_search_queue_depth', 'Searches waiting for a free worker'))
+WORKERS = REGISTRY.register(Gauge(
+    'engine_workers', 'Search worker threads'))
+WORKERS_BUSY = REGISTRY.register(Gauge(
+    'engine_workers_busy', 'Search worker threads running a search'))
+WORKER_UTILIZATION = REGISTRY.register(Gauge(
+    'engine_worker_utilization', 'Fraction of search worker threads running a search'))
+
+
+def observe_search(depth: int, stats: dict) -> None:
+    ''' Feed the statistics dict of one search, as returned by generate_next_move'''
+    SEARCHES.inc(depth=depth)
+    SEARCH_SECONDS.observe(stats['seconds'], depth=depth)
+    NODES_SEARCHED.inc(stats['nodes'])
+    TT_HITS.inc(stats['tt_hits'])
+    TT_MISSES.inc(stats['tt_probes'] - stats['tt_hits'])
+    if stats['timed_out']:
+        TIMEOUTS.inc()
+
+
+def observe_pool(pool) -> None:
+    ''' Read the worker gauges from pool whenever the metrics are exposed'''
+    QUEUE_DEPTH.set_function(pool.get_queue_depth)
+    WORKERS.set_function(pool.get_workers)
+    WORKERS_BUSY.set_function(pool.get_busy_workers)
+    WORKER_UTILIZATION.set_function(pool.get_utilization)
@@ -0,0 +1,102 @@
+'''Move ordering tables kept across the nodes of a search, and across searches of one game.'''
+from typing import Iterator, Tuple
+
+from .board import Board, Move, MoveFactory
+
+
+class HistoryTable:
+    ''' Quiet moves that produced cutoffs, weighted by remaining depth squared and keyed by from and to square'''
+    MAXIMUM_SCORE = 1 << 20
+
+    def __init__(self) -> None:
+        self._scores = [0] * 4096
+
+    def record(self, move: Move, depth: int) -> None:
+        index = move.get_current_coordinate() * 64 + move.get_destination_coordinate()
+        self._scores[index] += depth * depth
+        if self._scores[index] > HistoryTable.MAXIMUM_SCORE:
+            self.age()
+
+    def get_score(self, move: Move) -> int:
+        return self._scores[move.get_current_coordinate() * 64 + move.get_destination_coordinate()]
+
+    def age(self) -> None:
+        ''' Halve every score so older cutoffs weigh less than recent ones'''
+        self._scores = [score >> 1 for score in self._scores]
+
+    def clear(self) -> None:
+        self._scores = [0] * 4096
+
+
+class KillerTable:
+    ''' The last two quiet moves that produced a cutoff at each ply, as MoveCode ints'''
+    SLOTS = 2
+
+    def __init__(self) -> None:
+        self._killers = []
+
+    def record(self, ply: int, move: Move) -> None:
+        while len(self._killers) <= ply:
+            self._killers.append(())
+        code = move.encode()
+        killers = self._killers[ply]
+        if code not in killers:
+            self._killers[ply] = ((code,) + killers)[:KillerTable.SLOTS]
+
+    def get_killers(self, ply: int) -> Tuple[int, ...]:
+        return self._killers[ply] if ply < len(self._killers) else ()
+
+    def clear(self) -> None:
+        self._killers = []
+
+
+def capture_score(move: Move) -> int:
+    ''' Most valuable victim first, least valuable attacker breaking ties'''
+    return move.get_attacked_piece().get_piece_value() * 16 - move.get_moved_piece().get_piece_value() // 100
+
+
+def is_losing_capture(move: Move) -> bool:
+    ''' A capture by a more valuable piece, which loses material if the victim is defended. King captures are
+    never losing, a legal one takes an undefended piece'''
+    moved_piece = move.get_moved_piece()
+    return not moved_piece.get_piece_type().is_king() and \
+           move.get_attacked_piece().get_piece_value() < moved_piece.get_piece_value()
+
+
+def staged_moves(board: Board, hash_move: Move = None, killers: Tuple[int, ...] = (),
+                 history_table: HistoryTable = None) -> Iterator[Move]:
+    ''' Yield the legal moves of the current player stage by stage: hash move, captures winning or trading material
+    (and queen promotions), killers, quiet moves by history score, then captures by a more valuable piece.
+    A stage is sorted only when the ones before it are exhausted, so a cutoff skips the ordering work left'''
+    if hash_move is not None:
+        yield hash_move
+    legal_moves = board.get_current_player().get_legal_moves()
+    captures = []
+    quiets = []
+    for move in legal_moves:
+        if move is hash_move:
+            continue
+        if move.is_attack():
+            captures.append(move)
+        elif move.get_promotion_piece() == 'Q':
+            captures.insert(0, move)
+        else:
+            quiets.append(move)
+    losing_captures = []
+    for move in sorted(captures, key=lambda move: capture_score(move) if move.is_attack() else 1 << 20, reverse=True):
+        if move.is_attack() and is_losing_capture(move):
+            losing_captures.append(move)
+        else:
+            yield move
+    killer_moves = []
+    for code in killers:
+        move = MoveFactory.decode_move(board, code)
+        if move is not None and move is not hash_move and not move.is_attack() and move.get_promotion_piece() != 'Q':
+            killer_moves.append(move)
+            yield move
+    if history_table is not None:
+        quiets.sort(key=history_table.get_score, reverse=True)
+    for move in quiets:
+        if not any(move is killer for killer in killer_moves):
+            yield move
+    yield from losing_captures
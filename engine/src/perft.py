@@ -0,0 +1,77 @@
+'''Perft: count the leaf nodes of the legal move tree to check the move generator against known results.'''
+import time
+from typing import Dict, List
+
+from .board import Board
+from .fen import FenUtilities
+
+# (name, FEN, expected node count for depth 1, 2, 3, ...)
+PERFT_SUITE = (
+    ('initial', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', (20, 400, 8902, 197281)),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1', (48, 2039, 97862)),
+    ('position 3', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1', (14, 191, 2812, 43238)),
+    ('position 4', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1', (6, 264, 9467)),
+    ('position 5', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8', (44, 1486, 62379)),
+    ('illegal en passant', '3k4/3p4/8/K1P4r/8/8/8/8 b - - 0 1', (18, 92, 1670)),
+    ('en passant gives check', '8/8/4k3/8/2p5/8/B2P2K1/8 w - - 0 1', (13, 102, 1266)),
+    ('short castle gives check', '5k2/8/8/8/8/8/8/4K2R w K - 0 1', (15, 66, 1198)),
+    ('long castle gives check', '3k4/8/8/8/8/8/8/R3K3 w Q - 0 1', (16, 71, 1286)),
+    ('castle rights', 'r3k2r/1b4bq/8/8/8/8/7B/R3K2R w KQkq - 0 1', (26, 1141, 27826)),
+    ('partial castle rights', 'r3k2r/8/8/8/8/8/8/R3K2R w K - 0 1', (25, 504)),
+    ('castle through pawn attack', '4k3/8/8/8/8/8/4p3/R3K2R w KQ - 0 1', (22, 112, 2717)),
+    ('promote out of check', '2K2r2/4P3/8/8/8/8/8/3k4 w - - 0 1', (11, 133, 1442)),
+    ('promote to give check', '4k3/1P6/8/8/8/8/K7/8 w - - 0 1', (9, 40, 472)),
+    ('underpromote to give check', '8/P1k5/K7/8/8/8/8/8 w - - 0 1', (6, 27, 273)),
+)
+
+
+def perft(board: Board, depth: int) -> int:
+    ''' Return number of legal move sequences of length depth from board'''
+    if depth == 0:
+        return 1
+    nodes = 0
+    player = board.get_current_player()
+    for move in player.get_legal_moves():
+        transition = player.make_move(move)
+        if transition.get_move_status().is_done():
+            nodes += 1 if depth == 1 else perft(transition.get_transition_board(), depth - 1)
+    return nodes
+
+
+def divide(board: Board, depth: int) -> Dict[str, int]:
+    ''' Return perft of depth - 1 below each legal move, keyed by the move in coordinate notation'''
+    result = {}
+    player = board.get_current_player()
+    for move in player.get_legal_moves():
+        transition = player.make_move(move)
+        if transition.get_move_status().is_done():
+            result[move.get_notation()] = perft(transition.get_transition_board(), depth - 1)
+    return result
+
+
+def run_perft(fen: str, depth: int, expected: int = None) -> dict:
+    ''' Time perft on a FEN, expected is the known node count if any'''
+    board = FenUtilities.create_game_from_fen(fen)
+    start = time.perf_counter()
+    nodes = perft(board, depth)
+    seconds = time.perf_counter() - start
+    return {'fen': fen,
+            'depth': depth,
+            'nodes': nodes,
+            'expected': expected,
+            'passed': expected is None or nodes == expected,
+            'seconds': seconds,
+            'nps': int(nodes / seconds) if seconds > 0 else 0}
+
+
+def run_suite(max_depth: int = 2, names: List[str] = None) -> List[dict]:
+    ''' Run perft on every suite position (or the named ones) at every known depth up to max_depth'''
+    results = []
+    for name, fen, expected_nodes in PERFT_SUITE:
+        if names and name not in names:
+            continue
+        for depth, expected in enumerate(expected_nodes[:max_depth], start=1):
+            result = run_perft(fen, depth, expected)
+            result['name'] = name
+            results.append(result)
+    return results
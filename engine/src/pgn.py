@@ -0,0 +1,208 @@
+'''Bulk analysis of PGN archives: games are streamed from plain, gzip, bzip2 or xz files, replayed and
+searched on a process pool, and written as NDJSON lines as soon as they are done.
+
+Games are read one at a time and at most max_in_flight of them are queued or searched at once, so memory
+use doesn't depend on the size of the archive. A worker replays the SAN moves of its game with
+MoveFactory.create_move_from_san and make_move and searches the position before every move, with the
+positions played before it as repetition history. Workers search with get_shared_table, so the
+ENGINE_TT_* variables apply; with ENGINE_TT_SHARED_MEMORY all of them share one table.
+
+An output line is {"game": index in the input, "tags", "result", "positions": [...]}, with "error" added
+when a move can't be played; a game whose worker failed is written as {"game", "error"} alone. Lines are
+written in completion order, not input order.
+'''
+import bz2
+import gzip
+import json
+import lzma
+import os
+import re
+import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, TextIO, Tuple
+
+from .board import MoveFactory
+from .engine import MiniMax
+from .fen import FenUtilities, FenError
+from .ordering import HistoryTable
+from .transposition import get_shared_table
+
+COMPRESSED_FORMATS = ((b'\x1f\x8b', gzip.open), (b'BZh', bz2.open), (b'\xfd7zXZ\x00', lzma.open))
+TAG_PATTERN = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+# comments, variation brackets, NAGs, move numbers, results and anything else as a move
+TOKEN_PATTERN = re.compile(r'\{[^}]*\}?|;[^\n]*|[()]|\$\d+|\d+\.+|1-0|0-1|1/2-1/2|\*|[^\s(){};$]+')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+class PgnGame:
+    __slots__ = ('_tags', '_moves', '_result')
+
+    def __init__(self, tags: Dict[str, str], moves: List[str], result: str = '*') -> None:
+        self._tags = tags
+        self._moves = moves
+        self._result = result
+
+    def get_tags(self) -> Dict[str, str]:
+        return self._tags
+
+    def get_moves(self) -> List[str]:
+        ''' Return the moves of the main line in standard algebraic notation'''
+        return self._moves
+
+    def get_result(self) -> str:
+        return self._result
+
+    def get_fen(self) -> str:
+        ''' Return the starting position, the FEN tag or the standard position'''
+        return self._tags.get('FEN', FenUtilities.STANDARD_FEN)
+
+
+def open_pgn(path: str) -> TextIO:
+    ''' Open a PGN file for reading as text, decompressing it when its first bytes are those of gzip, bzip2 or xz'''
+    with open(path, 'rb') as pgn_file:
+        magic = pgn_file.read(6)
+    for prefix, opener in COMPRESSED_FORMATS:
+        if magic.startswith(prefix):
+            return opener(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+
+def parse_movetext(movetext: str) -> Tuple[List[str], str]:
+    ''' Return the main line moves and the result of a game's movetext, skipping comments, NAGs and variations'''
+    moves = []
+    result = '*'
+    variation_depth = 0
+    for token in TOKEN_PATTERN.findall(movetext):
+        if token == '(':
+            variation_depth += 1
+        elif token == ')':
+            variation_depth = max(variation_depth - 1, 0)
+        elif variation_depth > 0 or token[0] in '{;$' or token[0].isdigit() and token.endswith('.'):
+            continue
+        elif token in RESULTS:
+            result = token
+        else:
+            moves.append(token)
+    return moves, result
+
+
+def is_comment_open(line: str, comment_open: bool) -> bool:
+    ''' Tell whether a {} comment is still open at the end of a movetext line, comment_open at its start'''
+    for character in line:
+        if comment_open:
+            comment_open = character != '}'
+        elif character == '{':
+            comment_open = True
+        elif character == ';':
+            break
+    return comment_open
+
+
+def read_games(lines: Iterable[str]) -> Iterator[PgnGame]:
+    ''' Yield the games of PGN text one at a time, lines is any iterable of lines such as an open file.
+    A line starting with [ is a tag, ending the game before it, unless it is inside a {} comment
+    such as {[%clk 0:05:00]} split over lines'''
+    tags = {}
+    movetext = []
+    comment_open = False
+    for line in lines:
+        stripped = line.strip()
+        if comment_open:
+            movetext.append(stripped)
+            comment_open = is_comment_open(stripped, True)
+            continue
+        if stripped.startswith('%'):
+            continue
+        if stripped.startswith('['):
+            if movetext:
+                yield PgnGame(tags, *parse_movetext(' '.join(movetext)))
+                tags = {}
+                movetext = []
+            match = TAG_PATTERN.match(stripped)
+            if match is not None:
+                tags[match.group(1)] = match.group(2).replace('\\"', '"').replace('\\\\', '\\')
+        elif stripped:
+            movetext.append(stripped)
+            comment_open = is_comment_open(stripped, False)
+    if tags or movetext:
+        yield PgnGame(tags, *parse_movetext(' '.join(movetext)))
+
+
+def read_files(paths: Iterable[str], stdin: TextIO = None) -> Iterator[PgnGame]:
+    ''' Yield the games of every file of paths in turn, - stands for stdin, read uncompressed'''
+    for path in paths:
+        if path == '-':
+            yield from read_games(stdin or sys.stdin)
+        else:
+            with open_pgn(path) as pgn_file:
+                yield from read_games(pgn_file)
+
+
+def analyze_game(index: int, game: PgnGame, depth: int, time_limit: float = None) -> dict:
+    ''' Replay game and search the position before each of its moves, return the game's output line as a dict'''
+    result = {'game': index, 'tags': game.get_tags(), 'result': game.get_result(), 'positions': []}
+    try:
+        board = FenUtilities.create_game_from_fen(game.get_fen())
+    except FenError as error:
+        result['error'] = error.to_dict()
+        return result
+    transposition_table = get_shared_table()
+    history_table = HistoryTable()
+    position_hashes = []
+    for ply, san in enumerate(game.get_moves()):
+        move = MoveFactory.create_move_from_san(board, san)
+        transition = board.get_current_player().make_move(move) if move is not None else None
+        if transition is None or not transition.get_move_status().is_done():
+            result['error'] = {'ply': ply, 'move': san, 'message': 'illegal move'}
+            return result
+        minimax = MiniMax(depth, position_hashes, transposition_table, time_limit, history_table)
+        best_move = minimax.execute(board)
+        stats = minimax.get_stats()
+        result['positions'].append({'ply': ply,
+                                    'fen': FenUtilities.create_fen_from_game(board),
+                                    'played': move.get_notation(),
+                                    'best_move': best_move.get_notation() if best_move is not None else None,
+                                    'score': stats.time_per_depth[-1]['score'] if stats.time_per_depth else None,
+                                    'principal_variation': stats.principal_variation,
+                                    'depth': stats.get_completed_depth(),
+                                    'nodes': stats.nodes})
+        position_hashes.append(board.get_zobrist_hash())
+        board = transition.get_transition_board()
+    return result
+
+
+def analyze_games(games: Iterable[PgnGame], output_file: TextIO, depth: int, time_limit: float = None,
+                  workers: int = None, max_in_flight: int = None) -> Tuple[int, int]:
+    ''' Search games on a pool of worker processes (one per CPU by default), keeping at most max_in_flight
+    games (four per worker by default) submitted and not yet written. Return the number of games written
+    and how many of them have an error'''
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or 4 * workers
+    written = errors = 0
+    with ProcessPoolExecutor(workers) as executor:
+        pending = {}
+        for index, game in enumerate(games):
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                written += len(done)
+                errors += write_results({future: pending.pop(future) for future in done}, output_file)
+            pending[executor.submit(analyze_game, index, game, depth, time_limit)] = index
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            written += len(done)
+            errors += write_results({future: pending.pop(future) for future in done}, output_file)
+    return written, errors
+
+
+def write_results(futures: Dict[Future, int], output_file: TextIO) -> int:
+    ''' Write the output line of each done future, mapped to its game index. Return how many have an error'''
+    errors = 0
+    for future, index in futures.items():
+        try:
+            result = future.result()
+        except Exception as error:
+            result = {'game': index, 'error': {'message': '{0}: {1}'.format(type(error).__name__, error)}}
+        errors += 'error' in result
+        output_file.write(json.dumps(result) + '\n')
+    output_file.flush()
+    return errors
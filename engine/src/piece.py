@@ -1,7 +1,11 @@
 from abc import ABC, abstractmethod
 from enum import Enum
 from typing import List
-from .board import *
+from .alliance import Alliance
+from .board import (Board, BoardUtils, Move, MajorMove, MajorAttackMove, PawnMove, PawnJump, PawnAttackMove,
+                    PawnEnpassantAttackMove, PawnPromotionMove, FISRT_COLUMN, SECOND_COLUMN, SEVENTH_COLUMN,
+                    EIGHTH_COLUMN, SECOND_RANK, SEVENTH_RANK)
+from .bitboard import sliding_destinations
 
 class PieceType(Enum):
     PAWN = 'P'
@@ -15,6 +19,8 @@ class PieceType(Enum):
         return self.value
     def is_king(self) -> bool:
         return self.value == 'K'
+    def is_pawn(self) -> bool:
+        return self.value == 'P'
     def is_rook(self) -> bool:
         return self.value == 'R'
     def get_piece_value(self) -> int:
@@ -22,6 +28,10 @@ class PieceType(Enum):
         return value[self.value]
 
 class Piece(ABC):
+    ''' Pieces are immutable, so identical ones are shared through create() instead of being rebuilt on every board'''
+    __slots__ = ('_piece_type', '_position', '_alliance', '_is_first_move')
+    _INTERNED = {}
+
     def __init__(self, piece_type: PieceType, 
                  position: int, 
                  alliance: Alliance, 
@@ -31,6 +41,15 @@ class Piece(ABC):
         self._alliance = alliance
         self._is_first_move = is_first_move
 
+    @classmethod
+    def create(cls, *args):
+        ''' Return the shared instance of cls(*args), creating it on first use'''
+        key = (cls,) + args
+        piece = Piece._INTERNED.get(key)
+        if piece is None:
+            piece = Piece._INTERNED.setdefault(key, cls(*args))
+        return piece
+
     def get_piece_type(self) -> PieceType:
         return self._piece_type
     def get_position(self) -> int:
@@ -52,6 +71,8 @@ class Piece(ABC):
         pass
 
     def __eq__(self, __value: object) -> bool:
+        if __value is self:
+            return True
         if __value is None:
             return False
         if not isinstance(__value, Piece):
@@ -73,7 +94,21 @@ class Piece(ABC):
             return self._piece_type.value.lower()
         return self._piece_type.value
 
+def calculate_sliding_legal_move(piece: Piece, board: Board, candidates) -> List[Move]:
+    ''' Calculate moves of a bishop, rook or queen from the precomputed rays of its tile'''
+    legal_moves = []
+    for destination_coordinate in sliding_destinations(piece.get_position(), candidates, board.get_occupancy()):
+        destination_tile = board.get_tile(destination_coordinate)
+        if not destination_tile.is_occupied():
+            legal_moves.append(MajorMove(board, piece, destination_coordinate))
+        else:
+            piece_at_destination = destination_tile.get_piece()
+            if piece_at_destination.get_alliance() != piece.get_alliance():
+                legal_moves.append(MajorAttackMove(board, piece, destination_coordinate, piece_at_destination))
+    return legal_moves
+
 class Knight(Piece):
+    __slots__ = ()
     CANDIDATE_MOVE_COORDINATES = (-17, -15, -10, -6, 6, 10, 15, 17)
 
     def __init__(self, position: int, alliance: Alliance, is_first_move: bool) -> None:
@@ -102,7 +137,7 @@ class Knight(Piece):
         return legal_moves
             
     def move(self, move: Move):
-        return Knight(move.get_destination_coordinate(), self._alliance, False)
+        return Knight.create(move.get_destination_coordinate(), self._alliance, False)
 
     def first_column_exclusion(self, candidate: int) -> bool:
         return BoardUtils.FISRT_COLUMN[self._position] and candidate in (-17, -10, 6, 15) 
@@ -117,6 +152,7 @@ class Knight(Piece):
         return BoardUtils.EIGHTH_COLUMN[self._position] and candidate in (-15, -6, 10, 17)
     
 class Bishop(Piece):
+    __slots__ = ()
     CANDIDATE_MOVE_COORDINATES = (-9, -7, 9, 7)
 
     def __init__(self, position: int, alliance: Alliance, is_first_move: bool) -> None:
@@ -126,35 +162,14 @@ class Bishop(Piece):
             super().__init__(PieceType.BISHOP, position, alliance, is_first_move)
 
     def calculate_legal_move(self, board: Board) -> List[Move]:
-        legal_moves = []
-        for candidate in Bishop.CANDIDATE_MOVE_COORDINATES:
-            destination_coordinate = self._position
-            while BoardUtils.validate_tile_coordinate(destination_coordinate):
-                if self.first_column_exclusion(candidate) or \
-                   self.eigth_column_exclusion(candidate):
-                    break
-                destination_coordinate += candidate
-                if BoardUtils.validate_tile_coordinate(destination_coordinate):
-                    destination_tile = board.get_tile(destination_coordinate)
-                    if not destination_tile.is_occupied():
-                        legal_moves.append(MajorMove(board, self, destination_coordinate))
-                    else:
-                        piece_at_destination = destination_tile.get_piece()
-                        if piece_at_destination.get_alliance() != self._alliance:
-                            legal_moves.append(MajorAttackMove(board, self, destination_coordinate, piece_at_destination))
-                        break
-        return legal_moves
+        return calculate_sliding_legal_move(self, board, Bishop.CANDIDATE_MOVE_COORDINATES)
 
     def move(self, move: Move):
-        return Bishop(move.get_destination_coordinate(), self._alliance, False)
-    
-    def first_column_exclusion(self, candidate: int) -> bool:
-        return BoardUtils.FISRT_COLUMN[self._position] and candidate in (-9, 7) 
-    
-    def eigth_column_exclusion(self, candidate: int) -> bool:
-        return BoardUtils.EIGHTH_COLUMN[self._position] and candidate in (-7, 9)
+        return Bishop.create(move.get_destination_coordinate(), self._alliance, False)
     
+
 class Rook(Piece):
+    __slots__ = ()
     CANDIDATE_MOVE_COORDINATES = (-8, -1, 1, 8)
     
     def __init__(self, position: int, alliance: Alliance, is_first_move: bool) -> None:
@@ -164,35 +179,14 @@ class Rook(Piece):
             super().__init__(PieceType.ROOK, position, alliance, is_first_move)
 
     def calculate_legal_move(self, board: Board) -> List[Move]:
-        legal_moves = []
-        for candidate in Rook.CANDIDATE_MOVE_COORDINATES:
-            destination_coordinate = self._position
-            while BoardUtils.validate_tile_coordinate(destination_coordinate):
-                if self.first_column_exclusion(candidate) or \
-                   self.eigth_column_exclusion(candidate):
-                    break
-                destination_coordinate += candidate
-                if BoardUtils.validate_tile_coordinate(destination_coordinate):
-                    destination_tile = board.get_tile(destination_coordinate)
-                    if not destination_tile.is_occupied():
-                        legal_moves.append(MajorMove(board, self, destination_coordinate))
-                    else:
-                        piece_at_destination = destination_tile.get_piece()
-                        if piece_at_destination.get_alliance() != self._alliance:
-                            legal_moves.append(MajorAttackMove(board, self, destination_coordinate, piece_at_destination))
-                        break
-        return legal_moves
+        return calculate_sliding_legal_move(self, board, Rook.CANDIDATE_MOVE_COORDINATES)
 
     def move(self, move: Move):
-        return Rook(move.get_destination_coordinate(), self._alliance, False)
-    
-    def first_column_exclusion(self, candidate: int) -> bool:
-        return BoardUtils.FISRT_COLUMN[self._position] and candidate == -1
-    
-    def eigth_column_exclusion(self, candidate: int) -> bool:
-        return BoardUtils.EIGHTH_COLUMN[self._position] and candidate == 1
+        return Rook.create(move.get_destination_coordinate(), self._alliance, False)
     
+
 class Queen(Piece):
+    __slots__ = ()
     CANDIDATE_MOVE_COORDINATES = (-9, -8, -7, -1, 1, 7, 8, 9)
     
     def __init__(self, position: int, alliance: Alliance, is_first_move: bool) -> None:
@@ -202,46 +196,26 @@ class Queen(Piece):
             super().__init__(PieceType.QUEEN, position, alliance, is_first_move)
 
     def calculate_legal_move(self, board: Board) -> List[Move]:
-        legal_moves = []
-        for candidate in Queen.CANDIDATE_MOVE_COORDINATES:
-            destination_coordinate = self._position
-            while BoardUtils.validate_tile_coordinate(destination_coordinate):
-                if self.first_column_exclusion(candidate) or \
-                   self.eigth_column_exclusion(candidate):
-                    break
-                destination_coordinate += candidate
-                if BoardUtils.validate_tile_coordinate(destination_coordinate):
-                    destination_tile = board.get_tile(destination_coordinate)
-                    if not destination_tile.is_occupied():
-                        legal_moves.append(MajorMove(board, self, destination_coordinate))
-                    else:
-                        piece_at_destination = destination_tile.get_piece()
-                        if piece_at_destination.get_alliance() != self._alliance:
-                            legal_moves.append(MajorAttackMove(board, self, destination_coordinate, piece_at_destination))
-                        break
-        return legal_moves
+        return calculate_sliding_legal_move(self, board, Queen.CANDIDATE_MOVE_COORDINATES)
     
     def move(self, move: Move):
-        return Queen(move.get_destination_coordinate(), self._alliance, False)
-    
-    def first_column_exclusion(self, candidate: int) -> bool:
-        return BoardUtils.FISRT_COLUMN[self._position] and candidate in (-1, -9, 7) 
-    
-    def eigth_column_exclusion(self, candidate: int) -> bool:
-        return BoardUtils.EIGHTH_COLUMN[self._position] and candidate in (-7, 1, 9)
+        return Queen.create(move.get_destination_coordinate(), self._alliance, False)
     
+
 class King(Piece):
+    __slots__ = ('_king_side_castle_capable', '_queen_side_castle_capable', '_is_castled')
     CANDIDATE_MOVE_COORDINATES = (-9, -8, -7, -1, 1, 7, 8, 9)
 
     def __init__(self, position: int, alliance: Alliance, is_first_move: bool,
-                 king_side_castle_capable: bool, queen_side_castle_capable: bool) -> None:
+                 king_side_castle_capable: bool, queen_side_castle_capable: bool,
+                 is_castled: bool = False) -> None:
         if is_first_move == None:
             super().__init__(PieceType.KING, position, alliance, True)
         else:
             super().__init__(PieceType.KING, position, alliance, is_first_move)
         self._king_side_castle_capable = king_side_castle_capable
         self._queen_side_castle_capable = queen_side_castle_capable
-        self._is_castled = False
+        self._is_castled = is_castled
 
     def is_king_side_castle_capable(self) -> bool:
         return self._king_side_castle_capable
@@ -252,9 +226,6 @@ class King(Piece):
     def is_castled(self) -> bool:
         return self._is_castled
     
-    def set_castle(self, castled: bool) -> None:
-        self._is_castled = castled
-    
     def calculate_legal_move(self, board: Board) -> List[Move]:
         legal_moves = []
         for candidate in King.CANDIDATE_MOVE_COORDINATES:
@@ -273,9 +244,8 @@ class King(Piece):
         return legal_moves
 
     def move(self, move: Move):
-        king = King(move.get_destination_coordinate(), self._alliance, False, False, False)
-        king.set_castle(move.is_castling_move())
-        return king    
+        return King.create(move.get_destination_coordinate(), self._alliance, False, False, False,
+                           move.is_castling_move())
 
     def first_column_exclusion(self, candidate: int) -> bool:
         return BoardUtils.FISRT_COLUMN[self._position] and candidate in (-1, -9, 7) 
@@ -284,7 +254,9 @@ class King(Piece):
         return BoardUtils.EIGHTH_COLUMN[self._position] and candidate in (-7, 1, 9)
     
 class Pawn(Piece):
+    __slots__ = ()
     CANDIDATE_MOVE_COORDINATES = (8, 16, 7, 9)
+    PROMOTION_PIECES = ('Q', 'R', 'B', 'N')
 
     def __init__(self, position: int, alliance: Alliance, is_first_move: bool) -> None:
         if is_first_move == None:
@@ -300,7 +272,7 @@ class Pawn(Piece):
                 continue
             if candidate == 8 and not board.get_tile(destination_coordinate).is_occupied():
                 if self._alliance.is_pawn_promotion_square(destination_coordinate):
-                    legal_moves.append(PawnPromotionMove(PawnMove(board, self, destination_coordinate)))
+                    legal_moves.extend(self.promotion_moves(PawnMove(board, self, destination_coordinate)))
                 else:
                     legal_moves.append(PawnMove(board, self, destination_coordinate))
             elif candidate == 16 and self._is_first_move and \
@@ -316,7 +288,7 @@ class Pawn(Piece):
                     piece_at_destination = board.get_tile(destination_coordinate).get_piece()
                     if piece_at_destination.get_alliance() != self._alliance:
                         if self._alliance.is_pawn_promotion_square(destination_coordinate):
-                            legal_moves.append(PawnPromotionMove(PawnAttackMove(board, self, destination_coordinate, piece_at_destination)))
+                            legal_moves.extend(self.promotion_moves(PawnAttackMove(board, self, destination_coordinate, piece_at_destination)))
                         else:
                             legal_moves.append(PawnAttackMove(board, self, destination_coordinate, piece_at_destination))
                 elif board.get_enpassant_pawn():
@@ -330,7 +302,7 @@ class Pawn(Piece):
                     piece_at_destination = board.get_tile(destination_coordinate).get_piece()
                     if piece_at_destination.get_alliance() != self._alliance:
                         if self._alliance.is_pawn_promotion_square(destination_coordinate):
-                            legal_moves.append(PawnPromotionMove(PawnAttackMove(board, self, destination_coordinate, piece_at_destination)))
+                            legal_moves.extend(self.promotion_moves(PawnAttackMove(board, self, destination_coordinate, piece_at_destination)))
                         else:
                             legal_moves.append(PawnAttackMove(board, self, destination_coordinate, piece_at_destination))
                 elif board.get_enpassant_pawn():
@@ -341,7 +313,24 @@ class Pawn(Piece):
         return legal_moves
     
     def move(self, move: Move):
-        return Pawn(move.get_destination_coordinate(), self._alliance, False)
+        return Pawn.create(move.get_destination_coordinate(), self._alliance, False)
     
-    def get_promotion_piece(self) ->  Queen:
-        return Queen(self._position, self._alliance, False)
+    def get_attack_coordinates(self) -> List[int]:
+        ''' Return the tiles this pawn attacks, whether or not a piece stands on them'''
+        coordinates = []
+        if not ((BoardUtils.EIGHTH_COLUMN[self._position] and self._alliance.is_white()) or
+                (BoardUtils.FISRT_COLUMN[self._position] and self._alliance.is_black())):
+            coordinates.append(self._position + self._alliance.get_direction() * 7)
+        if not ((BoardUtils.EIGHTH_COLUMN[self._position] and self._alliance.is_black()) or
+                (BoardUtils.FISRT_COLUMN[self._position] and self._alliance.is_white())):
+            coordinates.append(self._position + self._alliance.get_direction() * 9)
+        return [coordinate for coordinate in coordinates if BoardUtils.validate_tile_coordinate(coordinate)]
+
+    def promotion_moves(self, wrapped_move: Move) -> List[Move]:
+        return [PawnPromotionMove(wrapped_move, promotion_piece) for promotion_piece in Pawn.PROMOTION_PIECES]
+
+    def get_promotion_piece(self, promotion_piece: str = 'Q') -> Piece:
+        ''' Return the piece this pawn promotes to, still standing on the pawn's tile'''
+        return Pawn.PROMOTION_CLASSES[promotion_piece].create(self._position, self._alliance, False)
+
+Pawn.PROMOTION_CLASSES = {'Q': Queen, 'R': Rook, 'B': Bishop, 'N': Knight}
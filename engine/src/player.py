@@ -1,6 +1,9 @@
-from .board import *
-from .piece import *
+from abc import abstractmethod
+from enum import Enum
 from typing import List
+from .alliance import Alliance
+from .board import Board, Move, KingSideCastleMove, QueenSideCastleMove
+from .piece import Piece, King
 
 class MoveStatus(Enum):
     DONE = True
@@ -27,6 +30,7 @@ class Player:
         castling_moves = self.calculate_king_castle(legal_moves, opponent_moves)
         legal_moves.extend(castling_moves)
         self._legal_moves = legal_moves
+        self._legal_move_index = None
         
 
     def get_player_king(self) -> King:
@@ -35,8 +39,17 @@ class Player:
     def get_legal_moves(self) -> List[Move]:
         return self._legal_moves
     
+    def get_legal_move(self, current_coordinate: int, destination_coordinate: int, promotion_piece: str = None) -> Move:
+        ''' Return the legal move between two tiles, None if there is none.
+        Without promotion_piece a promotion move is still found by its tiles.'''
+        if self._legal_move_index is None:
+            self._legal_move_index = Player.index_legal_moves(self._legal_moves)
+        return self._legal_move_index.get((current_coordinate, destination_coordinate, promotion_piece))
+
     def is_move_legal(self, move: Move) -> bool:
-        return move in self._legal_moves
+        candidate = self.get_legal_move(move.get_current_coordinate(), move.get_destination_coordinate(),
+                                        move.get_promotion_piece())
+        return candidate is move or (candidate is not None and candidate == move)
     
     def is_in_check(self) -> bool:
         return self._is_in_check
@@ -58,7 +71,7 @@ class Player:
     
     def has_castle_oppotunities(self) -> bool:
         return not self._is_in_check and (self._player_king.is_king_side_castle_capable() 
-                                          or self._player_king.is_king_side_castle_capable())
+                                          or self._player_king.is_queen_side_castle_capable())
 
     def establish_king(self) -> King:
         for piece in self.get_active_pieces():
@@ -100,6 +113,27 @@ class Player:
         '''Return opponent player'''
         pass
 
+    @staticmethod
+    def index_legal_moves(legal_moves: List[Move]) -> dict:
+        ''' Index moves by (current coordinate, destination coordinate, promotion piece)'''
+        index = {}
+        for move in legal_moves:
+            current_coordinate = move.get_current_coordinate()
+            destination_coordinate = move.get_destination_coordinate()
+            index.setdefault((current_coordinate, destination_coordinate, move.get_promotion_piece()), move)
+            index.setdefault((current_coordinate, destination_coordinate, None), move)
+        return index
+
+    def is_tile_attacked(self, position: int, opponent_moves: List[Move]) -> bool:
+        ''' Tell whether the opponent attacks an empty tile. opponent_moves hold pawn pushes, which attack
+        nothing, and pawn captures of occupied tiles only, so pawns are checked by the tiles they attack'''
+        for move in opponent_moves:
+            if move.get_destination_coordinate() == position and not move.get_moved_piece().get_piece_type().is_pawn():
+                return True
+        opponent_pieces = self._board.get_black_piece() if self.get_alliance().is_white() else self._board.get_white_piece()
+        return any(position in piece.get_attack_coordinates()
+                   for piece in opponent_pieces if piece.get_piece_type().is_pawn())
+
     @staticmethod
     def calculate_attack_on_tile(position: int, opponent_moves: List[Move]) -> List[Move]:
         attack_moves = []
@@ -127,22 +161,24 @@ class WhitePlayer(Player):
         if not self.has_castle_oppotunities():
             return king_castle
         if self._player_king.is_first_move() and not self._is_in_check:
-            if not self._board.get_tile(61).is_occupied() and \
+            if self._player_king.is_king_side_castle_capable() and \
+               not self._board.get_tile(61).is_occupied() and \
                not self._board.get_tile(62).is_occupied():
                 rook_tile = self._board.get_tile(63)
                 if rook_tile.is_occupied() and rook_tile.get_piece().is_first_move():
-                    if len(Player.calculate_attack_on_tile(61, opponent_moves)) == 0 and \
-                       len(Player.calculate_attack_on_tile(61, opponent_moves)) == 0 and \
+                    if not self.is_tile_attacked(61, opponent_moves) and \
+                       not self.is_tile_attacked(62, opponent_moves) and \
                        rook_tile.get_piece().get_piece_type().is_rook():
                         king_castle.append(KingSideCastleMove(self._board, self._player_king, 62,
                                                               rook_tile.get_piece(), rook_tile.get_coordinate(), 61))
-            if not self._board.get_tile(59).is_occupied and \
+            if self._player_king.is_queen_side_castle_capable() and \
+               not self._board.get_tile(59).is_occupied() and \
                not self._board.get_tile(58).is_occupied() and \
                not self._board.get_tile(57).is_occupied():
                 rook_tile = self._board.get_tile(56)
                 if rook_tile.is_occupied() and rook_tile.get_piece().is_first_move():
-                    if len(Player.calculate_attack_on_tile(59, opponent_moves)) == 0 and \
-                       len(Player.calculate_attack_on_tile(58, opponent_moves)) == 0 and \
+                    if not self.is_tile_attacked(59, opponent_moves) and \
+                       not self.is_tile_attacked(58, opponent_moves) and \
                        rook_tile.get_piece().get_piece_type().is_rook():
                         king_castle.append(QueenSideCastleMove(self._board, self._player_king, 58,
                                                               rook_tile.get_piece(), rook_tile.get_coordinate(), 59))
@@ -170,22 +206,24 @@ class BlackPlayer(Player):
         if not self.has_castle_oppotunities():
             return king_castle
         if self._player_king.is_first_move() and not self._is_in_check:
-            if not self._board.get_tile(5).is_occupied() and \
+            if self._player_king.is_king_side_castle_capable() and \
+               not self._board.get_tile(5).is_occupied() and \
                not self._board.get_tile(6).is_occupied():
                 rook_tile = self._board.get_tile(7)
                 if rook_tile.is_occupied() and rook_tile.get_piece().is_first_move():
-                    if len(Player.calculate_attack_on_tile(5, opponent_moves)) == 0 and \
-                       len(Player.calculate_attack_on_tile(6, opponent_moves)) == 0 and \
+                    if not self.is_tile_attacked(5, opponent_moves) and \
+                       not self.is_tile_attacked(6, opponent_moves) and \
                        rook_tile.get_piece().get_piece_type().is_rook():
                         king_castle.append(KingSideCastleMove(self._board, self._player_king, 6,
                                                               rook_tile.get_piece(), rook_tile.get_coordinate(), 5))
-            if not self._board.get_tile(1).is_occupied and \
+            if self._player_king.is_queen_side_castle_capable() and \
+               not self._board.get_tile(1).is_occupied() and \
                not self._board.get_tile(2).is_occupied() and \
                not self._board.get_tile(3).is_occupied():
                 rook_tile = self._board.get_tile(0)
                 if rook_tile.is_occupied() and rook_tile.get_piece().is_first_move():
-                    if len(Player.calculate_attack_on_tile(2, opponent_moves)) == 0 and \
-                       len(Player.calculate_attack_on_tile(3, opponent_moves)) == 0 and \
+                    if not self.is_tile_attacked(2, opponent_moves) and \
+                       not self.is_tile_attacked(3, opponent_moves) and \
                        rook_tile.get_piece().get_piece_type().is_rook():
                         king_castle.append(QueenSideCastleMove(self._board, self._player_king, 2,
                                                               rook_tile.get_piece(), rook_tile.get_coordinate(), 3))
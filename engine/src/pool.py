@@ -0,0 +1,79 @@
+'''Fixed pool of threads running searches, so concurrent requests queue instead of all searching at once.'''
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+WORKERS_VARIABLE = 'ENGINE_WORKERS'
+
+
+class SearchPool:
+    def __init__(self, workers: int) -> None:
+        self._workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search')
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._busy = 0
+        self._local = threading.local()
+
+    def get_workers(self) -> int:
+        return self._workers
+
+    def get_queue_depth(self) -> int:
+        return self._queued
+
+    def get_busy_workers(self) -> int:
+        return self._busy
+
+    def get_utilization(self) -> float:
+        return self._busy / self._workers
+
+    def submit(self, function, *args, **kwargs) -> Future:
+        ''' Queue function(*args, **kwargs) for the next free worker'''
+        with self._lock:
+            self._queued += 1
+        return self._executor.submit(self._run, function, args, kwargs)
+
+    def cancel(self, future: Future) -> bool:
+        ''' Cancel a submitted function that no worker has started, return False if it is running or done'''
+        if not future.cancel():
+            return False
+        with self._lock:
+            self._queued -= 1
+        return True
+
+    def has_idle_worker(self) -> bool:
+        ''' Tell whether a function submitted now would start at once, once the calling worker, if any, is done'''
+        busy = self._busy - (1 if getattr(self._local, 'running', False) else 0)
+        return busy + self._queued < self._workers
+
+    def run(self, function, *args, **kwargs):
+        ''' Run function on a worker and return its result, waiting for a free worker if needed'''
+        return self.submit(function, *args, **kwargs).result()
+
+    def _run(self, function, args, kwargs):
+        with self._lock:
+            self._queued -= 1
+            self._busy += 1
+        self._local.running = True
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self._local.running = False
+            with self._lock:
+                self._busy -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_search_pool() -> SearchPool:
+    ''' Return the process wide pool, sized by ENGINE_WORKERS or the number of CPUs'''
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SearchPool(int(os.environ.get(WORKERS_VARIABLE) or os.cpu_count() or 1))
+        return _pool
@@ -0,0 +1,167 @@
+'''Opt-in profiling of the engine hot paths.
+
+Nothing is wrapped until a profiled block starts, so searches run unchanged when profiling is off.
+In aggregate mode the hot paths are replaced by wrappers counting calls and time for the thread
+that asked for the profile; times are inclusive, Board.__init__ contains the calculate_legal_move
+calls it triggers. In cprofile mode the whole block runs under cProfile and a pstats file is written;
+one cProfile run at a time, as the interpreter allows a single active profiler, and only the newest
+KEEP_FILES pstats files are kept.
+'''
+import functools
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+ENVIRONMENT_VARIABLE = 'ENGINE_PROFILE'
+DIRECTORY_VARIABLE = 'ENGINE_PROFILE_DIR'
+KEEP_FILES = 20
+FILE_PREFIX = 'engine-'
+FILE_SUFFIX = '.pstats'
+AGGREGATE = 'aggregate'
+CPROFILE = 'cprofile'
+
+_local = threading.local()
+_lock = threading.Lock()
+_cprofile_lock = threading.Lock()
+_installed = 0
+_originals = {}
+
+
+def get_profile_mode(requested: str = None) -> str:
+    ''' Return AGGREGATE, CPROFILE or None from a request flag, falling back to the ENGINE_PROFILE env var'''
+    value = requested if requested else os.environ.get(ENVIRONMENT_VARIABLE, '')
+    value = value.strip().lower()
+    if value in ('', '0', 'false', 'off'):
+        return None
+    if value == CPROFILE:
+        return CPROFILE
+    return AGGREGATE
+
+
+def hot_paths() -> list:
+    ''' Return (class, attribute) of every function wrapped in aggregate mode'''
+    from .board import Board
+    from .piece import Pawn, Knight, Bishop, Rook, Queen, King
+    from .player import Player
+    from .engine import BoardEvaluator
+    paths = [(Board, '__init__'), (Player, 'make_move'), (BoardEvaluator, 'evaluate')]
+    paths += [(piece_class, 'calculate_legal_move') for piece_class in (Pawn, Knight, Bishop, Rook, Queen, King)]
+    return paths
+
+
+class Profiler:
+    ''' Calls and seconds per hot path, or the pstats file of a cProfile run'''
+    def __init__(self, mode: str) -> None:
+        self._mode = mode
+        self._calls = defaultdict(int)
+        self._seconds = defaultdict(float)
+        self._total_seconds = 0.0
+        self._path = None
+
+    def get_mode(self) -> str:
+        return self._mode
+
+    def get_path(self) -> str:
+        ''' Return the pstats file of a cProfile run, kept out of the report as it is a server path'''
+        return self._path
+
+    def record(self, label: str, seconds: float) -> None:
+        self._calls[label] += 1
+        self._seconds[label] += seconds
+
+    def finish(self, seconds: float, path: str = None) -> None:
+        self._total_seconds = seconds
+        self._path = path
+
+    def report(self) -> dict:
+        if self._mode == CPROFILE:
+            return {'mode': self._mode, 'seconds': self._total_seconds}
+        functions = {label: {'calls': calls,
+                             'seconds': self._seconds[label],
+                             'microseconds_per_call': self._seconds[label] * 1000000 / calls}
+                     for label, calls in sorted(self._calls.items(), key=lambda item: -self._seconds[item[0]])}
+        return {'mode': self._mode, 'seconds': self._total_seconds, 'functions': functions}
+
+
+def _wrap(label: str, function):
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        profiler = getattr(_local, 'profiler', None)
+        if profiler is None:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profiler.record(label, time.perf_counter() - start)
+    return wrapper
+
+
+def _install() -> None:
+    global _installed
+    with _lock:
+        if _installed == 0:
+            for owner, name in hot_paths():
+                original = owner.__dict__[name]
+                _originals[(owner, name)] = original
+                setattr(owner, name, _wrap('{0}.{1}'.format(owner.__name__, name), original))
+        _installed += 1
+
+
+def _uninstall() -> None:
+    global _installed
+    with _lock:
+        _installed -= 1
+        if _installed == 0:
+            for (owner, name), original in _originals.items():
+                setattr(owner, name, original)
+            _originals.clear()
+
+
+def remove_old_files(directory: str, keep: int = KEEP_FILES) -> None:
+    ''' Delete the pstats files of directory but the newest keep'''
+    paths = [os.path.join(directory, name) for name in os.listdir(directory)
+             if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@contextmanager
+def profiled(mode: str):
+    ''' Profile the block in the calling thread, yield the Profiler, or None when mode is None'''
+    if mode is None:
+        yield None
+        return
+    profiler = Profiler(mode)
+    start = time.perf_counter()
+    if mode == CPROFILE:
+        import cProfile
+        import tempfile
+        with _cprofile_lock:
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield profiler
+            finally:
+                profile.disable()
+                directory = os.environ.get(DIRECTORY_VARIABLE) or tempfile.gettempdir()
+                file_descriptor, path = tempfile.mkstemp(prefix=FILE_PREFIX, suffix=FILE_SUFFIX, dir=directory)
+                os.close(file_descriptor)
+                profile.dump_stats(path)
+                remove_old_files(directory)
+                profiler.finish(time.perf_counter() - start, path)
+        return
+    _install()
+    _local.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _local.profiler = None
+        _uninstall()
+        profiler.finish(time.perf_counter() - start)
@@ -0,0 +1,185 @@
+'''Analysis sessions: search state kept across the moves of one game.
+
+A session owns a transposition table and a history table shared by all of its searches, so the
+search for the next position starts from what earlier ones learnt. After answering, a session can
+ponder: search on an idle worker of the search pool the position after the best move and the reply
+the principal variation expects, until the next request stops it. Sessions live in the memory of one
+process, at most ENGINE_MAX_SESSIONS of them (32 by default).
+'''
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import wait
+from typing import List
+
+from .board import Board, BoardUtils, MoveFactory
+from .engine import MiniMax, IllegalMoveError, game_over_result, get_game_over, replay_game
+from .fen import FenUtilities
+from .ordering import HistoryTable
+from .pool import get_search_pool
+from .transposition import TranspositionTable
+
+MAX_SESSIONS_VARIABLE = 'ENGINE_MAX_SESSIONS'
+
+
+class SessionLimitError(RuntimeError):
+    ''' Raised when a session is created while the store holds its maximum number of sessions'''
+
+
+class AnalysisSession:
+    DEFAULT_DEPTH = 3
+    TRANSPOSITION_TABLE_SIZE = 1 << 18
+
+    def __init__(self, session_id: str, fen: str, depth: int = DEFAULT_DEPTH, history: List[str] = None,
+                 ponder: bool = True) -> None:
+        self._session_id = session_id
+        self._board, self._position_hashes = replay_game(fen, None, history)
+        self._depth = depth
+        self._ponder = ponder
+        self._transposition_table = TranspositionTable(AnalysisSession.TRANSPOSITION_TABLE_SIZE)
+        self._history_table = HistoryTable()
+        self._lock = threading.Lock()
+        self._ponder_minimax = None
+        self._ponder_future = None
+        self._last_used = time.monotonic()
+
+    def get_session_id(self) -> str:
+        return self._session_id
+
+    def get_depth(self) -> int:
+        return self._depth
+
+    def get_board(self) -> Board:
+        return self._board
+
+    def get_last_used(self) -> float:
+        return self._last_used
+
+    def is_pondering(self) -> bool:
+        return self._ponder_future is not None and not self._ponder_future.done()
+
+    def play(self, moves: List[str]) -> None:
+        ''' Play moves in coordinate notation from the current position'''
+        board = self._board
+        position_hashes = list(self._position_hashes)
+        for index, notation in enumerate(moves or ()):
+            move = MoveFactory.create_move_from_notation(board, notation)
+            if move is None:
+                raise IllegalMoveError(index, notation)
+            transition = board.get_current_player().make_move(move)
+            if not transition.get_move_status().is_done():
+                raise IllegalMoveError(index, notation)
+            position_hashes.append(board.get_zobrist_hash())
+            board = transition.get_transition_board()
+        self._board = board
+        self._position_hashes = position_hashes
+
+    def next_move(self, moves: List[str] = None, depth: int = None, time_limit: float = None) -> dict:
+        ''' Stop pondering, play moves, search the resulting position and start pondering on the expected reply.
+        When the position has no legal move the result has game_over (checkmate or stalemate) and no move'''
+        with self._lock:
+            self._last_used = time.monotonic()
+            self.stop_pondering()
+            self.play(moves)
+            depth = depth or self._depth
+            if get_game_over(self._board) is not None:
+                result = game_over_result(self._board, depth)
+                result['session_id'] = self._session_id
+                return result
+            minimax = MiniMax(depth, self._position_hashes, self._transposition_table, time_limit, self._history_table)
+            move = minimax.execute(self._board)
+            stats = minimax.get_stats()
+            transition = self._board.get_current_player().make_move(move)
+            if self._ponder and len(stats.principal_variation) >= 2:
+                self.start_pondering(transition.get_transition_board(), move, stats.principal_variation[1], depth)
+            return {'session_id': self._session_id,
+                    'moved_piece': str(move.get_moved_piece()),
+                    'from': BoardUtils.get_position_at_coordinate(move.get_current_coordinate()),
+                    'to': BoardUtils.get_position_at_coordinate(move.get_destination_coordinate()),
+                    'fen_board': FenUtilities.create_fen_from_game(transition.get_transition_board()),
+                    'player': str(self._board.get_current_player()),
+                    'depth': str(depth),
+                    'stats': stats.to_dict()}
+
+    def start_pondering(self, board: Board, move, expected_reply: str, depth: int) -> None:
+        ''' Search, on an idle worker of the search pool, the position after the expected reply to move on board.
+        Nothing is searched when every worker is taken, requests go first'''
+        pool = get_search_pool()
+        if not pool.has_idle_worker():
+            return
+        reply = MoveFactory.create_move_from_notation(board, expected_reply)
+        if reply is None:
+            return
+        transition = board.get_current_player().make_move(reply)
+        if not transition.get_move_status().is_done():
+            return
+        position_hashes = self._position_hashes + [self._board.get_zobrist_hash(), board.get_zobrist_hash()]
+        self._ponder_minimax = MiniMax(depth, position_hashes, self._transposition_table,
+                                       history_table=self._history_table)
+        self._ponder_future = pool.submit(self._ponder_minimax.execute, transition.get_transition_board())
+
+    def stop_pondering(self) -> None:
+        ''' Stop the background search and wait for it, the tables it filled stay in the session'''
+        if self._ponder_future is not None and not get_search_pool().cancel(self._ponder_future):
+            self._ponder_minimax.stop()
+            wait([self._ponder_future])
+        self._ponder_minimax = None
+        self._ponder_future = None
+
+    def close(self) -> None:
+        with self._lock:
+            self.stop_pondering()
+
+
+class SessionStore:
+    ''' Sessions of this process by id, a session unused for IDLE_TIMEOUT seconds is closed. Each session holds
+    its own transposition table, so their number is capped to max_sessions'''
+    IDLE_TIMEOUT = 30 * 60
+    MAX_SESSIONS = 32
+
+    def __init__(self, idle_timeout: float = IDLE_TIMEOUT, max_sessions: int = MAX_SESSIONS) -> None:
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._idle_timeout = idle_timeout
+        self._max_sessions = max_sessions
+
+    def create(self, fen: str, depth: int = AnalysisSession.DEFAULT_DEPTH, history: List[str] = None,
+               ponder: bool = True) -> AnalysisSession:
+        ''' Raise SessionLimitError when max_sessions sessions are open'''
+        self.expire()
+        session = AnalysisSession(uuid.uuid4().hex, fen, depth, history, ponder)
+        with self._lock:
+            if len(self._sessions) >= self._max_sessions:
+                raise SessionLimitError('{0} sessions already open'.format(self._max_sessions))
+            self._sessions[session.get_session_id()] = session
+        return session
+
+    def get(self, session_id: str) -> AnalysisSession:
+        self.expire()
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.close()
+        return True
+
+    def expire(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = [session for session in self._sessions.values()
+                       if now - session.get_last_used() > self._idle_timeout]
+            for session in expired:
+                del self._sessions[session.get_session_id()]
+        for session in expired:
+            session.close()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+SESSIONS = SessionStore(max_sessions=int(os.environ.get(MAX_SESSIONS_VARIABLE) or SessionStore.MAX_SESSIONS))
@@ -0,0 +1,56 @@
+'''Counters collected by one MiniMax search.'''
+
+
+class SearchStats:
+    def __init__(self) -> None:
+        self.nodes = 0
+        self.leaf_evaluations = 0
+        self.cutoffs_by_move_index = []
+        self.board_constructions = 0
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.time_per_depth = []
+        self.principal_variation = []
+        self.seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.timed_out = False
+        self.completed_depth = 0
+        self.from_store = False
+
+    def record_cutoff(self, move_index: int) -> None:
+        ''' Count a beta cutoff produced by the move_index-th move searched in its node'''
+        while len(self.cutoffs_by_move_index) <= move_index:
+            self.cutoffs_by_move_index.append(0)
+        self.cutoffs_by_move_index[move_index] += 1
+
+    def record_depth(self, depth: int, seconds: float, nodes: int, best_move: str, score: int) -> None:
+        ''' Record one completed iteration of iterative deepening'''
+        self.completed_depth = depth
+        self.time_per_depth.append({'depth': depth, 'seconds': seconds, 'nodes': nodes,
+                                    'best_move': best_move, 'score': score})
+
+    def get_completed_depth(self) -> int:
+        return self.completed_depth
+
+    def get_tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else None
+
+    def get_nps(self) -> int:
+        return int(self.nodes / self.seconds) if self.seconds > 0 else 0
+
+    def to_dict(self) -> dict:
+        return {'nodes': self.nodes,
+                'leaf_evaluations': self.leaf_evaluations,
+                'cutoffs_by_move_index': list(self.cutoffs_by_move_index),
+                'board_constructions': self.board_constructions,
+                'tt_probes': self.tt_probes,
+                'tt_hits': self.tt_hits,
+                'tt_hit_rate': self.get_tt_hit_rate(),
+                'time_per_depth': list(self.time_per_depth),
+                'principal_variation': list(self.principal_variation),
+                'seconds': self.seconds,
+                'cpu_seconds': self.cpu_seconds,
+                'timed_out': self.timed_out,
+                'completed_depth': self.get_completed_depth(),
+                'from_store': self.from_store,
+                'nps': self.get_nps()}
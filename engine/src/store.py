@@ -0,0 +1,122 @@
+'''Stores of completed search results by position hash, and their compact binary file format.
+
+A file is a header (magic, version) followed by records of: position hash (uint64), depth (uint8),
+score (int32), best move (uint16), number of principal variation moves (uint8) and those moves
+(uint16 each). A move is packed as current coordinate, destination coordinate and promotion piece.
+'''
+import struct
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterable, Iterator, List
+
+from .board import BoardUtils, MoveCode
+
+MAGIC = b'CEAS'
+VERSION = 1
+HEADER = struct.Struct('<4sH')
+RECORD = struct.Struct('<QBiHB')
+MOVE = struct.Struct('<H')
+
+
+class StoredAnalysis:
+    __slots__ = ('_position_hash', '_depth', '_score', '_best_move', '_principal_variation')
+
+    def __init__(self, position_hash: int, depth: int, score: int, best_move: str, principal_variation: List[str]) -> None:
+        self._position_hash = position_hash
+        self._depth = depth
+        self._score = score
+        self._best_move = best_move
+        self._principal_variation = list(principal_variation)
+
+    def get_position_hash(self) -> int:
+        return self._position_hash
+
+    def get_depth(self) -> int:
+        return self._depth
+
+    def get_score(self) -> int:
+        return self._score
+
+    def get_best_move(self) -> str:
+        return self._best_move
+
+    def get_principal_variation(self) -> List[str]:
+        return self._principal_variation
+
+
+class AnalysisStore(ABC):
+    @abstractmethod
+    def lookup(self, position_hash: int, depth: int) -> StoredAnalysis:
+        ''' Return the analysis of the position searched to depth or deeper, None if there is none'''
+        pass
+
+    @abstractmethod
+    def save(self, analysis: StoredAnalysis, fen: str = '') -> None:
+        ''' Keep analysis unless the position is already stored at the same or a greater depth'''
+        pass
+
+
+class MemoryAnalysisStore(AnalysisStore):
+    def __init__(self) -> None:
+        self._analyses = {}
+
+    def lookup(self, position_hash: int, depth: int) -> StoredAnalysis:
+        analysis = self._analyses.get(position_hash)
+        return analysis if analysis is not None and analysis.get_depth() >= depth else None
+
+    def save(self, analysis: StoredAnalysis, fen: str = '') -> None:
+        stored = self._analyses.get(analysis.get_position_hash())
+        if stored is None or stored.get_depth() < analysis.get_depth():
+            self._analyses[analysis.get_position_hash()] = analysis
+
+    def __iter__(self) -> Iterator[StoredAnalysis]:
+        return iter(self._analyses.values())
+
+    def __len__(self) -> int:
+        return len(self._analyses)
+
+
+def pack_move(notation: str) -> int:
+    ''' Pack a move in coordinate notation (e2e4, e7e8q) into 16 bits'''
+    promotion_piece = notation[4].upper() if len(notation) > 4 else None
+    return BoardUtils.get_coordinate_at_position(notation[0:2]) | \
+           (BoardUtils.get_coordinate_at_position(notation[2:4]) << 6) | \
+           (MoveCode.PROMOTION_PIECES.index(promotion_piece) << 12)
+
+
+def unpack_move(packed: int) -> str:
+    promotion_piece = MoveCode.PROMOTION_PIECES[(packed >> 12) & 0x7]
+    return BoardUtils.get_position_at_coordinate(packed & 0x3F) + \
+           BoardUtils.get_position_at_coordinate((packed >> 6) & 0x3F) + \
+           (promotion_piece.lower() if promotion_piece else '')
+
+
+def write_analyses(output_file: BinaryIO, analyses: Iterable[StoredAnalysis]) -> int:
+    ''' Write the header and analyses, return the number of analyses written'''
+    output_file.write(HEADER.pack(MAGIC, VERSION))
+    count = 0
+    for analysis in analyses:
+        variation = analysis.get_principal_variation()[:255]
+        output_file.write(RECORD.pack(analysis.get_position_hash(), analysis.get_depth(), analysis.get_score(),
+                                      pack_move(analysis.get_best_move()), len(variation)))
+        output_file.write(b''.join(MOVE.pack(pack_move(notation)) for notation in variation))
+        count += 1
+    return count
+
+
+def read_analyses(input_file: BinaryIO) -> Iterator[StoredAnalysis]:
+    ''' Yield the analyses of a file written by write_analyses, raise ValueError for another format or version'''
+    header = input_file.read(HEADER.size)
+    if len(header) != HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION):
+        raise ValueError('not an analysis store file of version {0}'.format(VERSION))
+    while True:
+        record = input_file.read(RECORD.size)
+        if not record:
+            return
+        if len(record) != RECORD.size:
+            raise ValueError('truncated analysis store file')
+        position_hash, depth, score, best_move, length = RECORD.unpack(record)
+        moves = input_file.read(MOVE.size * length)
+        if len(moves) != MOVE.size * length:
+            raise ValueError('truncated analysis store file')
+        variation = [unpack_move(packed) for (packed,) in MOVE.iter_unpack(moves)]
+        yield StoredAnalysis(position_hash, depth, score, unpack_move(best_move), variation)
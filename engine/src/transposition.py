@@ -0,0 +1,207 @@
+'''Transposition table: search results keyed by Zobrist hash, with moves stored as MoveCode ints.
+
+Entries are fixed-size records in one flat buffer, slot = key % size, so the whole table can be
+written to a snapshot file and mapped back with mmap, or placed in shared memory used by every
+process of the host. A record holds the packed entry data and the key XOR the data, and is valid
+only when the XOR gives back the probed key: a record torn by a concurrent write from another
+process reads as a miss, so no lock is needed.
+
+A snapshot or shared memory block starts with a header holding a format version, the record size,
+the number of slots and a fingerprint of the Zobrist keys; one whose header doesn't match this
+code is ignored, with a warning for a shared memory block. The process creating a shared memory
+block writes its header last; when no header appears within HEADER_TIMEOUT seconds, its creator
+is taken to have died and the next process attaching writes it.
+'''
+import atexit
+import mmap
+import os
+import struct
+import threading
+import time
+import warnings
+from typing import Tuple
+
+from . import zobrist
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# key XOR data, data; data packs score (bits 0-31), move (32-50), depth (51-58) and flag (59-60)
+RECORD = struct.Struct('<QQ')
+SNAPSHOT_MAGIC = b'CETTSNAP'
+SNAPSHOT_VERSION = 2
+HEADER_TIMEOUT = 1.0
+SNAPSHOT_HEADER = struct.Struct('<8sHHIQ')
+ZOBRIST_FINGERPRINT = zobrist.BLACK_TO_MOVE_KEY ^ zobrist.PIECE_KEYS[('P', 'W')][8]
+
+SNAPSHOT_VARIABLE = 'ENGINE_TT_SNAPSHOT'
+SIZE_VARIABLE = 'ENGINE_TT_SIZE'
+SHARED_MEMORY_VARIABLE = 'ENGINE_TT_SHARED_MEMORY'
+
+
+def pack_entry(depth: int, score: int, flag: int, move: int) -> int:
+    return (score & 0xFFFFFFFF) | (move << 32) | (depth << 51) | (flag << 59)
+
+
+def unpack_entry(data: int) -> Tuple[int, int, int, int]:
+    ''' Return (depth, score, flag, move) of packed entry data'''
+    score = data & 0xFFFFFFFF
+    if score >= 1 << 31:
+        score -= 1 << 32
+    return (data >> 51) & 0xFF, score, (data >> 59) & 0x3, (data >> 32) & 0x7FFFF
+
+
+class TranspositionTable:
+    ''' Fixed number of slots indexed by hash modulo size, a new entry always replaces the old one.
+    An entry is (key, depth, score, flag, move), flag tells whether score is exact or a bound'''
+    DEFAULT_SIZE = 1 << 16
+
+    def __init__(self, size: int = DEFAULT_SIZE, buffer=None, offset: int = 0, shared_memory_block=None) -> None:
+        ''' buffer: writable buffer of size records starting at offset, a zeroed bytearray by default
+            shared_memory_block: SharedMemory holding buffer, kept open as long as the table'''
+        self._size = size
+        self._buffer = buffer if buffer is not None else bytearray(size * RECORD.size)
+        self._offset = offset
+        self._shared_memory_block = shared_memory_block
+
+    def get_size(self) -> int:
+        return self._size
+
+    def probe(self, key: int) -> Tuple[int, int, int, int, int]:
+        ''' Return the entry stored for key, None if its slot is empty or holds another position'''
+        checked_key, data = RECORD.unpack_from(self._buffer, self._offset + (key % self._size) * RECORD.size)
+        if checked_key ^ data != key or data == 0:
+            return None
+        depth, score, flag, move = unpack_entry(data)
+        return key, depth, score, flag, move
+
+    def store(self, key: int, depth: int, score: int, flag: int, move: int) -> None:
+        data = pack_entry(depth, score, flag, move)
+        RECORD.pack_into(self._buffer, self._offset + (key % self._size) * RECORD.size, key ^ data, data)
+
+    def clear(self) -> None:
+        self._buffer[self._offset:self._offset + self._size * RECORD.size] = bytes(self._size * RECORD.size)
+
+    def __len__(self) -> int:
+        ''' Number of occupied slots, counted by a scan of the table'''
+        return sum(1 for index in range(self._size)
+                   if RECORD.unpack_from(self._buffer, self._offset + index * RECORD.size)[1] != 0)
+
+    def dump(self, path: str) -> None:
+        ''' Write the table to a snapshot file, replacing it atomically'''
+        temporary_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        with open(temporary_path, 'wb') as snapshot_file:
+            snapshot_file.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, RECORD.size, self._size,
+                                                     ZOBRIST_FINGERPRINT))
+            snapshot_file.write(memoryview(self._buffer)[self._offset:self._offset + self._size * RECORD.size])
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def load(path: str):
+        ''' Map a snapshot copy-on-write: processes loading the same file share its pages until they write
+        to them. Return None if the file is missing or was written by an incompatible version'''
+        try:
+            with open(path, 'rb') as snapshot_file:
+                size = read_header(snapshot_file.read(SNAPSHOT_HEADER.size))
+                if size is None or os.fstat(snapshot_file.fileno()).st_size != SNAPSHOT_HEADER.size + size * RECORD.size:
+                    return None
+                snapshot = mmap.mmap(snapshot_file.fileno(), 0, access=mmap.ACCESS_COPY)
+        except OSError:
+            return None
+        return TranspositionTable(size, snapshot, SNAPSHOT_HEADER.size)
+
+    @staticmethod
+    def attach_shared_memory(name: str, size: int = DEFAULT_SIZE, snapshot_path: str = None):
+        ''' Attach to the shared memory table called name, creating it with size slots, filled from the snapshot
+        if there is a compatible one, when it doesn't exist yet. The block outlives the processes using it,
+        see unlink_shared_memory. Return None, with a warning, if an incompatible table has that name'''
+        try:
+            block = open_shared_memory(name, True, SNAPSHOT_HEADER.size + size * RECORD.size)
+        except FileExistsError:
+            block = open_shared_memory(name, False)
+            deadline = time.monotonic() + HEADER_TIMEOUT
+            while not any(block.buf[:SNAPSHOT_HEADER.size]) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            if not any(block.buf[:SNAPSHOT_HEADER.size]):
+                # the creating process died before writing the header, its records are valid or read as misses
+                size = (len(block.buf) - SNAPSHOT_HEADER.size) // RECORD.size
+                if size > 0:
+                    write_header(block.buf, size)
+            size = read_header(block.buf[:SNAPSHOT_HEADER.size])
+            if size is None or len(block.buf) < SNAPSHOT_HEADER.size + size * RECORD.size:
+                block.close()
+                warnings.warn('shared memory table {0} is incompatible with this engine, '
+                              'unlink it to use it'.format(name), RuntimeWarning)
+                return None
+            return TranspositionTable(size, block.buf, SNAPSHOT_HEADER.size, block)
+        snapshot = TranspositionTable.load(snapshot_path) if snapshot_path else None
+        if snapshot is not None and snapshot.get_size() == size:
+            block.buf[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + size * RECORD.size] = \
+                snapshot._buffer[snapshot._offset:snapshot._offset + size * RECORD.size]
+        write_header(block.buf, size)
+        return TranspositionTable(size, block.buf, SNAPSHOT_HEADER.size, block)
+
+
+def write_header(buffer, size: int) -> None:
+    buffer[:SNAPSHOT_HEADER.size] = SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, RECORD.size, size,
+                                                         ZOBRIST_FINGERPRINT)
+
+
+def read_header(header) -> int:
+    ''' Return the number of slots of a snapshot or shared memory header, None if it is incompatible'''
+    if len(header) != SNAPSHOT_HEADER.size:
+        return None
+    magic, version, record_size, size, fingerprint = SNAPSHOT_HEADER.unpack(bytes(header))
+    if (magic, version, record_size, fingerprint) != (SNAPSHOT_MAGIC, SNAPSHOT_VERSION, RECORD.size, ZOBRIST_FINGERPRINT) \
+       or size == 0:
+        return None
+    return size
+
+
+def open_shared_memory(name: str, create: bool, size: int = 0, unregister: bool = True):
+    ''' Open a shared memory block without letting the resource tracker unlink it when this process exits.
+    Before Python 3.13 the block is registered with the tracker on opening: unregister=False leaves it
+    registered, for a block about to be unlinked, as unlink unregisters it'''
+    # imported here, multiprocessing is slow to import and only needed for a shared memory table
+    from multiprocessing import resource_tracker, shared_memory
+    try:
+        return shared_memory.SharedMemory(name, create, size, track=False)
+    except TypeError:
+        block = shared_memory.SharedMemory(name, create, size)
+        if unregister:
+            resource_tracker.unregister(block._name, 'shared_memory')
+        return block
+
+
+def unlink_shared_memory(name: str) -> None:
+    ''' Free the shared memory table called name once no process needs it'''
+    block = open_shared_memory(name, False, unregister=False)
+    block.close()
+    block.unlink()
+
+
+_shared_table = None
+_shared_table_lock = threading.Lock()
+
+
+def get_shared_table() -> TranspositionTable:
+    ''' Return the table shared by the searches of this process, ENGINE_TT_SIZE slots. With ENGINE_TT_SHARED_MEMORY
+    set, it is the shared memory table of that name used by every process of the host. With ENGINE_TT_SNAPSHOT set,
+    it starts from that snapshot when compatible and is written back to it when the process exits'''
+    global _shared_table
+    with _shared_table_lock:
+        if _shared_table is None:
+            path = os.environ.get(SNAPSHOT_VARIABLE)
+            size = os.environ.get(SIZE_VARIABLE)
+            size = int(size) if size else TranspositionTable.DEFAULT_SIZE
+            name = os.environ.get(SHARED_MEMORY_VARIABLE)
+            if name:
+                _shared_table = TranspositionTable.attach_shared_memory(name, size, path)
+            elif path:
+                _shared_table = TranspositionTable.load(path)
+            if _shared_table is None:
+                _shared_table = TranspositionTable(size)
+            if path:
+                atexit.register(_shared_table.dump, path)
+        return _shared_table
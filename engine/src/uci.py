@@ -0,0 +1,241 @@
+'''UCI front-end: the engine as a long-lived process driven by GUIs and match runners over stdin/stdout.
+
+Supported commands: uci, isready, ucinewgame, setoption (Hash, Threads), position (startpos or fen,
+then moves), go (depth, movetime, wtime/btime/winc/binc/movestogo, nodes, infinite), stop and quit.
+A search runs in a background thread so stop is read and honored while it runs; an info line is
+written for every completed depth, with mate scores as score mate <moves>. A search stopped before
+its first depth completed plays the transposition table move, or else the first legal move. The transposition and history tables live as long as the process,
+so each search starts from what the previous ones stored, until ucinewgame clears them.
+'''
+import sys
+import threading
+import time
+from typing import List, TextIO
+
+from .board import Board, Move, MoveCode, MoveFactory
+from .engine import BoardEvaluator, MiniMax, IllegalMoveError, replay_game
+from .fen import FenError, FenUtilities
+from .ordering import HistoryTable
+from .transposition import TranspositionTable, RECORD
+
+ENGINE_NAME = 'ChessEngine'
+NO_MOVE = '0000'
+# evaluation of a mate found with at least one ply of search left, the remaining depth times this
+MATE_SCORE = BoardEvaluator.CHECK_MATE_BONUS * BoardEvaluator.DEPTH_BONUS
+
+
+class GoLimits:
+    ''' Limits of one go command, milliseconds as sent by the GUI'''
+    MAX_DEPTH = 64
+    DEFAULT_MOVES_TO_GO = 30
+    # kept back from the remaining clock for the time between the search stopping and the GUI reading bestmove
+    OVERHEAD = 50
+
+    def __init__(self, tokens: List[str]) -> None:
+        self._values = {}
+        self._infinite = False
+        index = 0
+        while index < len(tokens):
+            if tokens[index] == 'infinite':
+                self._infinite = True
+            elif tokens[index] in ('depth', 'nodes', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo') and \
+                    index + 1 < len(tokens):
+                index += 1
+                try:
+                    self._values[tokens[index - 1]] = int(tokens[index])
+                except ValueError:
+                    pass
+            index += 1
+
+    def get_depth(self) -> int:
+        return max(1, min(self._values.get('depth', GoLimits.MAX_DEPTH), GoLimits.MAX_DEPTH))
+
+    def get_node_limit(self) -> int:
+        return self._values.get('nodes')
+
+    def get_time_limit(self, white_to_move: bool) -> float:
+        ''' Seconds to search, from movetime or from the clock of the side to move, None without a time limit'''
+        if self._infinite:
+            return None
+        if 'movetime' in self._values:
+            return max(self._values['movetime'] - GoLimits.OVERHEAD, 1) / 1000
+        remaining = self._values.get('wtime' if white_to_move else 'btime')
+        if remaining is None:
+            return None
+        increment = self._values.get('winc' if white_to_move else 'binc', 0)
+        moves_to_go = self._values.get('movestogo') or GoLimits.DEFAULT_MOVES_TO_GO
+        budget = min(remaining / moves_to_go + increment, remaining / 2) - GoLimits.OVERHEAD
+        return max(budget, 1) / 1000
+
+
+class UciEngine:
+    DEFAULT_HASH = 16
+    MAX_HASH = 1024
+    # searches run Python code under the GIL, more threads would not search faster
+    MAX_THREADS = 1
+
+    def __init__(self, output_file: TextIO) -> None:
+        self._output_file = output_file
+        self._output_lock = threading.Lock()
+        self._transposition_table = TranspositionTable(UciEngine.table_size(UciEngine.DEFAULT_HASH))
+        self._history_table = HistoryTable()
+        self._threads = 1
+        self._board, self._position_hashes = replay_game(FenUtilities.STANDARD_FEN)
+        self._minimax = None
+        self._search_thread = None
+
+    @staticmethod
+    def table_size(megabytes: int) -> int:
+        return max(1, megabytes * (1 << 20) // RECORD.size)
+
+    def write(self, line: str) -> None:
+        with self._output_lock:
+            self._output_file.write(line + '\n')
+            self._output_file.flush()
+
+    def handle(self, line: str) -> bool:
+        ''' Run one command line, return False when the engine should exit'''
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, arguments = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.write('id name {0}'.format(ENGINE_NAME))
+            self.write('option name Hash type spin default {0} min 1 max {1}'.format(UciEngine.DEFAULT_HASH,
+                                                                                     UciEngine.MAX_HASH))
+            self.write('option name Threads type spin default 1 min 1 max {0}'.format(UciEngine.MAX_THREADS))
+            self.write('uciok')
+        elif command == 'isready':
+            self.write('readyok')
+        elif command == 'ucinewgame':
+            self.stop()
+            self._transposition_table.clear()
+            self._history_table.clear()
+        elif command == 'setoption':
+            self.set_option(arguments)
+        elif command == 'position':
+            self.position(arguments)
+        elif command == 'go':
+            self.go(GoLimits(arguments))
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            self.stop()
+            return False
+        else:
+            self.write('info string unknown command {0}'.format(command))
+        return True
+
+    def set_option(self, arguments: List[str]) -> None:
+        ''' setoption name <name> value <value>'''
+        if 'value' not in arguments or arguments[:1] != ['name']:
+            return
+        name = ' '.join(arguments[1:arguments.index('value')]).lower()
+        value = ' '.join(arguments[arguments.index('value') + 1:])
+        try:
+            number = int(value)
+        except ValueError:
+            self.write('info string invalid value {0} for option {1}'.format(value, name))
+            return
+        self.stop()
+        if name == 'hash':
+            megabytes = max(1, min(number, UciEngine.MAX_HASH))
+            self._transposition_table = TranspositionTable(UciEngine.table_size(megabytes))
+        elif name == 'threads':
+            self._threads = max(1, min(number, UciEngine.MAX_THREADS))
+        else:
+            self.write('info string unknown option {0}'.format(name))
+
+    def position(self, arguments: List[str]) -> None:
+        ''' position startpos|fen <fen> [moves <move>...], an invalid position leaves the current one'''
+        moves_index = arguments.index('moves') if 'moves' in arguments else len(arguments)
+        if arguments[:1] == ['startpos']:
+            fen = FenUtilities.STANDARD_FEN
+        elif arguments[:1] == ['fen']:
+            fen = ' '.join(arguments[1:moves_index])
+        else:
+            self.write('info string position needs startpos or fen')
+            return
+        self.stop()
+        try:
+            self._board, self._position_hashes = replay_game(fen, arguments[moves_index + 1:])
+        except (FenError, IllegalMoveError) as error:
+            self.write('info string {0}'.format(error))
+
+    def go(self, limits: GoLimits) -> None:
+        ''' Start searching the current position in the background, bestmove is written when it ends'''
+        self.stop()
+        board = self._board
+        start = time.perf_counter()
+        minimax = MiniMax(limits.get_depth(), self._position_hashes, self._transposition_table,
+                          limits.get_time_limit(board.get_current_player().get_alliance().is_white()),
+                          self._history_table, node_limit=limits.get_node_limit(),
+                          depth_listener=lambda entry: self.write_info(minimax, board, entry, start))
+        self._minimax = minimax
+        self._search_thread = threading.Thread(target=self.search, args=(minimax, board), name='uci-search',
+                                               daemon=True)
+        self._search_thread.start()
+
+    def search(self, minimax: MiniMax, board: Board) -> None:
+        move = minimax.execute(board)
+        if move is None:
+            move = self.fallback_move(board)
+        self.write('bestmove {0}'.format(move.get_notation() if move is not None else NO_MOVE))
+
+    def fallback_move(self, board: Board) -> Move:
+        ''' Return the transposition table move of board, else its first legal move, None when it has no legal move'''
+        entry = self._transposition_table.probe(board.get_zobrist_hash())
+        candidates = list(board.get_current_player().get_legal_moves())
+        if entry is not None and entry[4] != MoveCode.NULL_MOVE:
+            candidates.insert(0, MoveFactory.decode_move(board, entry[4]))
+        for move in candidates:
+            if move is not None and board.get_current_player().make_move(move).get_move_status().is_done():
+                return move
+        return None
+
+    @staticmethod
+    def format_score(score: int, depth: int) -> str:
+        ''' Return the UCI score of a score from the side to move's point of view found at depth: mate in moves,
+        negative when the side to move is mated, once the score holds a mate within the search'''
+        if abs(score) < MATE_SCORE:
+            return 'cp {0}'.format(score)
+        plies = max(1, depth - abs(score) // MATE_SCORE)
+        moves = (plies + 1) // 2
+        return 'mate {0}'.format(moves if score > 0 else -moves)
+
+    def write_info(self, minimax: MiniMax, board: Board, entry: dict, start: float) -> None:
+        ''' Write the info line of a completed depth, the score from the side to move's point of view'''
+        seconds = time.perf_counter() - start
+        nodes = minimax.get_stats().nodes
+        score = entry['score'] if board.get_current_player().get_alliance().is_white() else -entry['score']
+        move = MoveFactory.create_move_from_notation(board, entry['best_move'])
+        variation = minimax.principal_variation(board, move.encode())[:entry['depth']] if move is not None else []
+        self.write('info depth {0} score {1} nodes {2} nps {3} time {4} pv {5}'.format(
+            entry['depth'], UciEngine.format_score(score, entry['depth']), nodes, int(nodes / seconds) if seconds > 0 else 0, int(seconds * 1000),
+            ' '.join(variation)))
+
+    def wait(self) -> None:
+        ''' Let the running search, if any, end by itself and write its bestmove'''
+        if self._search_thread is not None:
+            self._search_thread.join()
+        self._minimax = None
+        self._search_thread = None
+
+    def stop(self) -> None:
+        ''' Stop the running search, if any, and wait for its bestmove'''
+        if self._search_thread is not None:
+            self._minimax.stop()
+            self._search_thread.join()
+        self._minimax = None
+        self._search_thread = None
+
+
+def main(input_file: TextIO = None, output_file: TextIO = None) -> int:
+    ''' Read UCI commands until quit or the end of input_file (stdin), a search still running at the end of the
+    input completes first'''
+    engine = UciEngine(output_file or sys.stdout)
+    for line in input_file or sys.stdin:
+        if not engine.handle(line):
+            return 0
+    engine.wait()
+    return 0
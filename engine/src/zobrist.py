@@ -0,0 +1,36 @@
+'''Zobrist keys used to hash board positions into 64-bit ints.
+
+The keys come from a fixed seed so the same position hashes to the same value in every
+process, which lets hashes be compared across requests, workers and restarts.
+'''
+import random
+
+_random = random.Random(0x5EED)
+
+PIECE_KEYS = {(piece_type, alliance): tuple(_random.getrandbits(64) for _ in range(64))
+              for piece_type in 'PNBRQK' for alliance in 'WB'}
+BLACK_TO_MOVE_KEY = _random.getrandbits(64)
+CASTLE_KEYS = {flag: _random.getrandbits(64) for flag in 'KQkq'}
+ENPASSANT_FILE_KEYS = tuple(_random.getrandbits(64) for _ in range(8))
+
+
+def calculate_hash(board) -> int:
+    ''' Return the Zobrist hash of pieces, player to move, castle rights and en passant file'''
+    position_hash = 0
+    for pieces in (board.get_white_piece(), board.get_black_piece()):
+        for piece in pieces:
+            position_hash ^= PIECE_KEYS[(piece.get_piece_type().value, piece.get_alliance().value)][piece.get_position()]
+    if board.get_current_player().get_alliance().is_black():
+        position_hash ^= BLACK_TO_MOVE_KEY
+    if board.get_white_player().is_king_side_castle_capable():
+        position_hash ^= CASTLE_KEYS['K']
+    if board.get_white_player().is_queen_side_castle_capable():
+        position_hash ^= CASTLE_KEYS['Q']
+    if board.get_black_player().is_king_side_castle_capable():
+        position_hash ^= CASTLE_KEYS['k']
+    if board.get_black_player().is_queen_side_castle_capable():
+        position_hash ^= CASTLE_KEYS['q']
+    enpassant_pawn = board.get_enpassant_pawn()
+    if enpassant_pawn is not None:
+        position_hash ^= ENPASSANT_FILE_KEYS[enpassant_pawn.get_position() % 8]
+    return position_hash
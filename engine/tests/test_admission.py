@@ -0,0 +1,46 @@
+from django.test import SimpleTestCase
+
+from ..src.admission import AdmissionController, OverloadedError
+
+
+class AdmissionControllerTestCase(SimpleTestCase):
+    def test_idle(self):
+        decision = AdmissionController(10).admit(6, None, 0)
+        self.assertTrue(decision.admitted)
+        self.assertFalse(decision.is_degraded())
+        self.assertEqual((decision.depth, decision.time_limit), (6, None))
+
+    def test_degrade_depth(self):
+        controller = AdmissionController(10)
+        decision = controller.admit(5, None, 5)
+        self.assertTrue(decision.is_degraded())
+        self.assertEqual((decision.depth, decision.time_limit, decision.requested_depth), (3, None, 5))
+        self.assertAlmostEqual(decision.estimated_seconds, controller.estimate_wait(5) + controller.estimate_seconds(3))
+        self.assertLessEqual(decision.estimated_seconds, controller.get_latency_budget())
+        self.assertFalse(controller.admit(5, 3, 5).is_degraded())
+
+    def test_degrade_time_limit(self):
+        controller = AdmissionController(12)
+        for _ in range(40):
+            controller.observe({'seconds': 10, 'cpu_seconds': 10, 'nodes': 100, 'time_per_depth': []})
+        decision = controller.admit(3, None, 1)
+        self.assertEqual(decision.depth, 1)
+        self.assertAlmostEqual(decision.time_limit, 12 - controller.estimate_wait(1))
+
+    def test_shed(self):
+        controller = AdmissionController(10)
+        decision = controller.admit(3, None, 10)
+        self.assertFalse(decision.admitted)
+        self.assertEqual(decision.retry_after, 1)
+        decision = controller.admit(3, None, 15)
+        self.assertEqual(decision.retry_after, 6)
+        self.assertEqual(OverloadedError(decision).decision.to_dict()['retry_after'], 6)
+
+    def test_observe_cpu_seconds(self):
+        controller = AdmissionController()
+        controller.observe({'seconds': 100, 'cpu_seconds': 1, 'nodes': 5000,
+                            'time_per_depth': [{'nodes': 100}, {'nodes': 1000}]})
+        self.assertEqual(controller.estimate_wait(2), 2.0)
+        branching_factor = AdmissionController.DEFAULT_BRANCHING_FACTOR + AdmissionController.SMOOTHING * 2
+        self.assertAlmostEqual(controller.estimate_seconds(1),
+                               AdmissionController.ROOT_NODES * branching_factor / (branching_factor - 1) / 3000)
@@ -0,0 +1,61 @@
+import io
+import json
+import os
+import subprocess
+import sys
+from contextlib import redirect_stderr
+
+from django.test import SimpleTestCase
+
+from ..src import cli
+from ..src.fen import FenUtilities
+
+
+class CliTestCase(SimpleTestCase):
+    def run_cli(self, argv: list, text: str):
+        output_file = io.StringIO()
+        with redirect_stderr(io.StringIO()):
+            status = cli.main(argv, io.StringIO(text), output_file)
+        return status, output_file.getvalue().splitlines()
+
+    def test_perft(self):
+        self.assertEqual(self.run_cli(['perft', '--depth', '2'], '# comment\n\n' + FenUtilities.STANDARD_FEN + '\n'),
+                         (0, ['400']))
+        status, lines = self.run_cli(['perft', '--depth', '1', '--divide'], FenUtilities.STANDARD_FEN + '\n')
+        self.assertEqual(status, 0)
+        self.assertTrue(lines[0].startswith('a2a3:1 a2a4:1 '))
+        self.assertTrue(lines[0].endswith(' total:20'))
+
+    def test_bestmove(self):
+        status, lines = self.run_cli(['bestmove', '--depth', '1'], '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1\n'
+                                                                   '6k1/5ppp/8/8/8/8/5PPP/r5K1 w - - 0 1\n')
+        self.assertEqual((status, lines), (0, ['a1a8', '(none)']))
+
+    def test_analyze(self):
+        status, lines = self.run_cli(['analyze', '--depth', '2', '--multipv', '2'],
+                                     '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1\n6k1/5ppp/8/8/8/8/5PPP/r5K1 w - - 0 1\n')
+        self.assertEqual(status, 0)
+        analysis, game_over = [json.loads(line) for line in lines]
+        self.assertEqual((analysis['best_move'], len(analysis['lines'])), ('a1a8', 2))
+        self.assertEqual(analysis['stats']['completed_depth'], 2)
+        self.assertEqual(game_over, {'fen': '6k1/5ppp/8/8/8/8/5PPP/r5K1 w - - 0 1', 'result': 'checkmate', 'lines': []})
+
+    def test_invalid_fen(self):
+        status, lines = self.run_cli(['perft', '--depth', '1'], 'not a fen\n' + FenUtilities.STANDARD_FEN + '\n')
+        self.assertEqual((status, lines), (1, ['20']))
+
+    def test_arguments(self):
+        parser = cli.create_parser()
+        arguments = parser.parse_args(['pgn', '--depth', '2', '--workers', '3', 'a.pgn', 'b.pgn.gz'])
+        self.assertEqual((arguments.depth, arguments.workers, arguments.paths), (2, 3, ['a.pgn', 'b.pgn.gz']))
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parser.parse_args(['bestmove', '--depth', '0'])
+
+    def test_without_django(self):
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        code = 'import sys, engine.src.cli; print(sorted(name for name in sys.modules if name.startswith("django")))'
+        environment = dict(os.environ, PYTHONPATH=root)
+        environment.pop('DJANGO_SETTINGS_MODULE', None)
+        output = subprocess.run([sys.executable, '-c', code], cwd=root, env=environment, capture_output=True,
+                                text=True, check=True).stdout
+        self.assertEqual(output.strip(), '[]')
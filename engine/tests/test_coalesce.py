@@ -0,0 +1,125 @@
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..src import coalesce
+from ..src.coalesce import CoalescingTimeout, SingleFlight, search_key
+from ..src.fen import FenUtilities
+
+
+def lead_search(directory: str, key: str, started_path: str) -> None:
+    ''' Run a slow search for key in another process, creating started_path once it holds the lock'''
+    def search():
+        open(started_path, 'w').close()
+        time.sleep(1)
+        return {'pid': os.getpid()}
+    SingleFlight(directory, 10).do(key, search)
+
+
+class SearchKeyTestCase(SimpleTestCase):
+    def test_normalization(self):
+        key = search_key(FenUtilities.STANDARD_FEN, 3, ['e2e4'], None, multipv=1, time_limit=None)
+        self.assertEqual(search_key(' ' + FenUtilities.STANDARD_FEN.replace(' ', '  '), 3, ['e2e4'], [],
+                                    time_limit=None, multipv=1), key)
+        self.assertNotEqual(search_key(FenUtilities.STANDARD_FEN, 4, ['e2e4'], None, multipv=1, time_limit=None), key)
+        self.assertNotEqual(search_key(FenUtilities.STANDARD_FEN, 3, ['e2e4'], None, multipv=2, time_limit=None), key)
+
+
+class SingleFlightTestCase(SimpleTestCase):
+    def run_followers(self, single_flight: SingleFlight, function, followers: int = 3) -> list:
+        ''' Return [(result, shared) or error] of a leader calling function and followers arriving while it runs'''
+        outcomes = [None] * (followers + 1)
+
+        def call(index):
+            try:
+                outcomes[index] = single_flight.do('key', function)
+            except Exception as error:
+                outcomes[index] = error
+        threads = [threading.Thread(target=call, args=(index,)) for index in range(followers + 1)]
+        threads[0].start()
+        self.started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return outcomes
+
+    def setUp(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def search(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return {'move': 'e2e4'}
+
+    def test_threads_share_one_call(self):
+        outcomes = self.run_followers(SingleFlight(), self.search)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(outcomes, [({'move': 'e2e4'}, False)] + [({'move': 'e2e4'}, True)] * 3)
+        self.assertEqual(SingleFlight().do('key', self.search), ({'move': 'e2e4'}, False))
+
+    def test_error_is_shared(self):
+        def fail():
+            self.search()
+            raise ValueError('search failed')
+        outcomes = self.run_followers(SingleFlight(), fail, 2)
+        self.assertEqual(self.calls, 1)
+        self.assertTrue(all(isinstance(outcome, ValueError) for outcome in outcomes))
+
+    def test_timeout(self):
+        outcomes = self.run_followers(SingleFlight(timeout=0.01), self.search, 1)
+        self.assertEqual(outcomes[0], ({'move': 'e2e4'}, False))
+        self.assertIsInstance(outcomes[1], CoalescingTimeout)
+
+
+@unittest.skipIf(coalesce.fcntl is None, 'file locks need fcntl')
+class SingleFlightFileTestCase(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_processes_share_one_call(self):
+        started_path = os.path.join(self.directory.name, 'started')
+        process = multiprocessing.get_context('spawn').Process(
+            target=lead_search, args=(self.directory.name, 'key', started_path))
+        process.start()
+        self.addCleanup(process.join)
+        deadline = time.monotonic() + 30
+        while not os.path.exists(started_path):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+        result, shared = SingleFlight(self.directory.name, 10).do('key', lambda: self.fail('searched twice'))
+        self.assertEqual((result, shared), ({'pid': process.pid}, True))
+
+    def test_generation(self):
+        single_flight = SingleFlight(self.directory.name)
+        result_path = os.path.join(self.directory.name, 'key.json')
+        self.assertEqual(single_flight.do('key', lambda: {'run': 1}), ({'run': 1}, False))
+        self.assertEqual(SingleFlight.read_result(result_path), (1, {'run': 1}))
+        self.assertEqual(single_flight.do('key', lambda: {'run': 2}), ({'run': 2}, False))
+        self.assertEqual(SingleFlight.read_result(result_path), (2, {'run': 2}))
+        self.assertEqual(SingleFlight.read_result(os.path.join(self.directory.name, 'missing.json')), (0, None))
+
+    def test_remove_expired_files(self):
+        single_flight = SingleFlight(self.directory.name, 1)
+        single_flight.do('old', lambda: {})
+        single_flight.do('new', lambda: {})
+        expired = time.time() - coalesce.EXPIRY_TIMEOUTS - 1
+        for name in ('old.lock', 'old.json'):
+            os.utime(os.path.join(self.directory.name, name), (expired, expired))
+        single_flight.remove_expired_files()
+        self.assertEqual(len(os.listdir(self.directory.name)), 4)
+        with mock.patch.object(coalesce.time, 'monotonic', return_value=time.monotonic() + 2):
+            single_flight.remove_expired_files()
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ['new.json', 'new.lock'])
@@ -0,0 +1,21 @@
+from django.test import SimpleTestCase
+
+from ..src.engine import MiniMax
+from ..src.fen import FenUtilities
+
+
+class DrawTestCase(SimpleTestCase):
+    def test_fifty_move_rule(self):
+        minimax = MiniMax(1)
+        self.assertTrue(minimax.is_draw(FenUtilities.create_game_from_fen('4k3/8/8/8/8/8/8/4K2R w - - 100 80')))
+        self.assertFalse(minimax.is_draw(FenUtilities.create_game_from_fen('4k3/8/8/8/8/8/8/4K2R w - - 99 80')))
+
+    def test_repetition_needs_two_game_occurrences(self):
+        board = FenUtilities.create_game_from_fen('4k3/8/8/8/8/8/8/4K2R w - - 0 1')
+        self.assertFalse(MiniMax(1, [board.get_zobrist_hash()]).is_draw(board))
+        self.assertTrue(MiniMax(1, [board.get_zobrist_hash()] * 2).is_draw(board))
+
+    def test_mate_on_last_halfmove(self):
+        minimax = MiniMax(2)
+        move = minimax.execute(FenUtilities.create_game_from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 99 80'))
+        self.assertEqual(move.get_notation(), 'a1a8')
@@ -0,0 +1,64 @@
+from django.test import SimpleTestCase
+
+from ..src.engine import MiniMax, generate_next_move
+from ..src.fen import FenUtilities
+
+
+class GenerateNextMoveTestCase(SimpleTestCase):
+    def test_game_over(self):
+        self.assertEqual(generate_next_move('R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1', 1),
+                         {'game_over': 'checkmate', 'fen_board': 'R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1',
+                          'player': 'black', 'depth': '1'})
+        self.assertEqual(generate_next_move('7k/5Q2/6K1/8/8/8/8/8 b - - 0 1', 2)['game_over'], 'stalemate')
+
+    def test_next_move(self):
+        result = generate_next_move('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 2)
+        self.assertNotIn('game_over', result)
+        self.assertEqual((result['from'], result['to'], result['player']), ('a1', 'a8', 'white'))
+        self.assertEqual(result['fen_board'], 'R5k1/5ppp/8/8/8/8/8/6K1 b - - 1 1')
+
+
+class SearchStatsTestCase(SimpleTestCase):
+    def test_counters(self):
+        minimax = MiniMax(3)
+        minimax.execute(FenUtilities.create_game_from_fen(FenUtilities.STANDARD_FEN))
+        stats = minimax.get_stats().to_dict()
+        self.assertEqual([entry['depth'] for entry in stats['time_per_depth']], [1, 2, 3])
+        self.assertEqual(stats['completed_depth'], 3)
+        self.assertGreater(stats['nodes'], 20)
+        self.assertGreater(stats['leaf_evaluations'], 0)
+        self.assertGreater(stats['board_constructions'], 0)
+        self.assertLessEqual(stats['tt_hits'], stats['tt_probes'])
+        self.assertGreater(sum(stats['cutoffs_by_move_index']), 0)
+        self.assertEqual(stats['principal_variation'][0], stats['time_per_depth'][-1]['best_move'])
+        self.assertGreaterEqual(stats['seconds'], sum(entry['seconds'] for entry in stats['time_per_depth']))
+        self.assertFalse(stats['timed_out'])
+
+
+class MultiPvTestCase(SimpleTestCase):
+    def test_lines(self):
+        board = FenUtilities.create_game_from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+        minimax = MiniMax(2, multipv=3)
+        move = minimax.execute(board)
+        lines = minimax.get_lines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0]['move'], move.get_notation())
+        self.assertEqual(len({line['move'] for line in lines}), 3)
+        scores = [line['score'] for line in lines]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        single = MiniMax(2)
+        self.assertEqual(single.execute(board).get_notation(), lines[0]['move'])
+        self.assertEqual(single.get_lines()[0]['score'], lines[0]['score'])
+
+    def test_black_and_fewer_moves(self):
+        minimax = MiniMax(1, multipv=10)
+        minimax.execute(FenUtilities.create_game_from_fen('7k/8/8/8/8/8/8/K6R b - - 0 1'))
+        lines = minimax.get_lines()
+        self.assertEqual(sorted(line['move'] for line in lines), ['h8g7', 'h8g8'])
+        scores = [line['score'] for line in lines]
+        self.assertEqual(scores, sorted(scores))
+
+    def test_generate_next_move(self):
+        result = generate_next_move(FenUtilities.STANDARD_FEN, 1, multipv=4)
+        self.assertEqual(len(result['lines']), 4)
+        self.assertEqual(result['lines'][0]['move'], result['from'] + result['to'])
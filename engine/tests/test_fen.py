@@ -0,0 +1,36 @@
+from django.test import SimpleTestCase
+
+from ..src.engine import replay_game
+from ..src.fen import FenError, FenUtilities
+from ..src.perft import PERFT_SUITE
+
+
+class FenTestCase(SimpleTestCase):
+    def test_whitespace(self):
+        board = FenUtilities.create_game_from_fen('  rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR   w KQkq - 0 1 ')
+        self.assertEqual(FenUtilities.create_fen_from_game(board), FenUtilities.STANDARD_FEN)
+
+    def test_invalid_fen(self):
+        for fen, field, index in (('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP w KQkq - 0 1', 'placement', 34),
+                                  ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x KQkq - 0 1', 'active_color', 44),
+                                  ('rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkk - 0 1', 'castling', 49)):
+            with self.subTest(fen=fen):
+                with self.assertRaises(FenError) as context:
+                    FenUtilities.create_game_from_fen(fen)
+                self.assertEqual((context.exception.field, context.exception.index), (field, index))
+
+    def test_round_trip(self):
+        for name, fen, _ in PERFT_SUITE:
+            with self.subTest(name=name):
+                self.assertEqual(FenUtilities.create_fen_from_game(FenUtilities.create_game_from_fen(fen)), fen)
+
+    def test_clocks_and_en_passant(self):
+        board, _ = replay_game(FenUtilities.STANDARD_FEN, ['e2e4', 'g8f6', 'e4e5', 'd7d5'])
+        self.assertEqual(FenUtilities.create_fen_from_game(board),
+                         'rnbqkb1r/ppp1pppp/5n2/3pP3/8/8/PPPP1PPP/RNBQKBNR w KQkq d6 0 3')
+
+    def test_rook_move_clears_castle_right(self):
+        board, _ = replay_game('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', ['h1h8'])
+        fen = FenUtilities.create_fen_from_game(board)
+        self.assertEqual(fen.split()[2], 'Qq')
+        self.assertEqual(FenUtilities.create_game_from_fen(fen).get_zobrist_hash(), board.get_zobrist_hash())
@@ -0,0 +1,96 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+from .. import jobs
+from ..models import AnalysisJob
+from ..src.fen import FenUtilities
+
+
+class QueuedPool:
+    ''' Job pool keeping submitted jobs until run_all, so a test sees them pending first'''
+    def __init__(self, queue_depth: int = 0) -> None:
+        self.submitted = []
+        self.queue_depth = queue_depth
+
+    def get_queue_depth(self) -> int:
+        return self.queue_depth
+
+    def get_busy_workers(self) -> int:
+        return 0
+
+    def submit(self, function, *args) -> None:
+        self.submitted.append((function, args))
+
+    def run_all(self) -> None:
+        while self.submitted:
+            function, args = self.submitted.pop(0)
+            function(*args)
+
+
+class AnalysisJobTestCase(TransactionTestCase):
+    ''' run_job closes its database connection, so the tests run outside of a transaction'''
+    def setUp(self):
+        cache.clear()
+        self.pool = QueuedPool()
+        patcher = mock.patch.object(jobs, 'get_job_pool', return_value=self.pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post_job(self, fen: str, depth: int = 2, **body):
+        body['fen'] = fen
+        return self.client.post('/jobs?depth={0}'.format(depth), body, content_type='application/json')
+
+    def test_create_and_poll(self):
+        response = self.post_job(FenUtilities.STANDARD_FEN, moves='e2e4 e7e5')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        self.assertEqual(self.client.get('/jobs/' + job_id).json()['status'], AnalysisJob.PENDING)
+        self.pool.run_all()
+        job = self.client.get('/jobs/' + job_id).json()
+        self.assertEqual(job['status'], AnalysisJob.DONE)
+        self.assertEqual([entry['depth'] for entry in job['partial_results']], [1, 2])
+        self.assertEqual(job['result']['player_make_this_move'], 'white')
+        self.assertEqual(job['result']['depth'], '2')
+
+    def test_game_over(self):
+        job = jobs.create_job('R5k1/5ppp/8/8/8/8/8/6K1 b - - 0 1', 2)
+        self.pool.run_all()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result['game_over']), (AnalysisJob.DONE, 'checkmate'))
+
+    def test_failure(self):
+        job = jobs.create_job(FenUtilities.STANDARD_FEN, 2)
+        with mock.patch.object(jobs, 'generate_next_move', side_effect=RuntimeError('search crashed')):
+            self.pool.run_all()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (AnalysisJob.FAILED, {'message': 'search crashed'}))
+
+    def test_invalid(self):
+        self.assertEqual(self.post_job(FenUtilities.STANDARD_FEN, jobs.get_max_job_depth() + 1).status_code, 400)
+        self.assertEqual(self.post_job('not a fen').json()['Message'], 'Invalid FEN string')
+        self.assertEqual(self.post_job(FenUtilities.STANDARD_FEN, moves=['e2e5']).json()['Message'], 'Invalid move list')
+        self.assertEqual(AnalysisJob.objects.count(), 0)
+
+    def test_quota(self):
+        for _ in range(jobs.DEFAULT_MAX_PENDING):
+            self.assertEqual(self.post_job(FenUtilities.STANDARD_FEN).status_code, 202)
+        self.assertEqual(self.post_job(FenUtilities.STANDARD_FEN).status_code, 429)
+        self.assertEqual(jobs.create_job(FenUtilities.STANDARD_FEN, 2, client='other').client, 'other')
+        self.pool.run_all()
+        self.assertEqual(self.post_job(FenUtilities.STANDARD_FEN).status_code, 202)
+
+    def test_queue_full(self):
+        self.pool.queue_depth = jobs.DEFAULT_MAX_QUEUED
+        self.assertEqual(self.post_job(FenUtilities.STANDARD_FEN).status_code, 503)
+
+    def test_expiry(self):
+        job = jobs.create_job(FenUtilities.STANDARD_FEN, 2, client='client')
+        AnalysisJob.objects.filter(id=job.id).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.get('/jobs/{0}'.format(job.id)).status_code, 404)
+        self.assertEqual(AnalysisJob.count_unfinished('client'), 0)
+        self.assertEqual(AnalysisJob.delete_expired(), 1)
+        self.assertFalse(AnalysisJob.objects.filter(id=job.id).exists())
@@ -0,0 +1,66 @@
+from django.test import SimpleTestCase
+
+from ..src import metrics
+from ..src.metrics import Counter, Gauge, Histogram, Registry
+
+
+class MetricsTestCase(SimpleTestCase):
+    def test_exposition_format(self):
+        registry = Registry()
+        counter = registry.register(Counter('test_requests_total', 'Requests', ('path',)))
+        registry.register(Counter('test_errors_total', 'Errors'))
+        registry.register(Gauge('test_workers', 'Workers', lambda: 3))
+        histogram = registry.register(Histogram('test_seconds', 'Latency', buckets=(0.1, 1)))
+        counter.inc(path='/next"move\n')
+        counter.inc(2, path='/jobs')
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        self.assertEqual(registry.expose(), '\n'.join([
+            '# HELP test_requests_total Requests',
+            '# TYPE test_requests_total counter',
+            'test_requests_total{path="/jobs"} 2',
+            'test_requests_total{path="/next\\"move\\n"} 1',
+            '# HELP test_errors_total Errors',
+            '# TYPE test_errors_total counter',
+            'test_errors_total 0',
+            '# HELP test_workers Workers',
+            '# TYPE test_workers gauge',
+            'test_workers 3',
+            '# HELP test_seconds Latency',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{le="0.1"} 1',
+            'test_seconds_bucket{le="1"} 2',
+            'test_seconds_bucket{le="+Inf"} 3',
+            'test_seconds_sum 5.55',
+            'test_seconds_count 3']) + '\n')
+
+    def test_invalid(self):
+        registry = Registry()
+        counter = registry.register(Counter('test_total', 'Total', ('depth',)))
+        with self.assertRaises(ValueError):
+            registry.register(Counter('test_total', 'Again'))
+        with self.assertRaises(ValueError):
+            counter.inc(depth=1, player='white')
+        with self.assertRaises(ValueError):
+            counter.inc(-1, depth=1)
+
+    def test_observe_search(self):
+        searches = metrics.SEARCHES.get(depth=7)
+        nodes = metrics.NODES_SEARCHED.get()
+        misses = metrics.TT_MISSES.get()
+        timeouts = metrics.TIMEOUTS.get()
+        metrics.observe_search(7, {'seconds': 0.2, 'nodes': 100, 'tt_hits': 3, 'tt_probes': 10, 'timed_out': True})
+        self.assertEqual(metrics.SEARCHES.get(depth=7), searches + 1)
+        self.assertEqual(metrics.NODES_SEARCHED.get(), nodes + 100)
+        self.assertEqual(metrics.TT_MISSES.get(), misses + 7)
+        self.assertEqual(metrics.TIMEOUTS.get(), timeouts + 1)
+        self.assertIn('engine_search_seconds_bucket{depth="7",le="0.25"}', metrics.REGISTRY.expose())
+
+
+class MetricsViewTestCase(SimpleTestCase):
+    def test_metrics(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertIn('# TYPE engine_workers gauge', response.content.decode())
@@ -0,0 +1,52 @@
+from django.test import SimpleTestCase
+
+from ..src.board import MoveFactory
+from ..src.engine import MiniMax
+from ..src.fen import FenUtilities
+from ..src.ordering import HistoryTable, KillerTable, staged_moves
+
+
+class OrderingTestCase(SimpleTestCase):
+    FEN = '4k3/8/8/p2n4/4P3/8/8/Q3K3 w - - 0 1'
+
+    def test_stages(self):
+        board = FenUtilities.create_game_from_fen(OrderingTestCase.FEN)
+        history_table = HistoryTable()
+        history_table.record(MoveFactory.create_move_from_notation(board, 'e1f1'), 3)
+        hash_move = MoveFactory.create_move_from_notation(board, 'e1d2')
+        killers = (MoveFactory.create_move_from_notation(board, 'a1h8').encode(),)
+        notations = [move.get_notation() for move in staged_moves(board, hash_move, killers, history_table)]
+        self.assertEqual(notations[:4], ['e1d2', 'e4d5', 'a1h8', 'e1f1'])
+        self.assertEqual(notations[-1], 'a1a5')
+        self.assertEqual(sorted(notations), sorted(move.get_notation()
+                                                   for move in board.get_current_player().get_legal_moves()))
+
+    def test_killer_table(self):
+        board = FenUtilities.create_game_from_fen(OrderingTestCase.FEN)
+        moves = [MoveFactory.create_move_from_notation(board, notation) for notation in ('e1f1', 'e1e2', 'e1d1')]
+        table = KillerTable()
+        self.assertEqual(table.get_killers(3), ())
+        for move in moves + [moves[2]]:
+            table.record(3, move)
+        self.assertEqual(table.get_killers(3), (moves[2].encode(), moves[1].encode()))
+        self.assertEqual(table.get_killers(0), ())
+        table.clear()
+        self.assertEqual(table.get_killers(3), ())
+
+    def test_history_table(self):
+        board = FenUtilities.create_game_from_fen(OrderingTestCase.FEN)
+        move = MoveFactory.create_move_from_notation(board, 'e1f1')
+        table = HistoryTable()
+        table.record(move, 4)
+        table.record(move, 2)
+        self.assertEqual(table.get_score(move), 20)
+        table.age()
+        self.assertEqual(table.get_score(move), 10)
+        table.clear()
+        self.assertEqual(table.get_score(move), 0)
+
+    def test_shared_history_table(self):
+        history_table = HistoryTable()
+        board = FenUtilities.create_game_from_fen(FenUtilities.STANDARD_FEN)
+        MiniMax(3, history_table=history_table).execute(board)
+        self.assertGreater(sum(history_table.get_score(move) for move in board.get_current_player().get_legal_moves()), 0)
@@ -0,0 +1,35 @@
+from django.test import SimpleTestCase
+
+from ..src.fen import FenUtilities
+from ..src.perft import divide, perft, run_suite
+
+
+def legal_notations(fen: str) -> list:
+    '''Return the coordinate notation of the legal moves of fen'''
+    board = FenUtilities.create_game_from_fen(fen)
+    player = board.get_current_player()
+    return sorted(move.get_notation() for move in player.get_legal_moves()
+                  if player.make_move(move).get_move_status().is_done())
+
+
+class PerftTestCase(SimpleTestCase):
+    def test_suite(self):
+        for result in run_suite(2):
+            with self.subTest(name=result['name'], depth=result['depth']):
+                self.assertTrue(result['passed'], '{0} nodes, expected {1}'.format(result['nodes'], result['expected']))
+
+    def test_divide(self):
+        board = FenUtilities.create_game_from_fen(FenUtilities.STANDARD_FEN)
+        counts = divide(board, 2)
+        self.assertEqual(len(counts), 20)
+        self.assertEqual(sum(counts.values()), perft(board, 2))
+        self.assertEqual(counts['g1f3'], 20)
+
+    def test_castle_through_pawn_attack(self):
+        self.assertTrue(all(result['passed'] for result in run_suite(3, ['castle through pawn attack'])))
+        notations = legal_notations('4k3/8/8/8/8/8/4p3/R3K2R w KQ - 0 1')
+        self.assertNotIn('e1g1', notations)
+        self.assertNotIn('e1c1', notations)
+        notations = legal_notations('r3k2r/8/8/8/8/8/8/4K3 b kq - 0 1')
+        self.assertIn('e8g8', notations)
+        self.assertIn('e8c8', notations)
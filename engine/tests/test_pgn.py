@@ -0,0 +1,93 @@
+import bz2
+import gzip
+import io
+import json
+import os
+import tempfile
+from concurrent.futures import Future
+
+from django.test import SimpleTestCase
+
+from ..src import cli
+from ..src.board import MoveFactory
+from ..src.fen import FenUtilities
+from ..src.pgn import PgnGame, analyze_game, analyze_games, open_pgn, parse_movetext, read_games, write_results
+
+
+class SanTestCase(SimpleTestCase):
+    def notation(self, fen: str, san: str) -> str:
+        move = MoveFactory.create_move_from_san(FenUtilities.create_game_from_fen(fen), san)
+        return move.get_notation() if move is not None else None
+
+    def test_moves(self):
+        self.assertEqual(self.notation(FenUtilities.STANDARD_FEN, 'e4'), 'e2e4')
+        self.assertEqual(self.notation(FenUtilities.STANDARD_FEN, 'Nf3'), 'g1f3')
+        self.assertEqual(self.notation('r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1', 'O-O'), 'e1g1')
+        self.assertEqual(self.notation('r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1', 'O-O-O+'), 'e8c8')
+        self.assertEqual(self.notation('4k3/1P6/8/8/8/8/8/4K3 w - - 0 1', 'b8=Q+'), 'b7b8q')
+
+    def test_disambiguation(self):
+        self.assertEqual(self.notation('4k3/8/8/8/8/8/8/R3K2R w - - 0 1', 'Rhf1'), 'h1f1')
+        self.assertEqual(self.notation('4k3/8/8/8/8/8/8/R3K2R w - - 0 1', 'Raf1'), None)
+
+    def test_illegal(self):
+        self.assertIsNone(self.notation(FenUtilities.STANDARD_FEN, 'e5'))
+        self.assertIsNone(self.notation(FenUtilities.STANDARD_FEN, 'Qxf7#'))
+
+
+class PgnTestCase(SimpleTestCase):
+    PGN = '[Event "first"]\n\n1. e4 e5 1-0\n\n[Event "second"]\n[FEN "6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1"]\n\n1. Ra8# 1-0\n'
+
+    def test_movetext(self):
+        moves, result = parse_movetext('1. e4 {best by test} e5 (1... c5 2. Nf3) 2. Nf3 $1 Nc6 ; rest\n3. Bb5 1/2-1/2')
+        self.assertEqual((moves, result), (['e4', 'e5', 'Nf3', 'Nc6', 'Bb5'], '1/2-1/2'))
+
+    def test_read_games(self):
+        games = list(read_games(['[Event "first"]', '[White "a \\"b\\""]', '', '1. e4 { [%clk 0:05:00]',
+                                 '[%eval 0.3] } e5 1-0', '', '[Event "second"]', '', '1. d4 *']))
+        self.assertEqual([game.get_tags() for game in games], [{'Event': 'first', 'White': 'a "b"'},
+                                                               {'Event': 'second'}])
+        self.assertEqual([(game.get_moves(), game.get_result()) for game in games],
+                         [(['e4', 'e5'], '1-0'), (['d4'], '*')])
+
+    def test_compressed_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for name, opener in (('games.pgn', open), ('games.pgn.gz', gzip.open), ('games.pgn.bz2', bz2.open)):
+                path = os.path.join(directory, name)
+                with opener(path, 'wt') as pgn_file:
+                    pgn_file.write(PgnTestCase.PGN)
+                with self.subTest(name=name), open_pgn(path) as pgn_file:
+                    self.assertEqual([game.get_moves() for game in read_games(pgn_file)], [['e4', 'e5'], ['Ra8#']])
+
+    def test_analyze_game(self):
+        result = analyze_game(3, PgnGame({'FEN': '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1'}, ['Ra8#'], '1-0'), 2)
+        self.assertEqual((result['game'], result['result'], len(result['positions'])), (3, '1-0', 1))
+        self.assertEqual((result['positions'][0]['played'], result['positions'][0]['best_move']), ('a1a8', 'a1a8'))
+        result = analyze_game(0, PgnGame({}, ['e4', 'e4']), 1)
+        self.assertEqual(result['error'], {'ply': 1, 'move': 'e4', 'message': 'illegal move'})
+        self.assertEqual(len(result['positions']), 1)
+
+    def test_analyze_games(self):
+        output_file = io.StringIO()
+        games = list(read_games(io.StringIO(PgnTestCase.PGN + '\n[Event "third"]\n\n1. e4 e4 *\n')))
+        self.assertEqual(analyze_games(games, output_file, 1, workers=1, max_in_flight=1), (3, 1))
+        lines = sorted((json.loads(line) for line in output_file.getvalue().splitlines()), key=lambda line: line['game'])
+        self.assertEqual([len(line['positions']) for line in lines], [2, 1, 1])
+        self.assertEqual(['error' in line for line in lines], [False, False, True])
+
+    def test_command(self):
+        output_file = io.StringIO()
+        self.assertEqual(cli.main(['pgn', '--depth', '1', '--workers', '1'], io.StringIO(PgnTestCase.PGN), output_file), 0)
+        self.assertEqual(len(output_file.getvalue().splitlines()), 2)
+        status = cli.main(['pgn', '--depth', '1', '--workers', '1'], io.StringIO('[Event "x"]\n\n1. e5 *\n'), io.StringIO())
+        self.assertEqual(status, 1)
+
+    def test_write_results(self):
+        done = Future()
+        done.set_result({'game': 0, 'positions': []})
+        failed = Future()
+        failed.set_exception(MemoryError('out of memory'))
+        output_file = io.StringIO()
+        self.assertEqual(write_results({done: 0, failed: 1}, output_file), 1)
+        self.assertEqual([json.loads(line) for line in output_file.getvalue().splitlines()],
+                         [{'game': 0, 'positions': []}, {'game': 1, 'error': {'message': 'MemoryError: out of memory'}}])
@@ -0,0 +1,62 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..src import profiling
+from ..src.board import Board
+from ..src.engine import MiniMax, generate_next_move
+from ..src.fen import FenUtilities
+
+
+class ProfilingTestCase(SimpleTestCase):
+    def test_profile_mode(self):
+        with mock.patch.dict(os.environ, {profiling.ENVIRONMENT_VARIABLE: ''}):
+            self.assertIsNone(profiling.get_profile_mode(None))
+            self.assertIsNone(profiling.get_profile_mode('off'))
+            self.assertEqual(profiling.get_profile_mode('1'), profiling.AGGREGATE)
+            self.assertEqual(profiling.get_profile_mode(' cProfile '), profiling.CPROFILE)
+        with mock.patch.dict(os.environ, {profiling.ENVIRONMENT_VARIABLE: 'cprofile'}):
+            self.assertEqual(profiling.get_profile_mode(None), profiling.CPROFILE)
+
+    def test_aggregate(self):
+        original = Board.__dict__['__init__']
+        with profiling.profiled(profiling.AGGREGATE) as profiler:
+            self.assertIsNot(Board.__dict__['__init__'], original)
+            MiniMax(2).execute(FenUtilities.create_game_from_fen(FenUtilities.STANDARD_FEN))
+        self.assertIs(Board.__dict__['__init__'], original)
+        report = profiler.report()
+        self.assertEqual(report['mode'], profiling.AGGREGATE)
+        self.assertGreater(report['functions']['Board.__init__']['calls'], 0)
+        self.assertGreater(report['functions']['Player.make_move']['calls'], 0)
+        self.assertGreaterEqual(report['seconds'], report['functions']['Board.__init__']['seconds'])
+
+    def test_generate_next_move(self):
+        result = generate_next_move('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 1, profile='aggregate')
+        self.assertEqual(result['profile']['mode'], profiling.AGGREGATE)
+        self.assertIn('BoardEvaluator.evaluate', result['profile']['functions'])
+        self.assertIsNone(generate_next_move('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 1, profile='off')['profile'])
+
+    def test_off(self):
+        with profiling.profiled(None) as profiler:
+            self.assertIsNone(profiler)
+
+    def test_cprofile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.dict(os.environ, {profiling.DIRECTORY_VARIABLE: directory}):
+                with profiling.profiled(profiling.CPROFILE) as profiler:
+                    FenUtilities.create_game_from_fen(FenUtilities.STANDARD_FEN)
+            self.assertTrue(os.path.isfile(profiler.get_path()))
+            self.assertEqual(os.path.dirname(profiler.get_path()), directory)
+            self.assertEqual(set(profiler.report()), {'mode', 'seconds'})
+
+    def test_remove_old_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for index in range(5):
+                path = os.path.join(directory, '{0}{1}{2}'.format(profiling.FILE_PREFIX, index, profiling.FILE_SUFFIX))
+                open(path, 'w').close()
+                os.utime(path, (index, index))
+            open(os.path.join(directory, 'other.pstats'), 'w').close()
+            profiling.remove_old_files(directory, 2)
+            self.assertEqual(sorted(os.listdir(directory)), ['engine-3.pstats', 'engine-4.pstats', 'other.pstats'])
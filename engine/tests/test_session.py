@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..src import session as session_module
+from ..src.engine import IllegalMoveError, replay_game
+from ..src.fen import FenUtilities
+from ..src.session import AnalysisSession, SessionLimitError, SessionStore
+
+
+class AnalysisSessionTestCase(SimpleTestCase):
+    def test_next_move(self):
+        session = AnalysisSession('a', FenUtilities.STANDARD_FEN, 2, ponder=False)
+        result = session.next_move(['e2e4', 'e7e5'])
+        self.assertEqual((result['session_id'], result['player'], result['depth']), ('a', 'white', '2'))
+        self.assertEqual(result['stats']['completed_depth'], 2)
+        self.assertFalse(session.is_pondering())
+        with self.assertRaises(IllegalMoveError):
+            session.next_move(['e1e3'])
+
+    def test_ponder(self):
+        session = AnalysisSession('a', FenUtilities.STANDARD_FEN, 2)
+        pool = session_module.get_search_pool()
+        with mock.patch.object(pool, 'has_idle_worker', return_value=True), \
+                mock.patch.object(pool, 'submit', wraps=pool.submit) as submit:
+            result = session.next_move()
+            self.assertEqual(submit.call_count, 1)
+            expected = [result['from'] + result['to'], result['stats']['principal_variation'][1]]
+            self.assertEqual(FenUtilities.create_fen_from_game(submit.call_args[0][1]),
+                             FenUtilities.create_fen_from_game(replay_game(FenUtilities.STANDARD_FEN, expected)[0]))
+            session.next_move(expected)
+        session.close()
+        self.assertFalse(session.is_pondering())
+        with mock.patch.object(pool, 'has_idle_worker', return_value=False), \
+                mock.patch.object(pool, 'submit') as submit:
+            session.next_move()
+            submit.assert_not_called()
+
+    def test_game_over(self):
+        session = AnalysisSession('a', '6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 1, ponder=False)
+        result = session.next_move(['a1a8'])
+        self.assertEqual((result['game_over'], result['session_id'], result['player']), ('checkmate', 'a', 'black'))
+
+
+class SessionStoreTestCase(SimpleTestCase):
+    def test_limit(self):
+        store = SessionStore(max_sessions=2)
+        first = store.create(FenUtilities.STANDARD_FEN, ponder=False)
+        store.create(FenUtilities.STANDARD_FEN, ponder=False)
+        with self.assertRaises(SessionLimitError):
+            store.create(FenUtilities.STANDARD_FEN, ponder=False)
+        self.assertTrue(store.close(first.get_session_id()))
+        self.assertFalse(store.close(first.get_session_id()))
+        store.create(FenUtilities.STANDARD_FEN, ponder=False)
+        self.assertEqual(len(store), 2)
+
+    def test_expiry(self):
+        store = SessionStore(idle_timeout=60)
+        with mock.patch.object(session_module.time, 'monotonic', return_value=1000.0):
+            old = store.create(FenUtilities.STANDARD_FEN, ponder=False)
+        with mock.patch.object(session_module.time, 'monotonic', return_value=1050.0):
+            recent = store.create(FenUtilities.STANDARD_FEN, ponder=False)
+            self.assertIs(store.get(old.get_session_id()), old)
+        with mock.patch.object(session_module.time, 'monotonic', return_value=1070.0):
+            self.assertIsNone(store.get(old.get_session_id()))
+            self.assertIs(store.get(recent.get_session_id()), recent)
+        self.assertEqual(len(store), 1)
@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import tempfile
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from ..src import transposition
+from ..src.transposition import EXACT, LOWER_BOUND, RECORD, SNAPSHOT_HEADER, TranspositionTable, \
+    open_shared_memory, unlink_shared_memory, write_header
+
+
+def attach_and_store(name: str) -> None:
+    ''' In another process: check the parent's entry, store one for the parent to probe'''
+    table = TranspositionTable.attach_shared_memory(name, 64)
+    if table.probe(1 << 63 | 7) != (1 << 63 | 7, 5, 300, EXACT, 42):
+        raise SystemExit(1)
+    table.store(11, 2, -15, LOWER_BOUND, 99)
+
+
+class SharedMemoryTestCase(SimpleTestCase):
+    def setUp(self):
+        self.name = 'engine-test-{0}'.format(uuid.uuid4().hex[:12])
+        self.addCleanup(self.unlink)
+
+    def unlink(self):
+        try:
+            unlink_shared_memory(self.name)
+        except FileNotFoundError:
+            pass
+
+    def create_block(self, size: int):
+        ''' Create the block without a header, as a process dying before writing it leaves it'''
+        block = open_shared_memory(self.name, True, SNAPSHOT_HEADER.size + size * RECORD.size)
+        self.addCleanup(block.close)
+        return block
+
+    def test_second_process(self):
+        table = TranspositionTable.attach_shared_memory(self.name, 64)
+        table.store(1 << 63 | 7, 5, 300, EXACT, 42)
+        process = multiprocessing.get_context('spawn').Process(target=attach_and_store, args=(self.name,))
+        process.start()
+        process.join(60)
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(table.probe(11), (11, 2, -15, LOWER_BOUND, 99))
+        self.assertEqual(TranspositionTable.attach_shared_memory(self.name, 64).probe(11), (11, 2, -15, LOWER_BOUND, 99))
+        unlink_shared_memory(self.name)
+        self.assertIsNone(TranspositionTable.attach_shared_memory(self.name, 64).probe(11))
+
+    def test_snapshot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'table.snapshot')
+            snapshot = TranspositionTable(64)
+            snapshot.store(3, 1, 5, EXACT, 6)
+            snapshot.dump(path)
+            table = TranspositionTable.attach_shared_memory(self.name, 64, path)
+        self.assertEqual(table.probe(3), (3, 1, 5, EXACT, 6))
+
+    def test_header_takeover(self):
+        self.create_block(32)
+        with mock.patch.object(transposition, 'HEADER_TIMEOUT', 0.05):
+            table = TranspositionTable.attach_shared_memory(self.name, 64)
+        self.assertEqual(table.get_size(), 32)
+        table.store(5, 1, 0, EXACT, 1)
+        self.assertEqual(TranspositionTable.attach_shared_memory(self.name, 64).probe(5), (5, 1, 0, EXACT, 1))
+
+    def test_incompatible_header(self):
+        block = self.create_block(32)
+        block.buf[:SNAPSHOT_HEADER.size] = b'\x01' * SNAPSHOT_HEADER.size
+        with self.assertWarns(RuntimeWarning):
+            self.assertIsNone(TranspositionTable.attach_shared_memory(self.name, 32))
+        write_header(block.buf, 64)
+        with self.assertWarns(RuntimeWarning):
+            self.assertIsNone(TranspositionTable.attach_shared_memory(self.name, 32))
+
+    def test_torn_record(self):
+        table = TranspositionTable.attach_shared_memory(self.name, 64)
+        table.store(1 << 63 | 9, 4, 100, EXACT, 10)
+        table.store(10, 4, 100, EXACT, 10)
+        block = open_shared_memory(self.name, False)
+        self.addCleanup(block.close)
+        offset = SNAPSHOT_HEADER.size + 9 * RECORD.size + 8
+        block.buf[offset] ^= 0xFF
+        self.assertIsNone(table.probe(1 << 63 | 9))
+        self.assertEqual(table.probe(10), (10, 4, 100, EXACT, 10))
+
+    def test_untracked_fallback(self):
+        original = shared_memory.SharedMemory
+
+        def without_track(name, create, size, **kwargs):
+            ''' SharedMemory before Python 3.13, without the track parameter'''
+            if kwargs:
+                raise TypeError('unexpected keyword argument track')
+            return original(name, create, size)
+        with mock.patch.object(shared_memory, 'SharedMemory', side_effect=without_track), \
+                mock.patch.object(resource_tracker, 'unregister', wraps=resource_tracker.unregister) as unregister:
+            block = open_shared_memory(self.name, True, 64)
+            self.addCleanup(block.close)
+            unregister.assert_called_once_with(block._name, 'shared_memory')
+            unregister.reset_mock()
+            open_shared_memory(self.name, False, unregister=False).close()
+            unregister.assert_not_called()
@@ -0,0 +1,81 @@
+import io
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import SimpleTestCase, TestCase
+
+from ..analysis_store import DatabaseAnalysisStore
+from ..models import AnalysisRecord
+from ..src.engine import generate_next_move
+from ..src.fen import FenUtilities
+from ..src.store import MemoryAnalysisStore, StoredAnalysis, pack_move, read_analyses, unpack_move, write_analyses
+
+
+def as_tuple(analysis: StoredAnalysis) -> tuple:
+    return (analysis.get_position_hash(), analysis.get_depth(), analysis.get_score(), analysis.get_best_move(),
+            analysis.get_principal_variation())
+
+
+class StoreFormatTestCase(SimpleTestCase):
+    def test_round_trip(self):
+        analyses = [StoredAnalysis(1 << 63, 5, -1200, 'e7e8n', ['e7e8n', 'g8f7']),
+                    StoredAnalysis(42, 1, 0, 'a2a4', [])]
+        output_file = io.BytesIO()
+        self.assertEqual(write_analyses(output_file, analyses), 2)
+        read = list(read_analyses(io.BytesIO(output_file.getvalue())))
+        self.assertEqual([as_tuple(analysis) for analysis in read],
+                         [(1 << 63, 5, -1200, 'e7e8n', ['e7e8n', 'g8f7']), (42, 1, 0, 'a2a4', [])])
+
+    def test_pack_move(self):
+        for notation in ('a8h1', 'h1a8', 'e2e4', 'b2a1q', 'g7g8r'):
+            self.assertEqual(unpack_move(pack_move(notation)), notation)
+
+    def test_invalid_file(self):
+        with self.assertRaises(ValueError):
+            list(read_analyses(io.BytesIO(b'not a store')))
+        output_file = io.BytesIO()
+        write_analyses(output_file, [StoredAnalysis(7, 3, 10, 'e2e4', ['e2e4'])])
+        with self.assertRaises(ValueError):
+            list(read_analyses(io.BytesIO(output_file.getvalue()[:-1])))
+
+
+class MemoryAnalysisStoreTestCase(SimpleTestCase):
+    def test_generate_next_move(self):
+        store = MemoryAnalysisStore()
+        searched = generate_next_move(FenUtilities.STANDARD_FEN, 2, analysis_store=store)
+        self.assertFalse(searched['stats']['from_store'])
+        self.assertEqual(len(store), 1)
+        stored = generate_next_move(FenUtilities.STANDARD_FEN, 1, analysis_store=store)
+        self.assertTrue(stored['stats']['from_store'])
+        self.assertEqual((stored['from'], stored['to']), (searched['from'], searched['to']))
+        self.assertFalse(generate_next_move(FenUtilities.STANDARD_FEN, 3, analysis_store=store)['stats']['from_store'])
+        self.assertFalse(generate_next_move(FenUtilities.STANDARD_FEN, 1, multipv=2,
+                                            analysis_store=store)['stats']['from_store'])
+
+
+class DatabaseAnalysisStoreTestCase(TestCase):
+    def test_deeper_analysis_replaces(self):
+        store = DatabaseAnalysisStore()
+        store.save(StoredAnalysis(1 << 63, 3, 40, 'e2e4', ['e2e4']))
+        store.save(StoredAnalysis(1 << 63, 2, 10, 'd2d4', ['d2d4']))
+        self.assertEqual(store.lookup(1 << 63, 3).get_best_move(), 'e2e4')
+        self.assertIsNone(store.lookup(1 << 63, 4))
+        store.save(StoredAnalysis(1 << 63, 5, 25, 'g1f3', ['g1f3']))
+        self.assertEqual(store.lookup(1 << 63, 4).get_best_move(), 'g1f3')
+
+    def test_save_many(self):
+        store = DatabaseAnalysisStore()
+        store.save(StoredAnalysis(1, 4, 0, 'e2e4', []))
+        kept = store.save_many([StoredAnalysis(1, 3, 0, 'd2d4', []), StoredAnalysis(2, 1, 5, 'a2a3', []),
+                                StoredAnalysis(2, 2, 6, 'a2a4', []), StoredAnalysis((1 << 64) - 1, 1, 0, 'h2h3', [])])
+        self.assertEqual(kept, 2)
+        # stored as signed 64-bit ints, so the largest hash comes first
+        self.assertEqual([as_tuple(analysis) for analysis in store],
+                         [((1 << 64) - 1, 1, 0, 'h2h3', []), (1, 4, 0, 'e2e4', []), (2, 2, 6, 'a2a4', [])])
+
+    def test_database_error(self):
+        store = DatabaseAnalysisStore()
+        with mock.patch.object(AnalysisRecord.objects, 'filter', side_effect=DatabaseError('database is locked')):
+            self.assertIsNone(store.lookup(1, 1))
+            store.save(StoredAnalysis(1, 1, 0, 'e2e4', []))
+        self.assertEqual(AnalysisRecord.objects.count(), 0)
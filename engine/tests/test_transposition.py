@@ -0,0 +1,76 @@
+import os
+import struct
+import tempfile
+
+from django.test import SimpleTestCase
+
+from ..src import transposition
+from ..src.engine import MiniMax
+from ..src.fen import FenUtilities
+from ..src.transposition import EXACT, LOWER_BOUND, UPPER_BOUND, TranspositionTable, pack_entry, unpack_entry
+
+
+class TranspositionTestCase(SimpleTestCase):
+    def test_pack_entry(self):
+        for depth, score, flag, move in ((0, 0, EXACT, 1), (255, -5000000, LOWER_BOUND, 0x7FFFF),
+                                         (12, 2 ** 31 - 1, UPPER_BOUND, 4095)):
+            self.assertEqual(unpack_entry(pack_entry(depth, score, flag, move)), (depth, score, flag, move))
+
+    def test_store_and_probe(self):
+        table = TranspositionTable(16)
+        table.store(0xFEDCBA9876543210, 4, -250, UPPER_BOUND, 1234)
+        self.assertEqual(table.probe(0xFEDCBA9876543210), (0xFEDCBA9876543210, 4, -250, UPPER_BOUND, 1234))
+        self.assertIsNone(table.probe(0xFEDCBA9876543210 + 16))
+        self.assertEqual(len(table), 1)
+        table.clear()
+        self.assertIsNone(table.probe(0xFEDCBA9876543210))
+
+    def test_draw_scores_not_shared(self):
+        table = TranspositionTable(1 << 12)
+        MiniMax(3, transposition_table=table).execute(FenUtilities.create_game_from_fen('r3k3/8/8/8/8/8/8/4K2R w - - 98 60'))
+        minimax = MiniMax(3, transposition_table=table)
+        move = minimax.execute(FenUtilities.create_game_from_fen('r3k3/8/8/8/8/8/8/4K2R w - - 0 60'))
+        self.assertEqual((move.get_notation(), minimax.get_lines()[0]['score']), ('h1h8', 1600))
+
+
+class SnapshotTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'table.snapshot')
+        self.table = TranspositionTable(64)
+        self.table.store(1 << 63 | 5, 3, -40, LOWER_BOUND, 777)
+        self.table.store(70, 1, 12, EXACT, 0)
+        self.table.dump(self.path)
+
+    def test_round_trip(self):
+        loaded = TranspositionTable.load(self.path)
+        self.assertEqual(loaded.get_size(), 64)
+        self.assertEqual(len(loaded), 2)
+        self.assertEqual(loaded.probe(1 << 63 | 5), (1 << 63 | 5, 3, -40, LOWER_BOUND, 777))
+        self.assertEqual(loaded.probe(70), (70, 1, 12, EXACT, 0))
+        loaded.store(70, 2, 0, EXACT, 1)
+        self.assertEqual(TranspositionTable.load(self.path).probe(70), (70, 1, 12, EXACT, 0))
+
+    def test_missing(self):
+        self.assertIsNone(TranspositionTable.load(self.path + '.missing'))
+
+    def test_version_mismatch(self):
+        with open(self.path, 'r+b') as snapshot_file:
+            snapshot_file.seek(len(transposition.SNAPSHOT_MAGIC))
+            snapshot_file.write(struct.pack('<H', transposition.SNAPSHOT_VERSION + 1))
+        self.assertIsNone(TranspositionTable.load(self.path))
+
+    def test_fingerprint_mismatch(self):
+        with open(self.path, 'r+b') as snapshot_file:
+            snapshot_file.seek(transposition.SNAPSHOT_HEADER.size - 8)
+            snapshot_file.write(struct.pack('<Q', transposition.ZOBRIST_FINGERPRINT ^ 1))
+        self.assertIsNone(TranspositionTable.load(self.path))
+
+    def test_size_mismatch(self):
+        with open(self.path, 'r+b') as snapshot_file:
+            snapshot_file.truncate(os.path.getsize(self.path) - transposition.RECORD.size)
+        self.assertIsNone(TranspositionTable.load(self.path))
+        with open(self.path, 'wb') as snapshot_file:
+            snapshot_file.write(b'CETT')
+        self.assertIsNone(TranspositionTable.load(self.path))
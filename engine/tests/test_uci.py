@@ -0,0 +1,83 @@
+import io
+
+from django.test import SimpleTestCase
+
+from ..src import uci
+from ..src.engine import replay_game
+from ..src.fen import FenUtilities
+from ..src.uci import GoLimits, MATE_SCORE, UciEngine
+
+
+class UciTestCase(SimpleTestCase):
+    def run_commands(self, *commands: str) -> list:
+        output_file = io.StringIO()
+        self.assertEqual(uci.main(io.StringIO('\n'.join(commands) + '\n'), output_file), 0)
+        return output_file.getvalue().splitlines()
+
+    def test_go_limits(self):
+        limits = GoLimits('wtime 60000 btime 30000 winc 1000 movestogo 20 depth 5 nodes 900'.split())
+        self.assertEqual(limits.get_depth(), 5)
+        self.assertEqual(limits.get_node_limit(), 900)
+        self.assertAlmostEqual(limits.get_time_limit(True), (60000 / 20 + 1000 - GoLimits.OVERHEAD) / 1000)
+        self.assertAlmostEqual(limits.get_time_limit(False), (30000 / 20 - GoLimits.OVERHEAD) / 1000)
+        self.assertIsNone(GoLimits(['infinite', 'wtime', '1000']).get_time_limit(True))
+        self.assertEqual(GoLimits(['depth', 'x']).get_depth(), GoLimits.MAX_DEPTH)
+
+    def test_commands(self):
+        output_file = io.StringIO()
+        engine = UciEngine(output_file)
+        self.assertTrue(engine.handle('uci'))
+        engine.handle('position startpos moves e2e4 e7e5')
+        engine.handle('go depth 1')
+        engine.wait()
+        self.assertFalse(engine.handle('quit'))
+        lines = output_file.getvalue().splitlines()
+        self.assertIn('uciok', lines)
+        self.assertTrue(lines[-1].startswith('bestmove '))
+        self.assertNotEqual(lines[-1], 'bestmove 0000')
+
+    def test_mate(self):
+        lines = self.run_commands('position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', 'go depth 2')
+        self.assertEqual(lines[-1], 'bestmove a1a8')
+        self.assertIn('score mate 1', lines[-2])
+        lines = self.run_commands('position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1 moves a1a8', 'go depth 2')
+        self.assertEqual(lines, ['bestmove 0000'])
+
+    def test_invalid_input(self):
+        lines = self.run_commands('isready', 'position fen not a fen', 'setoption name Hash value big',
+                                  'setoption name Ponder value 1', 'frobnicate', 'go depth 1')
+        self.assertEqual(lines[0], 'readyok')
+        self.assertTrue(lines[1].startswith('info string '))
+        self.assertEqual(lines[2:5], ['info string invalid value big for option hash',
+                                      'info string unknown option ponder',
+                                      'info string unknown command frobnicate'])
+        self.assertIn(lines[-1], ['bestmove {0}'.format(notation) for notation in
+                                  ('a2a3', 'a2a4', 'b2b3', 'b2b4', 'c2c3', 'c2c4', 'd2d3', 'd2d4', 'e2e3', 'e2e4',
+                                   'f2f3', 'f2f4', 'g2g3', 'g2g4', 'h2h3', 'h2h4', 'b1a3', 'b1c3', 'g1f3', 'g1h3')])
+
+    def test_stop_before_first_depth(self):
+        output_file = io.StringIO()
+        engine = UciEngine(output_file)
+        engine.handle('position startpos')
+        engine.handle('go infinite')
+        engine.handle('stop')
+        lines = output_file.getvalue().splitlines()
+        self.assertTrue(lines[-1].startswith('bestmove '))
+        self.assertNotEqual(lines[-1], 'bestmove 0000')
+
+    def test_fallback_move(self):
+        engine = UciEngine(io.StringIO())
+        board = FenUtilities.create_game_from_fen('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+        self.assertEqual(engine.fallback_move(board).get_notation(),
+                         board.get_current_player().get_legal_moves()[0].get_notation())
+        engine.handle('position fen 6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1')
+        engine.handle('go depth 2')
+        engine.wait()
+        self.assertEqual(engine.fallback_move(board).get_notation(), 'a1a8')
+        board, _ = replay_game('6k1/5ppp/8/8/8/8/8/R5K1 w - - 0 1', ['a1a8'])
+        self.assertIsNone(engine.fallback_move(board))
+
+    def test_mate_score(self):
+        self.assertEqual(UciEngine.format_score(35, 3), 'cp 35')
+        self.assertEqual(UciEngine.format_score(2 * MATE_SCORE + 900, 3), 'mate 1')
+        self.assertEqual(UciEngine.format_score(-(MATE_SCORE + 900), 4), 'mate -2')
@@ -0,0 +1,39 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..src import metrics
+from ..src.admission import AdmissionController
+from ..src.fen import FenUtilities
+from ..src.pool import get_search_pool
+
+
+class NextMoveViewTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_invalid_moves(self):
+        for body in ({'fen': FenUtilities.STANDARD_FEN, 'moves': 5},
+                     {'fen': FenUtilities.STANDARD_FEN, 'moves': ['e2e4', 7]},
+                     {'fen': FenUtilities.STANDARD_FEN, 'history': {'fen': FenUtilities.STANDARD_FEN}}):
+            with self.subTest(body=body):
+                response = self.client.post('/nextmove?depth=1', body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_next_move(self):
+        response = self.client.post('/nextmove?depth=1', {'fen': FenUtilities.STANDARD_FEN, 'moves': 'e2e4 e7e5'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['player_make_this_move'], 'white')
+
+    def test_overloaded(self):
+        shed = metrics.SHED_REQUESTS.get()
+        with mock.patch('engine.views.get_admission_controller', return_value=AdmissionController(1)), \
+                mock.patch.object(get_search_pool(), 'get_queue_depth', return_value=5):
+            response = self.client.post('/nextmove?depth=2', {'fen': '4k3/8/8/8/8/8/8/4K2R w K - 0 1'},
+                                        content_type='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertFalse(response.json()['admission']['admitted'])
+        self.assertEqual(metrics.SHED_REQUESTS.get(), shed + 1)
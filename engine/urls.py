@@ -4,5 +4,10 @@ from . import views
 
 urlpatterns = [
     path('nextmove', views.next_move_maker),
+    path('sessions', views.create_session),
+    path('sessions/<str:session_id>', views.session_next_move),
+    path('jobs', views.create_analysis_job),
+    path('jobs/<uuid:job_id>', views.analysis_job),
+    path('metrics', views.metrics_exporter),
     path('obtain-auth-token/', obtain_auth_token),
 ]
\ No newline at end of file
@@ -1,43 +1,350 @@
 from rest_framework.response import Response
 from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
-from .src.engine import generate_next_move, fenPass
+from django.conf import settings
+from django.http import HttpResponse
+import math
+from functools import partial
+from .src.engine import generate_next_move, stored_next_move, FenError, FenUtilities, IllegalMoveError
+from .src.pool import get_search_pool
+from .src.transposition import get_shared_table
+from .src.session import SESSIONS, SessionLimitError
+from .src.coalesce import CoalescingTimeout, get_single_flight, search_key
+from .src.admission import AdmissionDecision, OverloadedError, get_admission_controller
+from .src import metrics, profiling
+from .models import AnalysisJob
+from .jobs import JobQueueFullError, TooManyJobsError, create_job, get_job_pool, get_max_job_depth
+from .analysis_store import ANALYSIS_STORE, closing_connection
 # Create your views here.
 
+class ParameterError(ValueError):
+    '''Raised for a request parameter that isn't a valid number'''
+    def __init__(self, name: str, message: str) -> None:
+        super().__init__('{0}: {1}'.format(name, message))
+        self.name = name
+        self.message = message
+
+    def to_dict(self) -> dict:
+        return {'parameter': self.name, 'message': self.message}
+
+
+def parse_number(parameters, name: str, convert=int, default=None, minimum=None, maximum=None):
+    '''Return the parameter converted by convert (int or float), default when it is missing.
+    Raise ParameterError when it isn't a finite number between minimum and maximum'''
+    value = parameters.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        number = convert(value)
+    except (TypeError, ValueError):
+        raise ParameterError(name, 'expected an integer' if convert is int else 'expected a number')
+    if not math.isfinite(number):
+        raise ParameterError(name, 'expected a finite number')
+    if minimum is not None and number < minimum:
+        raise ParameterError(name, 'must be at least {0}'.format(minimum))
+    if maximum is not None and number > maximum:
+        raise ParameterError(name, 'must be at most {0}'.format(maximum))
+    return number
+
+
+def parse_string_list(data, name: str, split: bool = False) -> list:
+    '''Return the body parameter as a list of strings, None when it is missing. A string is split on spaces
+    with split, else it is a list of one string. Raise ParameterError for any other JSON value'''
+    value = data.get(name)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.split() if split else [value]
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return value
+    raise ParameterError(name, 'expected a list of strings')
+
+
+def invalid_parameter_response(error: ParameterError) -> Response:
+    return Response({'Message':'Invalid parameter', 'error': error.to_dict()}, status=400)
+
+
+def admit_search(depth: int, time_limit: float) -> AdmissionDecision:
+    '''Decide at what depth and time limit a search can run given the current engine load, running jobs included
+    as they share the CPU'''
+    pool = get_search_pool()
+    decision = get_admission_controller().admit(depth, time_limit, pool.get_queue_depth() + pool.get_busy_workers() +
+                                                get_job_pool().get_busy_workers())
+    if not decision.admitted:
+        metrics.SHED_REQUESTS.inc()
+    elif decision.is_degraded():
+        metrics.DEGRADED_SEARCHES.inc()
+    return decision
+
+
+def overloaded_response(decision: AdmissionDecision) -> Response:
+    return Response({'Message':'Engine overloaded, try again later', 'admission': decision.to_dict()},
+                    status=503, headers={'Retry-After': str(decision.retry_after)})
+
+
+def client_key(request) -> str:
+    '''Identify the client of a request as throttling does: the user when authenticated, else the address'''
+    if request.user.is_authenticated:
+        return 'user:{0}'.format(request.user.pk)
+    return 'address:{0}'.format(AnonRateThrottle().get_ident(request))
+
+
+def requested_profile(request) -> str:
+    '''Return the profile parameter when the client may profile searches: staff users, or anyone with the
+    ENGINE_PROFILE_REQUESTS setting on. None otherwise, which leaves only the ENGINE_PROFILE env var'''
+    profile = request.query_params.get('profile')
+    if profile and (getattr(settings, 'ENGINE_PROFILE_REQUESTS', False) or request.user.is_staff):
+        return profile
+    return None
+
+
+def search_next_move(fen, depth, moves, history, profile, time_limit, multipv) -> dict:
+    '''Answer from the analysis store when it can, otherwise admit the search and run it on the search pool.
+    The admission decision is added to the result when the engine load lowered the depth or time limit.
+    Raise OverloadedError when the search is shed'''
+    stored = stored_next_move(fen, depth, moves, history, multipv, ANALYSIS_STORE)
+    if stored is not None:
+        return stored
+    decision = admit_search(depth, time_limit)
+    if not decision.admitted:
+        raise OverloadedError(decision)
+    result = get_search_pool().run(closing_connection(generate_next_move), fen, decision.depth, moves=moves,
+                                   history=history, profile=profile, time_limit=decision.time_limit, multipv=multipv,
+                                   analysis_store=ANALYSIS_STORE, transposition_table=get_shared_table(),
+                                   store_lookup=False)
+    if decision.is_degraded():
+        result['admission'] = decision.to_dict()
+    return result
+
+
+def observe_search(depth: str, stats: dict) -> None:
+    '''Feed a search's statistics to the metrics and the admission controller, not those of a result read
+    from the analysis store, which took no search time'''
+    if stats['from_store']:
+        return
+    metrics.observe_search(depth, stats)
+    get_admission_controller().observe(stats)
+
+
 @api_view(['GET', 'POST'])
 @throttle_classes([UserRateThrottle, AnonRateThrottle])
 def next_move_maker(request):
     '''Calculate and return next move from a FEN string
     Parameter: 
         - depth (optional): The depth of search
+        - stats (optional): 1 to include search statistics in the response
+        - time_limit (optional): Seconds after which the best move of the last completed depth is returned
+        - multipv (optional): Number of best moves to return with their scores and principal variations
+        - profile (optional): 1 (or aggregate) for time and calls per engine hot path, cprofile to write a pstats file
+          on the server. Staff users only, unless the ENGINE_PROFILE_REQUESTS setting is on
+    Body:
+        - fen: FEN string of the position
+        - moves (optional): Moves in coordinate notation (e2e4, e7e8q) played from fen, list or space separated string
+        - history (optional): FEN strings of the positions played before fen, used to detect repetitions
     Response:
         - move: The string represent the move that current player should make
         - fen: FEN string of the board after make move
         - player_make_this_move: Player who makes move(white of black)
         - depth: The depth of search, default depth is 3
+        - lines: Best moves in coordinate notation with score (white's point of view) and principal variation, only with multipv
+        - stats: Search statistics (nodes, cutoffs, TT hits, time per depth, principal variation), only with stats=1
+        - profile: Profiling report, only when profiling is on by the profile parameter or the ENGINE_PROFILE env var
+        - admission: Requested and applied depth and time limit, only when the engine load lowered them
+        When the position has no legal move: game_over (checkmate or stalemate), fen and player_make_this_move
+    Under overload the request is refused with 503 and a Retry-After header
     '''
     if request.method == 'POST':
         fen = request.data.get('fen')
+        profile = requested_profile(request)
         try:
-            fenPass(fen)
-        except:
-            return Response({'Message':'Invalid FEN string'})
-        depth = request.query_params.get('depth')
-        if depth:
-            depth = int(depth)
-            move_generator = generate_next_move(fen, depth)
-        else:
-            move_generator = generate_next_move(fen)
+            moves = parse_string_list(request.data, 'moves', split=True)
+            history = parse_string_list(request.data, 'history')
+            time_limit = parse_number(request.query_params, 'time_limit', float, minimum=0)
+            multipv = parse_number(request.query_params, 'multipv', default=1, minimum=1)
+            depth = parse_number(request.query_params, 'depth', default=3, minimum=1)
+        except ParameterError as error:
+            return invalid_parameter_response(error)
+        search = partial(search_next_move, fen, depth, moves, history, profile, time_limit, multipv)
+        coalesced = False
+        try:
+            if profiling.get_profile_mode(profile) is None:
+                # identical concurrent requests share one search, admitted once by the caller running it
+                key = search_key(fen, depth, moves, history, time_limit=time_limit, multipv=multipv)
+                move_generator, coalesced = get_single_flight().do(key, search)
+            else:
+                move_generator = search()
+        except FenError as error:
+            return Response({'Message':'Invalid FEN string', 'error': error.to_dict()})
+        except IllegalMoveError as error:
+            return Response({'Message':'Invalid move list', 'error': error.to_dict()})
+        except CoalescingTimeout:
+            return Response({'Message':'Search is taking too long, try again later'}, status=503)
+        except OverloadedError as error:
+            return overloaded_response(error.decision)
+        if 'game_over' in move_generator:
+            return Response({'game_over': move_generator['game_over'],
+                             'fen': move_generator['fen_board'],
+                             'player_make_this_move': move_generator['player']})
         moved_piece = move_generator['moved_piece']
         from_position = move_generator['from']
         destination_position = move_generator['to']
         fen = move_generator['fen_board']
         player_make_this_move = move_generator['player']
         depth = move_generator['depth']
-        return Response(data={'moved_piece': moved_piece,
-                              'from': from_position,
-                              'to': destination_position,
-                              'fen': fen,
-                              'player_make_this_move': player_make_this_move,
-                              'depth': depth})
+        if coalesced:
+            metrics.COALESCED_SEARCHES.inc()
+        else:
+            observe_search(depth, move_generator['stats'])
+        data = {'moved_piece': moved_piece,
+                'from': from_position,
+                'to': destination_position,
+                'fen': fen,
+                'player_make_this_move': player_make_this_move,
+                'depth': depth}
+        if multipv > 1:
+            data['lines'] = move_generator['lines']
+        if request.query_params.get('stats') == '1':
+            data['stats'] = move_generator['stats']
+        if move_generator['profile'] is not None:
+            data['profile'] = move_generator['profile']
+        if 'admission' in move_generator:
+            data['admission'] = move_generator['admission']
+        return Response(data=data)
     return Response({'Message':'Welcome to my chess engine api'})
+
+
+@api_view(['POST'])
+@throttle_classes([UserRateThrottle, AnonRateThrottle])
+def create_session(request):
+    '''Create an analysis session keeping search state across the moves of one game
+    Body:
+        - fen: FEN string of the starting position
+        - depth (optional): The default depth of search of the session, default depth is 3
+        - history (optional): FEN strings of the positions played before fen
+        - ponder (optional): false to stop searching the expected reply between requests
+    Response:
+        - session_id: Id to pass to sessions/<session_id>
+        - fen: FEN string of the session position
+    503 when the maximum number of sessions is open
+    '''
+    try:
+        depth = parse_number(request.data, 'depth', default=3, minimum=1)
+        history = parse_string_list(request.data, 'history')
+    except ParameterError as error:
+        return invalid_parameter_response(error)
+    try:
+        session = SESSIONS.create(request.data.get('fen'), depth,
+                                  history, request.data.get('ponder', True) not in (False, 'false', '0'))
+    except FenError as error:
+        return Response({'Message':'Invalid FEN string', 'error': error.to_dict()})
+    except SessionLimitError:
+        return Response({'Message':'Too many open sessions, try again later'}, status=503)
+    return Response({'session_id': session.get_session_id(),
+                     'fen': FenUtilities.create_fen_from_game(session.get_board())})
+
+
+@api_view(['POST', 'DELETE'])
+@throttle_classes([UserRateThrottle, AnonRateThrottle])
+def session_next_move(request, session_id):
+    '''Play moves in a session and calculate the next move, or close the session with DELETE
+    Parameter:
+        - depth (optional): The depth of search, default is the session depth
+        - time_limit (optional): Seconds after which the best move of the last completed depth is returned
+    Body:
+        - moves (optional): Moves in coordinate notation played since the previous request, list or space separated string
+    Response:
+        Same as nextmove, with stats always included, and 503 with Retry-After under overload.
+        When the position has no legal move: game_over (checkmate or stalemate), fen and player_make_this_move
+    '''
+    if request.method == 'DELETE':
+        closed = SESSIONS.close(session_id)
+        return Response({'session_id': session_id, 'closed': closed}, status=200 if closed else 404)
+    session = SESSIONS.get(session_id)
+    if session is None:
+        return Response({'Message':'Unknown session', 'session_id': session_id}, status=404)
+    try:
+        moves = parse_string_list(request.data, 'moves', split=True)
+        depth = parse_number(request.query_params, 'depth', default=session.get_depth(), minimum=1)
+        time_limit = parse_number(request.query_params, 'time_limit', float, minimum=0)
+    except ParameterError as error:
+        return invalid_parameter_response(error)
+    decision = admit_search(depth, time_limit)
+    if not decision.admitted:
+        return overloaded_response(decision)
+    try:
+        move_generator = get_search_pool().run(session.next_move, moves, decision.depth, decision.time_limit)
+    except IllegalMoveError as error:
+        return Response({'Message':'Invalid move list', 'error': error.to_dict()})
+    if 'game_over' in move_generator:
+        return Response({'session_id': session_id,
+                         'game_over': move_generator['game_over'],
+                         'fen': move_generator['fen_board'],
+                         'player_make_this_move': move_generator['player']})
+    observe_search(move_generator['depth'], move_generator['stats'])
+    data = {'session_id': session_id,
+            'moved_piece': move_generator['moved_piece'],
+            'from': move_generator['from'],
+            'to': move_generator['to'],
+            'fen': move_generator['fen_board'],
+            'player_make_this_move': move_generator['player'],
+            'depth': move_generator['depth'],
+            'stats': move_generator['stats']}
+    if decision.is_degraded():
+        data['admission'] = decision.to_dict()
+    return Response(data=data)
+
+
+@api_view(['POST'])
+@throttle_classes([UserRateThrottle, AnonRateThrottle])
+def create_analysis_job(request):
+    '''Queue a search too long for one request, poll jobs/<job_id> for its progress
+    Parameter:
+        - depth (optional): The depth of search, default depth is 3, at most ENGINE_MAX_JOB_DEPTH (6 by default)
+        - time_limit (optional): Seconds after which the best move of the last completed depth is kept
+        - multipv (optional): Number of best moves to return with their scores and principal variations
+    Body:
+        - fen: FEN string of the position
+        - moves (optional): Moves in coordinate notation played from fen, list or space separated string
+        - history (optional): FEN strings of the positions played before fen
+    Response:
+        - job_id: Id to pass to jobs/<job_id>
+        - status: pending
+        - expires_at: When the job and its result are deleted
+    429 when the client already has ENGINE_MAX_PENDING_JOBS unfinished jobs, 503 when ENGINE_MAX_QUEUED_JOBS jobs
+    wait for a worker
+    '''
+    try:
+        depth = parse_number(request.query_params, 'depth', default=3, minimum=1, maximum=get_max_job_depth())
+        time_limit = parse_number(request.query_params, 'time_limit', float, minimum=0)
+        multipv = parse_number(request.query_params, 'multipv', default=1, minimum=1)
+        moves = parse_string_list(request.data, 'moves', split=True)
+        history = parse_string_list(request.data, 'history')
+    except ParameterError as error:
+        return invalid_parameter_response(error)
+    try:
+        job = create_job(request.data.get('fen'), depth, time_limit, multipv, moves, history, client_key(request))
+    except FenError as error:
+        return Response({'Message':'Invalid FEN string', 'error': error.to_dict()})
+    except IllegalMoveError as error:
+        return Response({'Message':'Invalid move list', 'error': error.to_dict()})
+    except TooManyJobsError as error:
+        return Response({'Message':'Too many unfinished jobs, wait for one to finish', 'error': str(error)}, status=429)
+    except JobQueueFullError as error:
+        return Response({'Message':'Too many queued jobs, try again later', 'error': str(error)}, status=503)
+    return Response({'job_id': str(job.id), 'status': job.status, 'expires_at': job.expires_at.isoformat()}, status=202)
+
+
+@api_view(['GET'])
+def analysis_job(request, job_id):
+    '''Return status, best move of every completed depth (partial_results) and, once done, the result of a job'''
+    job = AnalysisJob.objects.filter(id=job_id).first()
+    if job is None or job.is_expired():
+        return Response({'Message':'Unknown job', 'job_id': str(job_id)}, status=404)
+    return Response(job.to_dict())
+
+
+def metrics_exporter(request):
+    '''Engine load in the Prometheus text format: search latency by depth, nodes, TT hits and misses,
+    timeouts, queue depth and worker utilization of this process'''
+    metrics.observe_pool(get_search_pool())
+    return HttpResponse(metrics.REGISTRY.expose(), content_type=metrics.CONTENT_TYPE)